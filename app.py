@@ -1,60 +1,132 @@
-import os, json, datetime, re
-from urllib.parse import urlparse
-from flask import Flask, request, jsonify, send_from_directory
-from flask_cors import CORS
+"""Web API.
+
+    flask --app app init-db          # create or migrate the schema (run on deploy)
+    gunicorn "app:create_app()"
+    python app.py                    # development server
+
+Importing this module is cheap: the storage layer, the pipeline and the
+feed, extractor and provider modules are imported by the handlers that use
+them, on first use. Feed polling and analysis run in worker.py processes;
+this one only serves requests.
+"""
+import os, json, time, datetime, base64
+from flask import Blueprint, Flask, Response, request, jsonify, send_from_directory, stream_with_context, g
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
 
-from services.scraper import fetch_rss_items
-from services.analyzer import analyze_text_structured
-from services.scoring import compute_risk
-from storage.db import init_db, save_news_item, fetch_news_for_date
-from services.feeds import PRESET_FEEDS
+from services import metrics
+from services.feeds import PRESET_FEEDS, is_blocked_url
 
 load_dotenv()
 
-app = Flask(__name__, static_folder="frontend", static_url_path="")
-CORS(app)
+bp = Blueprint("news", __name__)
+_gauges_registered = False
 
-init_db()
-scheduler = BackgroundScheduler(daemon=True)
 
-# --- deny rules ---
-DENY_HOSTS = {"haberturk.com", "www.haberturk.com"}
-DENY_PATH_SUBSTR = {("/aa.com.tr", "/teyithatti")}  # (host_suffix, path_fragment)
+def create_app() -> Flask:
+    app = Flask(__name__, static_folder="frontend", static_url_path="")
+    from flask_cors import CORS
+    CORS(app, expose_headers=["X-Last-Event-ID"])
+    app.register_blueprint(bp)
+    app.cli.command("init-db")(init_db_command)
+    _register_gauges()
+    return app
 
-def is_blocked_url(url: str) -> bool:
-    try:
-        p = urlparse(url)
-        host = (p.netloc or "").lower()
-        path = (p.path or "").lower()
-        # block host match
-        if host in DENY_HOSTS or any(host.endswith(h.replace("/", "")) for h in DENY_HOSTS):
-            return True
-        # block aa.com.tr/teyithatti specifically
-        if host.endswith("aa.com.tr") and "/teyithatti" in path:
-            return True
-        return False
-    except Exception:
-        return False
-
-@app.route("/")
+
+def init_db_command():
+    """Create missing tables and bring existing ones up to date."""
+    from storage.db import init_db
+    t0 = time.perf_counter()
+    init_db()
+    print(f"[DB] schema ready in {time.perf_counter() - t0:.2f}s")
+
+
+def _register_gauges():
+    # the metrics registry is process-wide, so once however many apps are created
+    global _gauges_registered
+    if _gauges_registered:
+        return
+    _gauges_registered = True
+    metrics.Gauge("jobs_open", "Queued and running jobs", ["kind", "status"], fn=lambda: {
+        (kind, status): n for kind, by in _queue_stats().items()
+        for status, n in by.items() if status in ("queued", "running")})
+    metrics.Gauge("stream_subscribers", "Open /api/stream connections",
+                  fn=lambda: {(): _bus().stats()["subscribers"]})
+    metrics.Gauge("provider_breaker_open", "1 while a provider's circuit breaker is not closed", ["provider"],
+                  fn=lambda: {(name, ): int(st["state"] != "closed") for name, st in _provider_stats().items()})
+    metrics.Gauge("rate_limit_queue_depth", "Callers waiting for provider quota", ["provider"],
+                  fn=lambda: {(name, ): st["queue_depth"] for name, st in _rate_limit_stats().items()})
+
+def _queue_stats() -> dict:
+    from storage.jobs import queue_stats
+    return queue_stats()
+
+def _bus():
+    from services.events import bus
+    return bus
+
+def _rate_limit_stats() -> dict:
+    from services import rate_limit
+    return rate_limit.stats()
+
+def _hot_window_stats() -> dict:
+    from services.hot_window import get_window
+    window = get_window()
+    return window.stats() if window else {}
+
+def _provider_stats() -> dict:
+    from services.analyzer import get_router
+    router = get_router()
+    return router.stats() if router else {}
+
+@bp.before_app_request
+def _start_timing():
+    g.t0 = time.perf_counter()
+    g.timings = metrics.start_request()
+
+@bp.after_app_request
+def _record_timing(resp):
+    if "t0" not in g:
+        return resp
+    total = time.perf_counter() - g.t0
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.HTTP_REQUEST.observe(total, endpoint=endpoint, status=resp.status_code)
+    timings = metrics.end_request(g.pop("timings"))
+    if metrics.TIMING_HEADERS:
+        resp.headers["Server-Timing"] = timings.server_timing(total)
+    return resp
+
+@bp.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@bp.route("/")
 def index():
     return send_from_directory("frontend", "index.html")
 
-@app.route("/<path:path>")
+@bp.route("/<path:path>")
 def static_proxy(path):
     return send_from_directory("frontend", path)
 
-@app.route("/health", methods=["GET"])
+@bp.route("/health", methods=["GET"])
 def health():
-    return jsonify({"ok": True, "time": datetime.datetime.utcnow().isoformat()})
+    from services import analysis_cache, rate_limit, alerts
+    return jsonify({
+        "ok": True,
+        "time": datetime.datetime.utcnow().isoformat(),
+        "analysis_cache": analysis_cache.stats(),
+        "rate_limits": rate_limit.stats(),
+        "providers": _provider_stats(),
+        "alerts": alerts.stats(),
+        "stream": _bus().stats(),
+        "hot_window": _hot_window_stats(),
+        "jobs": _queue_stats(),
+    })
 
-@app.route("/api/presets", methods=["GET"])
+@bp.route("/api/presets", methods=["GET"])
 def presets():
     return jsonify({"presets": list(PRESET_FEEDS.keys())})
 
-@app.route("/scrape", methods=["GET"])
+@bp.route("/scrape", methods=["GET"])
 def scrape():
     url = request.args.get("url")
     if not url:
@@ -63,25 +135,49 @@ def scrape():
         return jsonify({"error": "scraping not permitted for this source"}), 403
     max_news = int(request.args.get("max_news", os.getenv("DEFAULT_MAX_NEWS", 8)))
     fast = request.args.get("fast", os.getenv("DEFAULT_FAST", "1")) == "1"
+    from services.scraper import fetch_rss_items
     items = fetch_rss_items(url, max_items=max_news, fast=fast)
     return jsonify({"data": items})
 
-@app.route("/metin_analiz", methods=["POST"])
+@bp.route("/metin_analiz", methods=["POST"])
 def metin_analiz():
     body = request.get_json(force=True, silent=True) or {}
     text = body.get("metin", "").strip()
     if not text:
         return jsonify({"error": "missing 'metin'"}), 400
+    from services.analyzer import analyze_text_structured
     analysis = analyze_text_structured(text)
     return jsonify(analysis)
 
-@app.route("/api/news", methods=["GET"])
+def _news_params():
+    max_news = int(request.args.get("max_news", os.getenv("DEFAULT_MAX_NEWS", 8)))
+    fast = request.args.get("fast", os.getenv("DEFAULT_FAST", "1")) == "1"
+    return max_news, fast
+
+def _bulk_news(names, max_news, fast):
+    unknown = [p for p in names if p not in PRESET_FEEDS]
+    if unknown:
+        return jsonify({"error": f"unknown preset '{unknown[0]}'"}), 400
+    feeds, errors = {}, {}
+    for p in names:
+        if is_blocked_url(PRESET_FEEDS[p]):
+            errors[p] = "scraping not permitted for this source"
+        else:
+            feeds[p] = PRESET_FEEDS[p]
+    from services.ingest import ingest_feeds, merge_by_risk
+    results, failed = ingest_feeds(feeds, max_items=max_news, fast=fast)
+    errors.update(failed)
+    return jsonify({"data": merge_by_risk(results), "errors": errors})
+
+@bp.route("/api/news", methods=["GET"])
 def api_news():
     preset = request.args.get("preset")
     url = request.args.get("url")
-    max_news = int(request.args.get("max_news", os.getenv("DEFAULT_MAX_NEWS", 8)))
-    fast = request.args.get("fast", os.getenv("DEFAULT_FAST", "1")) == "1"
+    max_news, fast = _news_params()
 
+    if preset and "," in preset:
+        names = [p.strip() for p in preset.split(",") if p.strip()]
+        return _bulk_news(names, max_news, fast)
     if preset:
         if preset not in PRESET_FEEDS:
             return jsonify({"error": f"unknown preset '{preset}'"}), 400
@@ -91,41 +187,174 @@ def api_news():
     if is_blocked_url(url):
         return jsonify({"error": "scraping not permitted for this source"}), 403
 
-    items = fetch_rss_items(url, max_items=max_news, fast=fast)
-    enriched = []
-    for it in items:
-        text = (it.get("content") or it.get("title") or "").strip()
-        analysis = analyze_text_structured(text)
-        risk_point, rule_hits = compute_risk(text, analysis)
-        record = {
-            "title": it.get("title"),
-            "source": it.get("source"),
-            "datetime": it.get("datetime"),
-            "category": analysis.get("category"),
-            "sentiment": analysis.get("sentiment"),
-            "toxicity": analysis.get("toxicity"),
-            "keywords": analysis.get("keywords", []),
-            "entities": analysis.get("entities", []),
-            "risk_point": risk_point,
-            "rule_hits": rule_hits,
-        }
-        save_news_item(record)
-        enriched.append(record)
-    return jsonify({"data": enriched})
-
-def daily_job():
-    presets = list(PRESET_FEEDS.keys())
-    for p in presets:
+    from services.pipeline import process_feed
+    return jsonify({"data": process_feed(url, max_items=max_news, fast=fast, preset=preset)})
+
+@bp.route("/api/news/all", methods=["GET"])
+def api_news_all():
+    max_news, fast = _news_params()
+    return _bulk_news(list(PRESET_FEEDS.keys()), max_news, fast)
+
+def _preset_names(arg):
+    names = [p.strip() for p in (arg or "").split(",") if p.strip()]
+    unknown = [p for p in names if p not in PRESET_FEEDS]
+    return names, unknown
+
+@bp.route("/api/news/latest", methods=["GET"])
+def api_news_latest():
+    # stored records only: never fetches or analyzes inside the request
+    names, unknown = _preset_names(request.args.get("preset"))
+    if unknown:
+        return jsonify({"error": f"unknown preset '{unknown[0]}'"}), 400
+    if not names:
+        return jsonify({"error": "provide 'preset'"}), 400
+    max_news = int(request.args.get("max_news", os.getenv("DEFAULT_MAX_NEWS", 8)))
+    # X-Last-Event-ID: open /api/stream from here and nothing published meanwhile is missed.
+    # It is read before the records, so at worst a few events arrive twice.
+    from services.hot_window import get_window
+    window = get_window()
+    if window and 0 < max_news <= window.size:
+        window.ensure_loaded()
+        last_id = window.last_event_id
+        return _cached_response(window.response(names, max_news), {"X-Last-Event-ID": str(last_id)})
+    from services.pipeline import stored_records
+    from services.ingest import merge_by_risk
+    from storage.jobs import last_event_id
+    last_id = last_event_id()
+    results = {p: stored_records(PRESET_FEEDS[p], max_news) for p in names}
+    resp = jsonify({"data": merge_by_risk(results)})
+    resp.headers["X-Last-Event-ID"] = str(last_id)
+    return resp
+
+def _cached_response(cached, extra=None):
+    # each encoding is its own representation, so the gzip body gets its own strong ETag
+    from services.hot_window import GZIP_MIN_BYTES
+    gz = len(cached.body) >= GZIP_MIN_BYTES and request.accept_encodings["gzip"] > 0
+    etag = cached.etag + "-gz" if gz else cached.etag
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "no-cache", "Vary": "Accept-Encoding", **(extra or {})}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    if gz:
+        headers["Content-Encoding"] = "gzip"
+    return Response(cached.gzipped if gz else cached.body, mimetype="application/json", headers=headers)
+
+@bp.route("/api/stream", methods=["GET"])
+def api_stream():
+    names, unknown = _preset_names(request.args.get("preset"))
+    if unknown:
+        return jsonify({"error": f"unknown preset '{unknown[0]}'"}), 400
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        return jsonify({"error": "invalid Last-Event-ID"}), 400
+
+    bus = _bus()
+
+    def generate():
+        yield "retry: 5000\n\n"
+        for ev in bus.subscribe(set(names) or None, last_id):
+            if ev is None:
+                yield ": keep-alive\n\n"
+                continue
+            data = json.dumps(dict(ev.data, preset=ev.preset), ensure_ascii=False)
+            yield f"id: {ev.id}\nevent: news\ndata: {data}\n\n"
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _encode_cursor(key) -> str:
+    risk, created, row_id = key
+    raw = json.dumps([risk, created.isoformat() if created else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    risk, created, row_id = json.loads(raw)
+    # rows with a NULL risk_point or created_at encode them as null
+    return (None if risk is None else int(risk),
+            None if created is None else datetime.datetime.fromisoformat(created), int(row_id))
+
+def _history_filters(args) -> dict:
+    filters = {
+        "category": args.get("category"),
+        "sentiment": args.get("sentiment"),
+        "source": args.get("source"),
+    }
+    if args.get("from"):
+        filters["start"] = datetime.datetime.strptime(args["from"], "%Y-%m-%d")
+    if args.get("to"):
+        # inclusive end date
+        filters["end"] = datetime.datetime.strptime(args["to"], "%Y-%m-%d") + datetime.timedelta(days=1)
+    if args.get("min_risk"):
+        filters["min_risk"] = int(args["min_risk"])
+    return filters
+
+@bp.route("/api/news/history", methods=["GET"])
+def api_news_history():
+    try:
+        filters = _history_filters(request.args)
+        after = _decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        limit = request.args.get("limit")
+        limit = int(limit) if limit else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "invalid filter or cursor"}), 400
+
+    from storage.db import fetch_news_page, iter_news
+    if request.args.get("format") == "ndjson":
+        def generate():
+            for row in iter_news(filters, after=after, limit=limit):
+                yield json.dumps(row, ensure_ascii=False) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    rows, nxt = fetch_news_page(filters, after=after, limit=max(1, min(limit or 50, 500)))
+    return jsonify({"data": rows, "next_cursor": _encode_cursor(nxt) if nxt else None})
+
+@bp.route("/api/search", methods=["GET"])
+def api_search():
+    from storage.search import search_news
+    q = (request.args.get("q") or "").strip()
+    if not q:
+        return jsonify({"error": "missing 'q'"}), 400
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 100))
+    except ValueError:
+        return jsonify({"error": "invalid 'limit'"}), 400
+    return jsonify({"data": search_news(q, limit=limit)})
+
+def _report_response(start, end, fmt):
+    from storage.rollups import report
+    from services.reports import csv_lines, xlsx_bytes
+    rep = report(start, end)
+    name = f"report_{start.isoformat()}_{end.isoformat()}"
+    if fmt == "csv":
+        return Response(csv_lines(rep), mimetype="text/csv",
+                        headers={"Content-Disposition": f"attachment; filename={name}.csv"})
+    if fmt == "xlsx":
         try:
-            with app.test_request_context(f"/api/news?preset={p}&max_news=10&fast=1"):
-                api_news()
-        except Exception as e:
-            print("daily_job error:", e)
+            body = xlsx_bytes(rep)
+        except ImportError:
+            return jsonify({"error": "xlsx export needs openpyxl"}), 501
+        return Response(body, mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+                        headers={"Content-Disposition": f"attachment; filename={name}.xlsx"})
+    return jsonify(rep)
 
-scheduler.add_job(daily_job, "cron", hour=int(os.getenv("CRON_HOUR", 6)))
-scheduler.start()
+@bp.route("/api/reports/daily", methods=["GET"])
+def report_daily():
+    try:
+        day = datetime.datetime.strptime(request.args.get("date") or datetime.datetime.utcnow().strftime("%Y-%m-%d"), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "date must be YYYY-MM-DD"}), 400
+    return _report_response(day, day, request.args.get("format", "json"))
+
+@bp.route("/api/reports/weekly", methods=["GET"])
+def report_weekly():
+    try:
+        end = datetime.datetime.strptime(request.args.get("end") or datetime.datetime.utcnow().strftime("%Y-%m-%d"), "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "end must be YYYY-MM-DD"}), 400
+    return _report_response(end - datetime.timedelta(days=6), end, request.args.get("format", "json"))
 
-@app.route("/api/subscribe", methods=["POST"])
+@bp.route("/api/subscribe", methods=["POST"])
 def subscribe():
     from storage.db import save_user_email
     data = request.get_json(force=True)
@@ -140,5 +369,5 @@ def subscribe():
 
 
 if __name__ == "__main__":
-    app.run(port=5001, debug=True)
+    create_app().run(port=5001, debug=True)
 
@@ -0,0 +1,201 @@
+"""Benchmark corpus: RSS feeds plus the article pages they link to.
+
+A corpus directory holds ``manifest.json`` and the raw bytes of every feed and
+article, so runs replay byte-identical input:
+
+    manifest = {"feeds": {name: {"file": "feeds/<name>.xml",
+                                 "articles": {"<id>": "articles/<id>.html"}}}}
+
+Feed links point at ``{base}/articles/<id>.html``; CorpusServer fills in the
+base URL when it serves the feed. ``record`` snapshots the live presets (needs
+network); ``synthesize`` builds a deterministic Turkish corpus offline.
+"""
+import os, json, random, hashlib, datetime
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+BASE_PLACEHOLDER = "{base}"
+
+# sentence material per topic; mixes in the terms mock_provider and scoring react to
+_TOPICS = {
+    "Disaster": ["{city}'de {mag} büyüklüğünde deprem meydana geldi",
+                 "{city} kırsalında çıkan orman yangını kontrol altına alınmaya çalışılıyor",
+                 "Enkaz altında kalanlar için arama kurtarma çalışmaları sürüyor",
+                 "Sel nedeniyle {city} bölgesinde yollar ulaşıma kapandı"],
+    "Economy": ["Merkez Bankası politika faizini yüzde {pct} seviyesinde sabit tuttu",
+                "Enflasyon beklentileri piyasada döviz kurunu yukarı taşıdı",
+                "İhracat rakamları geçen yılın aynı dönemine göre yüzde {pct} arttı",
+                "Bütçe açığı ekonomi yönetiminin gündeminde ilk sırada"],
+    "Politics": ["Meclis genel kurulunda yeni kanun teklifi kabul edildi",
+                 "Bakan {name} kabine toplantısı sonrası açıklama yaptı",
+                 "Milletvekilleri seçim kanunu üzerindeki değişiklikleri görüştü",
+                 "Cumhurbaşkanı {city} ziyaretinde vatandaşlara seslendi"],
+    "Sports": ["Milli takım deplasmanda {n} golle kazandı",
+               "Ligde zirve yarışı son haftaya kaldı",
+               "Basketbol takımı transfer döneminde iki yeni oyuncuyla anlaştı",
+               "Futbol sezonunun açılış maçında rekor seyirci bekleniyor"],
+    "Crime": ["{city}'de düzenlenen operasyonda {n} şüpheli gözaltına alındı",
+              "Yolsuzluk soruşturmasında tutuklama kararı verildi",
+              "Uyuşturucu operasyonunda çok sayıda şüpheli yakalandı",
+              "Silahlı saldırının failleri kısa sürede tespit edildi"],
+    "World": ["Ukrayna ile Rusya arasındaki görüşmeler yeniden başladı",
+              "Gazze'de ateşkes çağrıları sürerken insani yardım konvoyu bekletiliyor",
+              "Avrupa Birliği liderleri Almanya'da bir araya geldi",
+              "ABD yönetimi İran'a yönelik yeni yaptırımları duyurdu"],
+    "Health": ["Sağlık Bakanlığı yeni aşı takvimini açıkladı",
+               "Hastanelerde enfeksiyon vakalarında artış gözlendi",
+               "Doktorlar mevsimsel grip konusunda uyardı",
+               "Yeni şehir hastanesi {city}'de hizmete açıldı"],
+}
+_FILLER = ["Yetkililer konuya ilişkin açıklamanın ilerleyen saatlerde yapılacağını bildirdi",
+           "Gelişmeler yakından takip ediliyor",
+           "Uzmanlar sürecin önümüzdeki haftalarda netleşeceğini belirtiyor",
+           "Konuyla ilgili ayrıntılı bilgi resmi kanallardan paylaşıldı",
+           "Vatandaşlar bölgedeki gelişmeleri endişeyle izliyor",
+           "Açıklamada kamuoyunun doğru bilgilendirilmesinin önemine vurgu yapıldı"]
+_CITIES = ["İstanbul", "Ankara", "İzmir", "Malatya", "Hatay", "Van", "Bursa", "Antalya", "Trabzon", "Kahramanmaraş"]
+_NAMES = ["Yılmaz", "Kaya", "Demir", "Şahin", "Çelik", "Yıldız", "Öztürk", "Aydın"]
+
+
+def _sentence(rng, topic):
+    return rng.choice(_TOPICS[topic]).format(
+        city=rng.choice(_CITIES), name=rng.choice(_NAMES), n=rng.randint(2, 9),
+        mag=f"{rng.uniform(3.5, 7.2):.1f}", pct=rng.randint(2, 50))
+
+
+def _article_html(title, paragraphs):
+    body = "\n".join(f"<p>{escape(p)}</p>" for p in paragraphs)
+    return (f"<!DOCTYPE html><html lang=\"tr\"><head><meta charset=\"utf-8\">"
+            f"<title>{escape(title)}</title></head><body><header><nav>Anasayfa | Gündem | "
+            f"Ekonomi | Spor</nav></header><article><h1>{escape(title)}</h1>{body}</article>"
+            f"<footer>Tüm hakları saklıdır.</footer></body></html>")
+
+
+def _feed_xml(name, items):
+    parts = [f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+             f"<title>{escape(name)}</title><link>{BASE_PLACEHOLDER}/</link>"
+             f"<description>{escape(name)} haberleri</description>"]
+    for it in items:
+        parts.append(
+            f"<item><title>{escape(it['title'])}</title>"
+            f"<link>{BASE_PLACEHOLDER}/articles/{it['id']}.html</link>"
+            f"<guid isPermaLink=\"false\">{it['id']}</guid>"
+            f"<pubDate>{format_datetime(it['published'])}</pubDate>"
+            f"<description>{escape(it['summary'])}</description></item>")
+    parts.append("</channel></rss>\n")
+    return "".join(parts)
+
+
+def _write(root, rel, data: bytes):
+    path = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def synthesize(root: str, n_feeds=20, items_per_feed=40, big_feed_items=400,
+               dup_rate=0.2, seed=1234) -> dict:
+    """Write a deterministic corpus of ``n_feeds`` feeds under ``root``.
+
+    The first feed is a large "all news" feed with ``big_feed_items`` entries;
+    about ``dup_rate`` of the other entries re-report a story from another
+    feed with light rewording, like agencies picked up by several outlets.
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime(2025, 9, 3, 12, 0, tzinfo=datetime.timezone.utc)
+    manifest = {"seed": seed, "feeds": {}}
+    stories = []
+    for f in range(n_feeds):
+        name = "Bench_Tum" if f == 0 else f"Bench_{f:02d}"
+        count = big_feed_items if f == 0 else items_per_feed
+        items = []
+        for i in range(count):
+            if stories and rng.random() < dup_rate:
+                topic, paragraphs = rng.choice(stories)
+                paragraphs = paragraphs[:-1] + [rng.choice(_FILLER)]
+            else:
+                topic = rng.choice(list(_TOPICS))
+                paragraphs = [_sentence(rng, topic) + "." for _ in range(rng.randint(3, 6))]
+                paragraphs += [rng.choice(_FILLER) + "." for _ in range(rng.randint(2, 8))]
+                stories.append((topic, paragraphs))
+            art_id = hashlib.sha1(f"{seed}:{name}:{i}".encode()).hexdigest()[:12]
+            title = paragraphs[0].rstrip(".")
+            items.append({"id": art_id, "title": title, "summary": " ".join(paragraphs[:2]),
+                          "published": now - datetime.timedelta(minutes=7 * i + rng.randint(0, 6)),
+                          "html": _article_html(title, paragraphs)})
+        entry = {"file": f"feeds/{name}.xml", "articles": {}}
+        _write(root, entry["file"], _feed_xml(name, items).encode("utf-8"))
+        for it in items:
+            rel = f"articles/{it['id']}.html"
+            _write(root, rel, it["html"].encode("utf-8"))
+            entry["articles"][it["id"]] = rel
+        manifest["feeds"][name] = entry
+    _write(root, "manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1).encode())
+    return manifest
+
+
+def record(root: str, feeds: dict, max_articles=20, timeout=15) -> dict:
+    """Snapshot live feeds and their first ``max_articles`` articles.
+
+    Links are rewritten to the corpus placeholder so the recording replays
+    against CorpusServer. Feeds or articles that fail are skipped.
+    """
+    import re
+    from services.http_client import get_session
+    session = get_session()
+    manifest = {"recorded_at": datetime.datetime.utcnow().isoformat(), "feeds": {}}
+    for name, url in feeds.items():
+        try:
+            resp = session.get(url, timeout=timeout)
+            resp.raise_for_status()
+        except Exception as e:
+            print(f"[bench] skip {name}: {e}")
+            continue
+        xml = resp.text
+        entry = {"file": f"feeds/{name}.xml", "articles": {}}
+        links = re.findall(r"<link>\s*(?:<!\[CDATA\[)?\s*(https?://[^<\]\s]+)", xml)[1:max_articles + 1]
+        for link in links:
+            art_id = hashlib.sha1(link.encode()).hexdigest()[:12]
+            try:
+                page = session.get(link, timeout=timeout)
+                page.raise_for_status()
+            except Exception:
+                continue
+            rel = f"articles/{art_id}.html"
+            _write(root, rel, page.content)
+            entry["articles"][art_id] = rel
+            xml = xml.replace(link, f"{BASE_PLACEHOLDER}/articles/{art_id}.html")
+        _write(root, entry["file"], xml.encode("utf-8"))
+        manifest["feeds"][name] = entry
+    _write(root, "manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1).encode())
+    return manifest
+
+
+def load(root: str) -> dict:
+    with open(os.path.join(root, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def ensure(root: str, **kwargs) -> dict:
+    """Load the corpus at ``root``, synthesizing it first if there is none."""
+    if not os.path.exists(os.path.join(root, "manifest.json")):
+        return synthesize(root, **kwargs)
+    return load(root)
+
+
+if __name__ == "__main__":
+    import argparse, sys
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    parser = argparse.ArgumentParser(description="Build a benchmark corpus")
+    parser.add_argument("root")
+    parser.add_argument("--record", action="store_true", help="snapshot the live presets")
+    parser.add_argument("--feeds", type=int, default=20)
+    parser.add_argument("--items", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args()
+    if args.record:
+        from services.feeds import PRESET_FEEDS
+        m = record(args.root, PRESET_FEEDS)
+    else:
+        m = synthesize(args.root, n_feeds=args.feeds, items_per_feed=args.items, seed=args.seed)
+    print(f"{len(m['feeds'])} feeds written to {args.root}")
@@ -0,0 +1,132 @@
+"""End-to-end scenario: ingest a set of corpus feeds against the stub LLM.
+
+    python -m bench.e2e --feeds 20 --db-rows 20000 --llm-latency 0.2
+
+One scenario per process: the services read their settings at import time,
+so the stub servers are started and the environment set before any of them
+is imported. Writes one JSON object (see ``run``).
+"""
+import os, sys, time, argparse, datetime, tempfile
+
+
+def _prefill(n: int, chunk=1000):
+    """Fill the news table with ``n`` synthetic rows spread over 30 days."""
+    from storage.db import save_news_items
+    categories = ["Disaster", "Economy", "Politics", "Sports", "Crime", "World", "Health"]
+    now = datetime.datetime.utcnow()
+    for start in range(0, n, chunk):
+        batch = []
+        for i in range(start, min(n, start + chunk)):
+            cat = categories[i % len(categories)]
+            text = f"Arşiv haberi {i}: {cat.lower()} gündeminde deprem enkaz ekonomi seçim gelişmesi"
+            batch.append({
+                "title": text[:60], "source": f"http://archive.invalid/{i}",
+                "datetime": (now - datetime.timedelta(minutes=43 * i % (30 * 24 * 60))).isoformat(),
+                "category": cat, "sentiment": "Neutral", "toxicity": 0.1,
+                "keywords": text.split()[:6], "entities": [], "risk_point": i % 10, "content": text,
+            })
+        save_news_items(batch)
+
+
+def _stage_totals() -> dict:
+    """Sum and count of every histogram in this process, across label sets."""
+    from services import metrics
+    out = {}
+    for m in metrics._registry:
+        if not isinstance(m, metrics.Histogram):
+            continue
+        with m._lock:
+            states = list(m._values.values())
+        n = sum(s[2] for s in states)
+        if n:
+            out[m.name] = {"count": n, "total_seconds": round(sum(s[1] for s in states), 4)}
+    return out
+
+
+def run(corpus_root: str, n_feeds: int, db_rows: int, llm_latency: float, max_items: int,
+        read_repeat: int) -> dict:
+    from bench import corpus
+    from bench.harness import measure
+    from bench.servers import CorpusServer, StubLLMServer
+
+    manifest = corpus.load(corpus_root)
+    names = sorted(manifest["feeds"])[:n_feeds]
+    with CorpusServer(corpus_root, manifest) as feeds_srv, \
+            StubLLMServer(latency=llm_latency, jitter=llm_latency / 2) as llm:
+        os.environ.update(PROVIDER="openai", OPENAI_API_KEY="bench",
+                          OPENAI_BASE_URL=f"{llm.base}/v1", OPENAI_RPM="100000", OPENAI_TPM="100000000")
+
+        # the corpus stands in for the real presets
+        from services import feeds
+        feeds.PRESET_FEEDS.clear()
+        feeds.PRESET_FEEDS.update({n: feeds_srv.feed_url(n) for n in names})
+
+        from storage.db import init_db
+        init_db()
+        t0 = time.perf_counter()
+        _prefill(db_rows)
+        prefill_s = time.perf_counter() - t0
+
+        from services.ingest import ingest_feeds
+        out = {"feeds": len(names), "db_rows": db_rows, "llm_latency_s": llm_latency,
+               "prefill_seconds": round(prefill_s, 3)}
+        for label in ("cold", "warm"):
+            before = llm.items
+            t0 = time.perf_counter()
+            results, errors = ingest_feeds(dict(feeds.PRESET_FEEDS), max_items=max_items, fast=True,
+                                           timeout=600)
+            wall = time.perf_counter() - t0
+            records = sum(len(v) for v in results.values())
+            out[label] = {
+                "wall_seconds": round(wall, 3),
+                "records": records,
+                "analyzed": llm.items - before,
+                "errors": len(errors),
+                "records_per_s": round(records / wall, 2) if wall else 0.0,
+            }
+        out["stages"] = _stage_totals()
+        out["requests"] = {"feed_server": feeds_srv.requests, "llm_server": llm.requests}
+
+        # read path through the Flask app
+        from app import create_app
+        client = create_app().test_client()
+        preset_arg = ",".join(names)
+
+        def get(path):
+            resp = client.get(path)
+            assert resp.status_code == 200, (path, resp.status_code)
+
+        out["read"] = {
+            "news_latest": measure(lambda: get(f"/api/news/latest?preset={preset_arg}&max_news=20"),
+                                   repeat=read_repeat),
+            "news_history": measure(lambda: get("/api/news/history?limit=50&min_risk=3"), repeat=read_repeat),
+            "search": measure(lambda: get("/api/search?q=deprem%20enkaz&limit=20"), repeat=read_repeat),
+        }
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end ingest scenario")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(__file__), "corpus"))
+    parser.add_argument("--feeds", type=int, default=5)
+    parser.add_argument("--db-rows", type=int, default=0)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="stub LLM seconds per request")
+    parser.add_argument("--max-items", type=int, default=8)
+    parser.add_argument("--read-repeat", type=int, default=30)
+    parser.add_argument("--out", default="-", help="JSON output file (default: stdout)")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="bench_e2e_")
+    # before any services import: modules read their settings at import time
+    os.environ.update(DB_URL=f"sqlite:///{os.path.join(db_dir, 'news.db')}", ANALYSIS_CACHE="0",
+                      ALERT_SINKS="log", STREAM_POLL_SECONDS="3600")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bench import corpus
+    from bench.harness import write_json
+    corpus.ensure(args.corpus)
+    write_json(run(args.corpus, args.feeds, args.db_rows, args.llm_latency, args.max_items,
+                   args.read_repeat), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Provider brownout scenario: a primary and a backup stub LLM behind the router.
+
+    python -m bench.failover --calls 25
+
+Runs analyze_batch_structured through four phases (healthy, primary slow,
+primary failing, primary recovered) and reports latency and which provider
+answered in each. Writes one JSON object.
+"""
+import os, sys, time, argparse, tempfile
+from collections import Counter
+
+PHASES = [
+    # name, primary latency, primary fail rate
+    ("healthy", 0.2, 0.0),
+    ("brownout", 6.0, 0.0),
+    ("outage", 0.05, 1.0),
+    ("recovered", 0.2, 0.0),
+]
+
+
+def run(corpus_root: str, calls: int, batch: int) -> dict:
+    from bench import corpus
+    from bench.harness import summarize
+    from bench.micro import _article_texts
+    from bench.servers import StubLLMServer
+
+    texts = _article_texts(corpus_root, corpus.load(corpus_root), calls * batch * len(PHASES))
+    with StubLLMServer(latency=0.2, jitter=0.1) as primary, \
+            StubLLMServer(latency=0.3, jitter=0.1, seed=8) as backup:
+        os.environ.update(
+            PROVIDERS="openai,openai_backup",
+            OPENAI_API_KEY="bench", OPENAI_BASE_URL=f"{primary.base}/v1",
+            OPENAI_BACKUP_API_KEY="bench", OPENAI_BACKUP_BASE_URL=f"{backup.base}/v1",
+            OPENAI_RPM="100000", OPENAI_TPM="100000000",
+            OPENAI_BACKUP_RPM="100000", OPENAI_BACKUP_TPM="100000000")
+        from storage.db import init_db
+        from services.analyzer import analyze_batch_structured, get_router
+        init_db()
+        router = get_router()
+
+        out, offset = {}, 0
+        for name, latency, fail_rate in PHASES:
+            primary.latency, primary.fail_rate = latency, fail_rate
+            if name == "recovered":
+                # let the breaker's cooldown pass so the half-open probe can go out
+                time.sleep(router.breakers["openai"].cooldown)
+            samples, answered = [], Counter()
+            for _ in range(calls):
+                chunk = texts[offset:offset + batch]
+                offset += batch
+                t0 = time.perf_counter()
+                results = analyze_batch_structured(chunk)
+                samples.append(time.perf_counter() - t0)
+                answered.update(r.get("provider") for r in results)
+            out[name] = dict(summarize(samples, batch), max_ms=round(max(samples) * 1000, 4),
+                             providers=dict(answered), breakers=router.stats())
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provider brownout scenario")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(__file__), "corpus"))
+    parser.add_argument("--calls", type=int, default=25, help="batches per phase")
+    parser.add_argument("--batch", type=int, default=4)
+    parser.add_argument("--out", default="-", help="JSON output file (default: stdout)")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="bench_failover_")
+    # before any services import: modules read their settings at import time
+    os.environ.update(DB_URL=f"sqlite:///{os.path.join(db_dir, 'news.db')}", ANALYSIS_CACHE="0",
+                      BREAKER_COOLDOWN_SECONDS="3", BREAKER_SLOW_SECONDS="2",
+                      PROVIDER_DEADLINE_SECONDS="10")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bench import corpus
+    from bench.harness import write_json
+    corpus.ensure(args.corpus)
+    write_json({"phases": run(args.corpus, args.calls, args.batch)}, args.out)
+
+
+if __name__ == "__main__":
+    main()
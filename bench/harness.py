@@ -0,0 +1,114 @@
+"""Timing and comparison helpers shared by the benchmark suites."""
+import gc, sys, json, time, statistics
+
+
+def percentile(values: list, q: float) -> float:
+    if not values:
+        return 0.0
+    xs = sorted(values)
+    k = (len(xs) - 1) * q
+    lo, hi = int(k), min(int(k) + 1, len(xs) - 1)
+    return xs[lo] + (xs[hi] - xs[lo]) * (k - lo)
+
+
+def summarize(samples: list, items: int = 1) -> dict:
+    """Latency stats in ms for per-call ``samples`` (seconds), each covering ``items``."""
+    total = sum(samples)
+    return {
+        "n": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 4) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 0.5) * 1000, 4),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 4),
+        "min_ms": round(min(samples) * 1000, 4) if samples else 0.0,
+        "items_per_s": round(len(samples) * items / total, 2) if total else 0.0,
+    }
+
+
+def measure(fn, repeat=20, warmup=2, items=1, setup=None) -> dict:
+    """Call ``fn`` ``repeat`` times after ``warmup`` calls; ``setup`` runs untimed before each."""
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    gc.collect()
+    for _ in range(repeat):
+        if setup:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return summarize(samples, items)
+
+
+def peak_memory_kb(fn) -> float:
+    """Peak Python heap allocated while ``fn`` runs."""
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+# ------------------------------
+# COMPARISON
+# ------------------------------
+
+# metric name suffixes and whether a larger value is better
+_DIRECTIONS = (("_per_s", True), ("_ms", False), ("_seconds", False), ("_kb", False))
+
+
+def _direction(name: str):
+    for suffix, higher in _DIRECTIONS:
+        if name.endswith(suffix):
+            return higher
+    return None
+
+
+def flatten(results: dict, prefix="") -> dict:
+    out = {}
+    for k, v in results.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(flatten(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = v
+    return out
+
+
+def compare(current: dict, baseline: dict, threshold=0.10) -> list:
+    """``(metric, baseline, current, change, regressed)`` for every comparable metric.
+
+    ``change`` is the relative change in the good direction (positive means
+    faster); a metric regresses when it is worse by more than ``threshold``.
+    """
+    cur, base = flatten(current), flatten(baseline)
+    rows = []
+    for key in sorted(cur.keys() & base.keys()):
+        higher = _direction(key)
+        if higher is None or key.endswith(("min_ms", ".n")):
+            continue
+        b, c = base[key], cur[key]
+        if not b:
+            continue
+        change = (c - b) / b if higher else (b - c) / b
+        rows.append((key, b, c, round(change, 4), change < -threshold))
+    return rows
+
+
+def load_json(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(obj, path: str):
+    """Write ``obj`` to ``path``, or to stdout for "-"."""
+    if path == "-":
+        json.dump(obj, sys.stdout, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=1)
@@ -0,0 +1,119 @@
+"""Per-stage micro-benchmarks. Run through bench.run, or:
+
+    python -m bench.micro --corpus bench/corpus --db /tmp/bench_micro.db
+
+Writes one JSON object with a stats entry per stage (see harness.summarize).
+"""
+import os, re, sys, argparse, html, datetime
+
+
+def _article_texts(root: str, manifest: dict, limit: int) -> list:
+    texts = []
+    for entry in manifest["feeds"].values():
+        for rel in entry["articles"].values():
+            with open(os.path.join(root, rel), encoding="utf-8", errors="replace") as f:
+                page = f.read()
+            paras = re.findall(r"<p>(.*?)</p>", page, re.S)
+            texts.append(html.unescape(" ".join(paras)))
+            if len(texts) >= limit:
+                return texts
+    return texts
+
+
+def _records(texts: list, tag: str) -> list:
+    return [{
+        "title": t[:80], "source": f"http://bench.invalid/{tag}/{i}", "datetime": "",
+        "category": "Other", "sentiment": "Neutral", "toxicity": 0.1,
+        "keywords": t.split()[:8], "entities": [], "risk_point": i % 10, "content": t,
+    } for i, t in enumerate(texts)]
+
+
+def run(root: str, repeat: int) -> dict:
+    from bench import corpus
+    from bench.harness import measure, peak_memory_kb
+    from bench.servers import CorpusServer
+
+    from storage.db import init_db
+    init_db()
+    manifest = corpus.load(root)
+    texts = _article_texts(root, manifest, 200)
+    results = {}
+
+    # --- rule-based analysis and scoring
+    from services.ai_providers import mock_provider
+    from services.scoring import compute_risk
+    results["mock_analyze"] = measure(
+        lambda: [mock_provider.analyze(t) for t in texts], repeat=repeat, items=len(texts),
+        setup=mock_provider.term_hits.cache_clear)
+    results["mock_analyze_batch"] = measure(
+        lambda: mock_provider.analyze_batch(texts), repeat=repeat, items=len(texts),
+        setup=mock_provider.term_hits.cache_clear)
+    analyses = [mock_provider.analyze(t) for t in texts]
+    results["compute_risk"] = measure(
+        lambda: [compute_risk(t, a) for t, a in zip(texts, analyses)], repeat=repeat,
+        items=len(texts), setup=mock_provider.term_hits.cache_clear)
+
+    # --- near-duplicate signatures
+    from services.dedup import minhash
+    results["minhash"] = measure(lambda: [minhash(t) for t in texts], repeat=repeat, items=len(texts))
+
+    # --- feed fetch + parse over local HTTP
+    from services.scraper import fetch_feed
+    with CorpusServer(root, manifest) as srv:
+        names = sorted(manifest["feeds"], key=lambda n: -len(manifest["feeds"][n]["articles"]))
+        big, small = names[0], names[-1]
+        for label, name in (("fetch_feed_small", small), ("fetch_feed_big", big)):
+            url = srv.feed_url(name)
+            results[label] = measure(lambda: fetch_feed(url, max_items=8), repeat=repeat)
+            results[label]["entries"] = len(manifest["feeds"][name]["articles"])
+            results[label]["peak_kb"] = peak_memory_kb(lambda: fetch_feed(url, max_items=8))
+
+        # --- article extraction (download + parse)
+        try:
+            import newspaper  # noqa: F401
+        except ImportError:
+            results["extract_articles"] = {"skipped": "newspaper not installed"}
+        else:
+            from services.extractor import extract_articles
+            ids = list(manifest["feeds"][small]["articles"])[:8]
+            urls = [f"{srv.base}/articles/{i}.html" for i in ids]
+            results["extract_articles"] = measure(lambda: extract_articles(urls), repeat=max(3, repeat // 4),
+                                                  warmup=1, items=len(urls))
+
+    # --- storage: bulk upsert and search
+    from storage.db import save_news_items
+    from storage.search import search_news
+    batch = {"n": 0}
+
+    def write_batch():
+        batch["n"] += 1
+        save_news_items(_records(texts[:100], f"w{batch['n']}"))
+    results["save_news_items_100"] = measure(write_batch, repeat=repeat, items=100)
+    results["search_news"] = measure(lambda: search_news("deprem enkaz", limit=20), repeat=repeat)
+    results["search_news"]["rows"] = batch["n"] * 100
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage micro-benchmarks")
+    parser.add_argument("--corpus", default=os.path.join(os.path.dirname(__file__), "corpus"))
+    parser.add_argument("--db", default="/tmp/bench_micro.db")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--out", default="-", help="JSON output file (default: stdout)")
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    # before any services import: modules read their settings at import time
+    os.environ.update(DB_URL=f"sqlite:///{args.db}", PROVIDER="mock", ANALYSIS_CACHE="0")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from bench import corpus
+    corpus.ensure(args.corpus)
+    started = datetime.datetime.utcnow().isoformat()
+    out = {"started": started, "stages": run(args.corpus, args.repeat)}
+    from bench.harness import write_json
+    write_json(out, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Benchmark runner.
+
+    python -m bench.run                      # every suite -> bench/results/<time>.json
+    python -m bench.run --quick              # small matrix for a quick check
+    python -m bench.run --suite failover     # provider brownout / breaker scenario
+    python -m bench.run --suite startup      # import time and cold first request
+    python -m bench.run --baseline bench/results/base.json --fail-on-regression
+
+Each suite runs in its own process against a fresh temporary database. With
+``--baseline`` every comparable metric is printed next to the baseline value
+and metrics more than ``--threshold`` worse are flagged.
+"""
+import os, sys, json, time, platform, argparse, tempfile, subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+FEED_COUNTS = [5, 20]
+DB_ROWS = [0, 20000]
+
+
+def _run_module(module: str, args: list) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".json", prefix="bench_")
+    os.close(fd)
+    try:
+        cmd = [sys.executable, "-m", module, "--out", path] + [str(a) for a in args]
+        print("[bench]", " ".join(cmd[2:]))
+        subprocess.run(cmd, cwd=ROOT, check=True)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_suites(suite: str, quick: bool, corpus_root: str, llm_latency: float) -> dict:
+    out = {}
+    if suite in ("micro", "all"):
+        db = os.path.join(tempfile.gettempdir(), "bench_micro.db")
+        out["micro"] = _run_module("bench.micro", ["--corpus", corpus_root, "--db", db,
+                                                   "--repeat", 5 if quick else 20])["stages"]
+    if suite in ("e2e", "all"):
+        out["e2e"] = {}
+        for n_feeds in FEED_COUNTS[:1] if quick else FEED_COUNTS:
+            for rows in DB_ROWS[:1] if quick else DB_ROWS:
+                out["e2e"][f"feeds{n_feeds}_rows{rows}"] = _run_module("bench.e2e", [
+                    "--corpus", corpus_root, "--feeds", n_feeds, "--db-rows", rows,
+                    "--llm-latency", llm_latency, "--read-repeat", 10 if quick else 30])
+    if suite in ("failover", "all"):
+        out["failover"] = _run_module("bench.failover", ["--corpus", corpus_root])["phases"]
+    if suite in ("startup", "all"):
+        out["startup"] = _run_module("bench.startup", ["--repeat", 5 if quick else 20])
+    return out
+
+
+def print_comparison(rows: list, threshold: float):
+    if not rows:
+        print("[bench] nothing comparable in the baseline")
+        return
+    width = max(len(r[0]) for r in rows)
+    print(f"{'metric':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}")
+    for key, base, cur, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{key:<{width}}  {base:>12.4g}  {cur:>12.4g}  {change:>+8.1%}{flag}")
+    n = sum(1 for r in rows if r[4])
+    print(f"[bench] {len(rows)} metrics compared, {n} worse than {threshold:.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suites")
+    parser.add_argument("--suite", choices=["micro", "e2e", "failover", "startup", "all"], default="all")
+    parser.add_argument("--quick", action="store_true", help="fewer repeats, smallest e2e scenario only")
+    parser.add_argument("--corpus", default=os.path.join(HERE, "corpus"))
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--out", help="results file (default: bench/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold (0.10 = 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from bench import corpus
+    from bench.harness import compare, load_json, write_json
+    corpus.ensure(args.corpus)
+
+    results = {
+        "meta": {"git_rev": _git_rev(), "python": platform.python_version(),
+                 "platform": platform.platform(), "cpus": os.cpu_count(),
+                 "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "quick": args.quick,
+                 "llm_latency_s": args.llm_latency},
+    }
+    results.update(run_suites(args.suite, args.quick, args.corpus, args.llm_latency))
+
+    out = args.out
+    if not out:
+        os.makedirs(os.path.join(HERE, "results"), exist_ok=True)
+        out = os.path.join(HERE, "results", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    write_json(results, out)
+    print(f"[bench] results written to {out}")
+
+    if args.baseline:
+        baseline = load_json(args.baseline)
+        rows = compare({k: v for k, v in results.items() if k != "meta"},
+                       {k: v for k, v in baseline.items() if k != "meta"}, args.threshold)
+        print_comparison(rows, args.threshold)
+        if args.fail_on_regression and any(r[4] for r in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Local HTTP stand-ins for the benchmark: feed publishers and an LLM API."""
+import json, time, random, hashlib, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.corpus import BASE_PLACEHOLDER
+
+
+class _Server:
+    def __init__(self, handler):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.owner = self
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Quiet(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # headers and body go out in separate writes; without this keep-alive
+    # clients stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", ctype="text/plain", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CorpusServer(_Server):
+    """Serves a corpus directory: /feeds/<name>.xml and /articles/<id>.html.
+
+    Feeds answer conditional GETs with 304 on a matching ETag. ``latency``
+    seconds are added to every response to stand in for the network.
+    """
+
+    def __init__(self, root: str, manifest: dict, latency=0.0):
+        import os
+        self.latency = latency
+        self.files = {}
+        for name, entry in manifest["feeds"].items():
+            self.files[f"/feeds/{name}.xml"] = os.path.join(root, entry["file"])
+            for art_id, rel in entry["articles"].items():
+                self.files[f"/articles/{art_id}.html"] = os.path.join(root, rel)
+        self._cache = {}
+        super().__init__(_CorpusHandler)
+
+    def feed_url(self, name: str) -> str:
+        return f"{self.base}/feeds/{name}.xml"
+
+    def body(self, path: str):
+        if path not in self._cache:
+            with open(self.files[path], "rb") as f:
+                data = f.read().replace(BASE_PLACEHOLDER.encode(), self.base.encode())
+            self._cache[path] = (data, '"%s"' % hashlib.sha1(data).hexdigest()[:16])
+        return self._cache[path]
+
+
+class _CorpusHandler(_Quiet):
+    def do_GET(self):
+        srv = self.server.owner
+        srv.count()
+        if srv.latency:
+            time.sleep(srv.latency)
+        path = self.path.split("?", 1)[0]
+        if path not in srv.files:
+            return self._send(404, b"not found")
+        data, etag = srv.body(path)
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, headers={"ETag": etag})
+        ctype = "application/rss+xml; charset=utf-8" if path.endswith(".xml") else "text/html; charset=utf-8"
+        self._send(200, data, ctype, {"ETag": etag})
+
+
+class StubLLMServer(_Server):
+    """OpenAI-compatible /v1/chat/completions answering with mock_provider output.
+
+    Each request sleeps ``latency`` seconds plus up to ``jitter`` more, a
+    ``throttle_rate`` fraction of requests get a 429 with Retry-After: 1 and
+    a ``fail_rate`` fraction a 500. A ``drop_rate`` fraction of batch items
+    is left out of the answer. All of these can be changed while serving
+    to stage brownouts. Point the app at it with OPENAI_BASE_URL=<base>/v1
+    and PROVIDER=openai.
+    """
+
+    def __init__(self, latency=0.2, jitter=0.1, throttle_rate=0.0, fail_rate=0.0, drop_rate=0.0, seed=7):
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self._rng = random.Random(seed)
+        self.items = 0
+        super().__init__(_LLMHandler)
+
+    def delay(self) -> float:
+        with self._lock:
+            return self.latency + self._rng.random() * self.jitter
+
+    def throttled(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.throttle_rate
+
+    def failed(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.fail_rate
+
+    def dropped(self) -> bool:
+        # no draw when off, so the other rates see the same sequence as before
+        with self._lock:
+            return self.drop_rate > 0 and self._rng.random() < self.drop_rate
+
+
+def _stub_analysis(text: str) -> dict:
+    from services.ai_providers import mock_provider
+    res = mock_provider.analyze(text)
+    return {k: res.get(k) for k in ("category", "sentiment", "toxicity", "keywords", "entities")}
+
+
+class _LLMHandler(_Quiet):
+    def do_POST(self):
+        srv = self.server.owner
+        srv.count()
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        time.sleep(srv.delay())
+        if srv.throttled():
+            return self._send(429, b'{"error": "rate limited"}', "application/json", {"Retry-After": "1"})
+        if srv.failed():
+            return self._send(500, b'{"error": "internal error"}', "application/json")
+        user = body["messages"][-1]["content"]
+        try:
+            items = json.loads(user)
+        except ValueError:
+            items = None
+        if isinstance(items, list):
+            content = {"results": [dict(_stub_analysis(it["text"]), index=it["index"])
+                                   for it in items if not srv.dropped()]}
+            n = len(items)
+        else:
+            content, n = _stub_analysis(user), 1
+        with srv._lock:
+            srv.items += n
+        reply = {"choices": [{"message": {"role": "assistant",
+                                          "content": json.dumps(content, ensure_ascii=False)}}]}
+        self._send(200, json.dumps(reply).encode(), "application/json")
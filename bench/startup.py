@@ -0,0 +1,91 @@
+"""Web process startup: import time, app factory and the first request.
+
+    python -m bench.startup --repeat 10
+
+Every sample is a fresh interpreter running ``import app``, ``create_app()``
+and one stored-records request, so nothing is warm. Also reports the
+slowest imports (``-X importtime``) and which heavy modules the factory
+pulled in, which should be none. Writes one JSON object.
+"""
+import os, re, sys, json, argparse, tempfile, subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# loaded on first use only; none of these belong in a bare create_app()
+HEAVY = ["sqlalchemy", "requests", "feedparser", "newspaper", "numpy",
+         "google.generativeai"]
+
+PROBE = """
+import sys, json, time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+flask_app = app.create_app()
+t2 = time.perf_counter()
+loaded = [m for m in %(heavy)r if m in sys.modules]
+resp = flask_app.test_client().get("/api/news/latest?preset=" + next(iter(app.PRESET_FEEDS)))
+t3 = time.perf_counter()
+assert resp.status_code == 200, resp.status_code
+print(json.dumps({"import": t1 - t0, "create_app": t2 - t1, "first_request": t3 - t2,
+                  "loaded": loaded}))
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def _top_imports(stderr: str, n: int) -> dict:
+    # outermost imports only, by cumulative time
+    top = []
+    for m in _IMPORTTIME.finditer(stderr):
+        if len(m.group(3)) == 1:
+            top.append((int(m.group(2)), m.group(4)))
+    top.sort(reverse=True)
+    return {name: round(us / 1000, 1) for us, name in top[:n]}
+
+
+def run(repeat: int, env: dict) -> dict:
+    from bench.harness import summarize
+
+    samples = {"import": [], "create_app": [], "first_request": []}
+    loaded, top = set(), {}
+    for i in range(repeat):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE % {"heavy": HEAVY}],
+                              cwd=ROOT, env=env, capture_output=True, text=True)
+        if proc.returncode:
+            sys.stderr.write(proc.stderr[-2000:])
+            raise SystemExit(f"startup probe failed ({proc.returncode})")
+        res = json.loads(proc.stdout.strip().splitlines()[-1])
+        for k in samples:
+            samples[k].append(res[k])
+        loaded.update(res["loaded"])
+        if i == 0:
+            top = _top_imports(proc.stderr, 10)
+    return {
+        "import_app": summarize(samples["import"]),
+        "create_app": summarize(samples["create_app"]),
+        "first_request": summarize(samples["first_request"]),
+        "heavy_after_create_app": sorted(loaded),
+        "top_imports_ms": top,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web process startup benchmark")
+    parser.add_argument("--repeat", type=int, default=10, help="fresh interpreters to start")
+    parser.add_argument("--out", default="-", help="JSON output file (default: stdout)")
+    args = parser.parse_args()
+
+    db_dir = tempfile.mkdtemp(prefix="bench_startup_")
+    env = dict(os.environ, DB_URL=f"sqlite:///{os.path.join(db_dir, 'news.db')}")
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "init-db"],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    sys.path.insert(0, ROOT)
+    from bench.harness import write_json
+    out = run(args.repeat, env)
+    if out["heavy_after_create_app"]:
+        print("[bench] create_app() imported:", ", ".join(out["heavy_after_create_app"]), file=sys.stderr)
+    write_json(out, args.out)
+
+
+if __name__ == "__main__":
+    main()
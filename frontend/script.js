@@ -65,14 +65,37 @@ function applyFilters() {
   renderNews(filtered);
 }
 
+let stream = null;
+
+function mergeNews(items) {
+  const bySource = new Map(currentNews.map(n => [n.source, n]));
+  items.forEach(n => bySource.set(n.source, n));
+  currentNews = [...bySource.values()]
+    .sort((a, b) => (b.risk_point ?? 0) - (a.risk_point ?? 0));
+}
+
+// live updates for the selected preset, starting right after the records already shown;
+// EventSource resends Last-Event-ID on reconnect
+function subscribe(preset, lastEventId) {
+  if (stream) stream.close();
+  const from = lastEventId ? `&last_event_id=${encodeURIComponent(lastEventId)}` : '';
+  stream = new EventSource(`/api/stream?preset=${encodeURIComponent(preset)}${from}`);
+  stream.addEventListener('news', ev => {
+    mergeNews([JSON.parse(ev.data)]);
+    applyFilters();
+  });
+}
+
 async function fetchAndRender() {
   newsList.innerHTML = '<p class="col-span-full text-center text-gray-500 text-lg">Loading...</p>';
   try {
     const preset = presetSelect.value;
-    const r = await fetch(`/api/news?preset=${encodeURIComponent(preset)}&max_news=8&fast=1`);
+    const r = await fetch(`/api/news/latest?preset=${encodeURIComponent(preset)}&max_news=20`);
     const j = await r.json();
-    currentNews = j.data || [];
+    currentNews = [];
+    mergeNews(j.data || []);
     applyFilters();
+    subscribe(preset, r.headers.get('X-Last-Event-ID'));
   } catch (e) {
     newsList.innerHTML = `<p class="col-span-full text-center text-red-500 text-lg">Error: ${e.message}</p>`;
   }
@@ -81,6 +104,7 @@ async function fetchAndRender() {
 searchInput.addEventListener('input', applyFilters);
 categoryFilter.addEventListener('change', applyFilters);
 sentimentFilter.addEventListener('change', applyFilters);
+presetSelect.addEventListener('change', fetchAndRender);
 refreshBtn.addEventListener('click', fetchAndRender);
 
 document.addEventListener('DOMContentLoaded', fetchAndRender);
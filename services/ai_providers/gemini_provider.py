@@ -0,0 +1,135 @@
+import os, json, threading
+import google.generativeai as genai
+
+from services.rate_limit import get_limiter, estimate_tokens
+from services import metrics
+
+# Configure Gemini client
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # e.g. a local stub server
+if GEMINI_API_ENDPOINT:
+    genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                    client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+else:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+MODEL = "gemini-1.5-flash"
+PROMPT_VERSION = "1"  # bump when the prompt changes to invalidate cached results
+BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", 8))
+
+DEFAULT_SCHEMA = {
+    "sentiment": "Neutral",
+    "toxicity": 0.0,
+    "category": "General",
+    "keywords": [],
+    "entities": [],
+    "risk_flags": []
+}
+
+SCHEMA_TEXT = """{
+    "sentiment": "Positive/Neutral/Negative",
+    "toxicity": float,
+    "category": "string",
+    "keywords": ["list"],
+    "entities": ["list"],
+    "risk_flags": ["list"]
+}"""
+
+_limiter = get_limiter("gemini")
+_model = None
+_model_lock = threading.Lock()
+
+def _get_model():
+    # one client for the process instead of one per call
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                _model = genai.GenerativeModel(
+                    MODEL,
+                    generation_config={"response_mime_type": "application/json"},
+                )
+    return _model
+
+def _generate_json(prompt: str, n_items: int = 1):
+    _limiter.acquire(estimate_tokens(prompt, completion=300 * n_items))
+    op = "batch" if n_items > 1 else "analyze"
+    try:
+        with metrics.PROVIDER_CALL.time(provider="gemini", op=op):
+            response = _get_model().generate_content(prompt)
+    except Exception as e:
+        metrics.PROVIDER_ERRORS.inc(provider="gemini", op=op)
+        if type(e).__name__ == "ResourceExhausted":  # HTTP 429
+            metrics.PROVIDER_THROTTLED.inc(provider="gemini")
+            _limiter.pause(10)
+            e.retry_after = 10              # services.router may try once more
+        elif type(e).__name__ in ("ServiceUnavailable", "InternalServerError", "DeadlineExceeded"):
+            e.retry_after = 0.0
+        raise
+    cleaned = response.text.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.strip("`")
+        if cleaned.lower().startswith("json"):
+            cleaned = cleaned[4:]
+    return json.loads(cleaned)
+
+def _normalize(data) -> dict:
+    if not isinstance(data, dict):
+        raise ValueError("analysis is not a JSON object")
+    data.pop("index", None)
+    # Fill missing fields with defaults
+    for k, v in DEFAULT_SCHEMA.items():
+        if k not in data:
+            data[k] = list(v) if isinstance(v, list) else v
+    return data
+
+def analyze(text: str) -> dict:
+    """Analyze one text. Raises on failure so the analyzer can fall back."""
+    prompt = f"""
+    Analyze the following news text and respond ONLY in JSON following this schema:
+
+    {SCHEMA_TEXT}
+
+    Text:
+    {text}
+    """
+    try:
+        return _normalize(_generate_json(prompt))
+    except Exception as e:
+        print("[Analyzer] Gemini provider failed:", e)
+        raise
+
+def _analyze_chunk(texts: list) -> list:
+    items = [{"index": i, "text": t[:3000]} for i, t in enumerate(texts)]
+    prompt = f"""
+    Analyze each news text in the JSON array below on its own. Respond ONLY in JSON
+    as {{"results": [...]}} with one object per item: its "index" plus this schema:
+
+    {SCHEMA_TEXT}
+
+    Items:
+    {json.dumps(items, ensure_ascii=False)}
+    """
+    # no per-item retry of a failed request: the router moves on to the next provider
+    data = _generate_json(prompt, len(items))
+    by_index = {r.get("index"): r for r in data.get("results", []) if isinstance(r, dict)}
+    out = []
+    for i, t in enumerate(texts):
+        try:
+            out.append(_normalize(by_index[i]))
+        except Exception:
+            metrics.PROVIDER_FALLBACKS.inc(provider="gemini", to="single")
+            out.append(analyze(t))
+    return out
+
+def analyze_batch(texts: list) -> list:
+    """Analyze several texts with one request per BATCH_SIZE items.
+
+    Results come back in input order; any item the batch answer leaves out
+    or gets wrong is re-analyzed with its own call. Raises if a batch
+    request itself fails.
+    """
+    out = []
+    for start in range(0, len(texts), BATCH_SIZE):
+        out.extend(_analyze_chunk(texts[start:start + BATCH_SIZE]))
+    return out
@@ -1,4 +1,8 @@
 import re
+from functools import lru_cache
+
+from services.text_match import TermMatcher
+from services.scoring import CRITICAL_TERMS
 
 # minimal Turkish stopwords (extend as needed)
 STOP_TR = {
@@ -22,6 +26,7 @@ CAT_HINTS = {
 
 NEG_WORDS = {"ölü","yaralı","saldırı","terör","patlama","kriz","skandal","yolsuzluk","cinayet","düştü","açlık"}
 POS_WORDS = {"rekor","başarı","artış","iyileşme","destek","barış","kurtarıldı","kazan"}
+TOXIC_WORDS = ["terör","saldırı","bomba","nefret","hakaret","ölü","cinayet","soykırım","şiddet"]
 URL_PAT = re.compile(r'https?://\S+|www\.\S+', re.IGNORECASE)
 DOMAIN_PAT = re.compile(r'\b[a-z0-9.-]+\.(com|net|org|tr|gov|edu)(/\S*)?', re.IGNORECASE)
 TOKEN_PAT = re.compile(r"[A-Za-zÇĞİÖŞÜçğıöşü]{3,}", re.UNICODE)
@@ -38,48 +43,67 @@ def _tokens(text: str):
             continue
         yield w
 
+# every term the rule-based path and scoring.compute_risk look for, compiled once
+MATCHER = TermMatcher(
+    set().union(*CAT_HINTS.values())
+    | NEG_WORDS | POS_WORDS | set(TOXIC_WORDS)
+    | {term for term, _ in CRITICAL_TERMS}
+)
+
+@lru_cache(maxsize=1024)
+def term_hits(text: str) -> frozenset:
+    """All dictionary terms in the cleaned, lowercased text (one scan, memoized)."""
+    return MATCHER.find((_clean_text(text) or "").lower())
+
 def extract_keywords(text: str, top_k: int = 8):
-    freq = {}
-    for w in _tokens(_clean_text(text)):
-        freq[w] = freq.get(w, 0) + 1
-    # drop ultra-generic junk that sometimes sneaks in
-    bad = {"https","http","trthaberstatic","resimler","haber","son","dakika","video","foto"}
-    for b in bad: freq.pop(b, None)
-    # sort by frequency then by length (favor informative longer words)
-    items = sorted(freq.items(), key=lambda x: (-x[1], -len(x[0])))
-    return [w for w,_ in items[:top_k]]
-
-def infer_category(text: str) -> str:
-    low = (_clean_text(text) or "").lower()
+    # ranked against the shared corpus statistics; a one-off text does not update them
+    from services import keywords
+    return keywords.extract([text], top_k=top_k, learn=False)[0]
+
+def infer_category(text: str, hits: frozenset = None) -> str:
+    hits = term_hits(text) if hits is None else hits
     best_cat, best_hits = "Other", 0
     for cat, words in CAT_HINTS.items():
-        hits = sum(1 for w in words if w in low)
-        if hits > best_hits:
-            best_cat, best_hits = cat, hits
+        n = len(words & hits)
+        if n > best_hits:
+            best_cat, best_hits = cat, n
     return best_cat if best_hits else "Other"
 
-def infer_sentiment(text: str) -> str:
-    low = (_clean_text(text) or "").lower()
-    neg = any(w in low for w in NEG_WORDS)
-    pos = any(w in low for w in POS_WORDS)
+def infer_sentiment(text: str, hits: frozenset = None) -> str:
+    hits = term_hits(text) if hits is None else hits
+    neg = not NEG_WORDS.isdisjoint(hits)
+    pos = not POS_WORDS.isdisjoint(hits)
     if neg and not pos: return "Negative"
     if pos and not neg: return "Positive"
     return "Neutral"
 
-def infer_toxicity(text: str) -> float:
-    low = (_clean_text(text) or "").lower()
+def infer_toxicity(text: str, hits: frozenset = None) -> float:
+    hits = term_hits(text) if hits is None else hits
     base = 0.05
     bumps = 0.0
-    for w in ["terör","saldırı","bomba","nefret","hakaret","ölü","cinayet","soykırım","şiddet"]:
-        if w in low: bumps += 0.15
+    for w in TOXIC_WORDS:
+        if w in hits: bumps += 0.15
     return float(max(0.0, min(1.0, base + bumps)))
 
-def analyze(text: str) -> dict:
-    kw = extract_keywords(text or "")
+def _analysis(text: str, kw: list) -> dict:
+    hits = term_hits(text)
     return {
-        "category": infer_category(text or ""),
-        "sentiment": infer_sentiment(text or ""),
-        "toxicity": round(infer_toxicity(text or ""), 2),
+        "category": infer_category(text, hits),
+        "sentiment": infer_sentiment(text, hits),
+        "toxicity": round(infer_toxicity(text, hits), 2),
         "keywords": kw,
-        "entities": []  # mock provider doesn’t do NER
+        "entities": [],  # mock provider doesn’t do NER
+        "provider": "mock",
     }
+
+def analyze(text: str) -> dict:
+    return _analysis(text or "", extract_keywords(text or ""))
+
+def analyze_batch(texts: list) -> list:
+    """analyze() for a whole sweep, ranking keywords in one vectorized pass.
+
+    The batch counts towards the corpus statistics keywords are ranked by.
+    """
+    from services import keywords
+    texts = [t or "" for t in texts]
+    return [_analysis(t, kw) for t, kw in zip(texts, keywords.extract(texts))]
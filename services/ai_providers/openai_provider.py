@@ -1,48 +1,159 @@
-import os, json, re, requests
-from tenacity import retry, stop_after_attempt, wait_exponential
+import os, json, re, threading, requests
+
+from services.rate_limit import get_limiter, estimate_tokens
+from services import metrics
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+MODEL = "gpt-4o-mini"
+PROMPT_VERSION = "1"  # bump when the prompt changes to invalidate cached results
+BATCH_SIZE = int(os.getenv("OPENAI_BATCH_SIZE", 8))
+TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 30))
+
+SYSTEM_PROMPT = (
+    "You are a Turkish news analysis API. Return ONLY valid JSON with keys:\n"
+    "category (one of: Politics, Economy, Technology, Sports, Health, World, Local, Culture, Crime, Disaster, Other),\n"
+    "sentiment (Positive|Neutral|Negative),\n"
+    "toxicity (float 0-1),\n"
+    "keywords (array of up to 8 lowercase Turkish keywords),\n"
+    "entities (array of objects: {text, type}), where type in [PERSON, ORG, LOC, EVENT].\n"
+    "Text is in Turkish.\n"
+)
+BATCH_PROMPT = SYSTEM_PROMPT + (
+    "The input is a JSON array of items {index, text}. Analyze each item on its own and "
+    'return {"results": [...]} with one object per item carrying its "index" and the keys above.\n'
+)
 
 def _mask_pii(text: str) -> str:
     text = re.sub(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}', '[EMAIL]', text)
     text = re.sub(r'(\+?\d[\d\s\-()]{7,}\d)', '[PHONE]', text)
     return text
 
-@retry(stop=stop_after_attempt(4), wait=wait_exponential(multiplier=1, min=1, max=8))
-def analyze(text: str) -> dict:
-    if not OPENAI_API_KEY:
-        raise RuntimeError("OPENAI_API_KEY is not set")
-    masked = _mask_pii(text)
-    prompt = (
-        "You are a Turkish news analysis API. Return ONLY valid JSON with keys:\n"
-        "category (one of: Politics, Economy, Technology, Sports, Health, World, Local, Culture, Crime, Disaster, Other),\n"
-        "sentiment (Positive|Neutral|Negative),\n"
-        "toxicity (float 0-1),\n"
-        "keywords (array of up to 8 lowercase Turkish keywords),\n"
-        "entities (array of objects: {text, type}), where type in [PERSON, ORG, LOC, EVENT].\n"
-        "Text is in Turkish.\n"
-    )
-    payload = {
-      "model": "gpt-4o-mini",
-      "temperature": 0.2,
-      "response_format": {"type": "json_object"},
-      "messages": [
-        {"role": "system", "content": prompt},
-        {"role": "user", "content": masked[:6000]}
-      ]
-    }
-    resp = requests.post(
-        "https://api.openai.com/v1/chat/completions",
-        headers={"Authorization": f"Bearer {OPENAI_API_KEY}","Content-Type":"application/json"},
-        data=json.dumps(payload),
-        timeout=30
-    )
-    resp.raise_for_status()
-    content = resp.json()["choices"][0]["message"]["content"]
-    data = json.loads(content)
+def _retry_after(resp) -> float:
+    try:
+        return float(resp.headers.get("Retry-After", 5))
+    except ValueError:
+        return 5.0
+
+def _transient(e, resp) -> bool:
+    # worth one more try: no answer at all, a 429 or a 5xx
+    if not isinstance(e, requests.RequestException):
+        return False
+    return resp is None or resp.status_code == 429 or resp.status_code >= 500
+
+def _normalize(data) -> dict:
+    if not isinstance(data, dict):
+        raise ValueError("analysis is not a JSON object")
     data["toxicity"] = float(max(0.0, min(1.0, data.get("toxicity", 0.0))))
     data["keywords"] = [k.strip().lower() for k in data.get("keywords", [])][:8]
     data["category"] = data.get("category", "Other")
     data["sentiment"] = data.get("sentiment", "Neutral")
     data["entities"] = data.get("entities", [])
+    data.pop("index", None)
     return data
+
+class Client:
+    """One OpenAI-compatible endpoint.
+
+    The module-level analyze/analyze_batch use the "openai" client. Other
+    names (e.g. "openai_backup" in PROVIDERS) read <NAME>_BASE_URL,
+    <NAME>_API_KEY, <NAME>_MODEL and <NAME>_TIMEOUT, and get their own rate
+    limiter and metric labels. MODEL and PROMPT_VERSION mirror the provider
+    modules' attributes for the analysis cache key.
+    """
+
+    PROMPT_VERSION = PROMPT_VERSION
+
+    def __init__(self, name: str = "openai"):
+        env = name.upper()
+        self.name = name
+        self.api_key = os.getenv(f"{env}_API_KEY", OPENAI_API_KEY if name == "openai" else "")
+        self.base_url = os.getenv(f"{env}_BASE_URL", OPENAI_BASE_URL).rstrip("/")
+        self.MODEL = os.getenv(f"{env}_MODEL", MODEL)
+        self.timeout = float(os.getenv(f"{env}_TIMEOUT", TIMEOUT))
+        self.limiter = get_limiter(name)
+
+    def _complete(self, system: str, user: str, n_items: int = 1) -> dict:
+        if not self.api_key:
+            raise RuntimeError(f"{self.name.upper()}_API_KEY is not set")
+        payload = {
+          "model": self.MODEL,
+          "temperature": 0.2,
+          "response_format": {"type": "json_object"},
+          "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": user}
+          ]
+        }
+        self.limiter.acquire(estimate_tokens(system, user, completion=300 * n_items))
+        op = "batch" if n_items > 1 else "analyze"
+        resp, retry_after = None, 0.0
+        try:
+            with metrics.PROVIDER_CALL.time(provider=self.name, op=op):
+                resp = requests.post(
+                    f"{self.base_url}/chat/completions",
+                    headers={"Authorization": f"Bearer {self.api_key}","Content-Type":"application/json"},
+                    data=json.dumps(payload),
+                    timeout=self.timeout
+                )
+            if resp.status_code == 429:
+                # back everyone off instead of letting each caller hit the wall
+                metrics.PROVIDER_THROTTLED.inc(provider=self.name)
+                retry_after = _retry_after(resp)
+                self.limiter.pause(retry_after)
+            resp.raise_for_status()
+        except Exception as e:
+            metrics.PROVIDER_ERRORS.inc(provider=self.name, op=op)
+            if _transient(e, resp):
+                e.retry_after = retry_after     # services.router may try once more
+            raise
+        content = resp.json()["choices"][0]["message"]["content"]
+        return json.loads(content)
+
+    def analyze(self, text: str) -> dict:
+        """One request: services.router retries, fails over and owns the deadline."""
+        masked = _mask_pii(text)
+        return _normalize(self._complete(SYSTEM_PROMPT, masked[:6000]))
+
+    def _analyze_chunk(self, texts: list) -> list:
+        items = [{"index": i, "text": _mask_pii(t)[:3000]} for i, t in enumerate(texts)]
+        # a failed request propagates so services.router can fail over
+        data = self._complete(BATCH_PROMPT, json.dumps(items, ensure_ascii=False), len(items))
+        by_index = {r.get("index"): r for r in data.get("results", []) if isinstance(r, dict)}
+        out = []
+        for i, t in enumerate(texts):
+            try:
+                out.append(_normalize(by_index[i]))
+            except Exception:
+                # missing or malformed entry: pay for a single call
+                metrics.PROVIDER_FALLBACKS.inc(provider=self.name, to="single")
+                out.append(self.analyze(t))
+        return out
+
+    def analyze_batch(self, texts: list) -> list:
+        """Analyze several texts with one request per BATCH_SIZE items.
+
+        Results come back in input order; any item the batch answer leaves out
+        or gets wrong is re-analyzed with its own call. Raises if a batch
+        request itself fails.
+        """
+        out = []
+        for start in range(0, len(texts), BATCH_SIZE):
+            out.extend(self._analyze_chunk(texts[start:start + BATCH_SIZE]))
+        return out
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def client(name: str = "openai") -> Client:
+    with _clients_lock:
+        c = _clients.get(name)
+        if c is None:
+            c = _clients[name] = Client(name)
+        return c
+
+
+analyze = client("openai").analyze
+analyze_batch = client("openai").analyze_batch
@@ -0,0 +1,232 @@
+import os, json, time, queue, smtplib, datetime, threading
+from email.message import EmailMessage
+from urllib.parse import urlparse
+
+from storage.db import list_user_emails
+from storage.stories import claim_alert
+from services import metrics
+
+DEDUP_WINDOW = float(os.getenv("ALERT_DEDUP_MINUTES", 360)) * 60
+QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", 1000))
+DEFAULT_RULES = [{"name": "high-risk", "min_risk": 8}]
+
+
+# ------------------------------
+# RULES
+# ------------------------------
+
+class AlertRule:
+    """Threshold rule over a scored record.
+
+    Every condition that is set must hold: ``min_risk``, ``categories``,
+    ``sources`` (host suffixes) and ``terms`` (any of them in the title or
+    keywords). ``sinks`` limits delivery to the named sinks.
+    """
+
+    def __init__(self, name, min_risk=None, categories=None, terms=None,
+                 sources=None, sinks=None):
+        self.name = name
+        self.min_risk = min_risk
+        self.categories = set(categories or [])
+        self.terms = [t.lower() for t in terms or []]
+        self.sources = [s.lower() for s in sources or []]
+        self.sinks = set(sinks or [])
+
+    def matches(self, rec: dict) -> bool:
+        if self.min_risk is not None and (rec.get("risk_point") or 0) < self.min_risk:
+            return False
+        if self.categories and rec.get("category") not in self.categories:
+            return False
+        if self.sources:
+            host = (urlparse(rec.get("source") or "").netloc or "").lower()
+            if not any(host == s or host.endswith("." + s) for s in self.sources):
+                return False
+        if self.terms:
+            hay = " ".join([rec.get("title") or ""] + list(rec.get("keywords") or [])).lower()
+            if not any(t in hay for t in self.terms):
+                return False
+        return True
+
+
+def load_rules() -> list:
+    """Rules from ALERT_RULES (JSON list) or ALERT_RULES_FILE, else DEFAULT_RULES."""
+    raw = os.getenv("ALERT_RULES")
+    path = os.getenv("ALERT_RULES_FILE")
+    if not raw and path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+    specs = json.loads(raw) if raw else DEFAULT_RULES
+    return [AlertRule(**spec) for spec in specs]
+
+
+# ------------------------------
+# SINKS
+# ------------------------------
+
+def _format(alert: dict) -> str:
+    rec = alert["record"]
+    return (f"[{alert['rule']}] risk {rec.get('risk_point')} "
+            f"{rec.get('category') or ''}: {rec.get('title')} ({rec.get('source')})")
+
+
+class LogSink:
+    name = "log"
+
+    def send(self, alert: dict):
+        print("[Alert]", _format(alert))
+
+
+class WebhookSink:
+    name = "webhook"
+
+    def __init__(self, url=None, timeout=10):
+        self.url = url or os.getenv("ALERT_WEBHOOK_URL")
+        self.timeout = timeout
+
+    def send(self, alert: dict):
+        import requests
+        resp = requests.post(self.url, json=alert, timeout=self.timeout)
+        resp.raise_for_status()
+
+
+class SmtpSink:
+    """Mails subscribers from user_emails plus any ALERT_EMAILS."""
+    name = "smtp"
+
+    def __init__(self):
+        self.host = os.getenv("SMTP_HOST", "localhost")
+        self.port = int(os.getenv("SMTP_PORT", 25))
+        self.user = os.getenv("SMTP_USER")
+        self.password = os.getenv("SMTP_PASSWORD")
+        self.sender = os.getenv("ALERT_FROM", "alerts@localhost")
+        self.extra = [e.strip() for e in os.getenv("ALERT_EMAILS", "").split(",") if e.strip()]
+
+    def send(self, alert: dict):
+        to = sorted(set(list_user_emails()) | set(self.extra))
+        if not to:
+            return
+        msg = EmailMessage()
+        msg["Subject"] = _format(alert)[:200]
+        msg["From"] = self.sender
+        msg["Bcc"] = ", ".join(to)
+        msg.set_content(json.dumps(alert, ensure_ascii=False, indent=2))
+        with smtplib.SMTP(self.host, self.port, timeout=15) as smtp:
+            if self.user:
+                smtp.starttls()
+                smtp.login(self.user, self.password)
+            smtp.send_message(msg)
+
+
+SINK_TYPES = {"log": LogSink, "webhook": WebhookSink, "smtp": SmtpSink}
+
+
+class SinkWorker:
+    """Bounded queue and thread per sink, so one slow sink delays nothing else."""
+
+    def __init__(self, sink, maxsize=QUEUE_SIZE):
+        self.sink = sink
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        threading.Thread(target=self._run, name=f"alert-{sink.name}", daemon=True).start()
+
+    def offer(self, alert: dict):
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            alert = self._queue.get()
+            try:
+                self.sink.send(alert)
+                self.sent += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[Alert] {self.sink.name} sink failed:", e)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "sent": self.sent,
+                "failed": self.failed, "dropped": self.dropped}
+
+
+# ------------------------------
+# ENGINE
+# ------------------------------
+
+class AlertEngine:
+    """Checks each new record against the rules and fans matches out to sinks.
+
+    Alerts are deduplicated per (rule, story) for DEDUP_WINDOW seconds
+    through the alert log table, so the worker processes that see copies of
+    one story fire once between them. evaluate() only enqueues, so
+    ingestion never waits on delivery.
+    """
+
+    def __init__(self, rules, sinks, window=DEDUP_WINDOW):
+        self.rules = rules
+        self.workers = {s.name: SinkWorker(s) for s in sinks}
+        self.window = window
+        self._lock = threading.Lock()
+        self.fired = 0
+        self.suppressed = 0
+
+    def _should_fire(self, key, now) -> bool:
+        rule, story = key
+        fire = claim_alert(rule, story, datetime.datetime.utcfromtimestamp(now), self.window)
+        with self._lock:
+            if fire:
+                self.fired += 1
+            else:
+                self.suppressed += 1
+        return fire
+
+    def evaluate(self, records: list):
+        now = time.time()
+        for rec in records:
+            for rule in self.rules:
+                if not rule.matches(rec):
+                    continue
+                story = rec.get("story_id") or rec.get("source") or rec.get("title")
+                if not self._should_fire((rule.name, story), now):
+                    metrics.ALERTS.inc(rule=rule.name, outcome="suppressed")
+                    continue
+                metrics.ALERTS.inc(rule=rule.name, outcome="fired")
+                alert = {"rule": rule.name, "time": now, "record": rec}
+                for name, worker in self.workers.items():
+                    if not rule.sinks or name in rule.sinks:
+                        worker.offer(alert)
+
+    def stats(self) -> dict:
+        return {
+            "fired": self.fired,
+            "suppressed": self.suppressed,
+            "sinks": {name: w.stats() for name, w in self.workers.items()},
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> AlertEngine:
+    """Engine built from ALERT_RULES* and ALERT_SINKS (default: log)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            names = [n.strip() for n in os.getenv("ALERT_SINKS", "log").split(",") if n.strip()]
+            _engine = AlertEngine(load_rules(), [SINK_TYPES[n]() for n in names])
+        return _engine
+
+
+def evaluate(records: list):
+    try:
+        get_engine().evaluate(records)
+    except Exception as e:
+        print("[Alert] evaluation failed:", e)
+
+
+def stats() -> dict:
+    return get_engine().stats() if _engine is not None else {}
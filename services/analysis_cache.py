@@ -0,0 +1,111 @@
+import os, time, hashlib, threading, unicodedata, re
+from collections import OrderedDict
+
+from storage.db import get_cached_analysis, save_cached_analysis
+from services import metrics
+
+MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_SIZE", 5000))
+TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL", 6 * 3600))
+DB_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_DB_TTL", 30 * 24 * 3600))
+ENABLED = os.getenv("ANALYSIS_CACHE", "1") == "1"
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    t = unicodedata.normalize("NFKC", text or "")
+    return _WS.sub(" ", t).strip()
+
+
+def cache_key(text: str, provider: str, model: str, prompt_version: str) -> str:
+    h = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+    return f"{provider}:{model}:{prompt_version}:{h}"
+
+
+class LRUCache:
+    """Thread-safe LRU with a size bound and a per-entry TTL."""
+
+    def __init__(self, maxsize=MAX_ENTRIES, ttl=TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            value, expires = hit
+            if expires < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._data)
+
+
+_memory = LRUCache()
+_counters = {"hits": 0, "db_hits": 0, "misses": 0}
+_counters_lock = threading.Lock()
+
+
+def _count(name):
+    with _counters_lock:
+        _counters[name] += 1
+    metrics.CACHE_LOOKUPS.inc(result=name)
+
+
+def lookup(key: str):
+    """Memory first, then the analysis_cache table; None on a miss."""
+    if not ENABLED:
+        return None
+    value = _memory.get(key)
+    if value is not None:
+        _count("hits")
+        return dict(value)
+    try:
+        value = get_cached_analysis(key, max_age=DB_TTL_SECONDS)
+    except Exception as e:
+        print("[AnalysisCache] lookup failed:", e)
+        value = None
+    if value is not None:
+        _count("db_hits")
+        _memory.put(key, value)
+        return dict(value)
+    _count("misses")
+    return None
+
+
+def store(key: str, analysis: dict):
+    if not ENABLED:
+        return
+    _memory.put(key, dict(analysis))
+    try:
+        save_cached_analysis(key, analysis)
+    except Exception as e:
+        print("[AnalysisCache] persist failed:", e)
+
+
+def stats() -> dict:
+    with _counters_lock:
+        out = dict(_counters)
+    out.update({
+        "size": len(_memory),
+        "evictions": _memory.evictions,
+        "expirations": _memory.expirations,
+    })
+    return out
@@ -1,26 +1,105 @@
-import os
+import os, threading
 from services.ai_providers import mock_provider
+from services import analysis_cache, metrics
 
 PROVIDER = os.getenv("PROVIDER", "mock").lower()
+# providers to try in order (failover and hedging, see services.router);
+# the rule-based mock answers when none of them can
+PROVIDERS = [p.strip().lower() for p in os.getenv("PROVIDERS", PROVIDER).split(",")
+             if p.strip() and p.strip().lower() != "mock"]
+
+_router = None
+_router_lock = threading.Lock()
+
+def _load_provider(name: str):
+    if name == "gemini":
+        from services.ai_providers import gemini_provider
+        return gemini_provider
+    if name == "openai" or name.startswith("openai_"):
+        # openai_<x> is another OpenAI-compatible endpoint configured by <NAME>_BASE_URL etc.
+        from services.ai_providers import openai_provider
+        return openai_provider.client(name)
+    raise ValueError(f"unknown provider '{name}'")
+
+def get_router():
+    """The process-wide provider router, or None when only the mock is configured."""
+    global _router
+    if _router is None and PROVIDERS:
+        with _router_lock:
+            if _router is None:
+                from services.router import Router
+                chain = []
+                for name in PROVIDERS:
+                    try:
+                        chain.append((name, _load_provider(name)))
+                    except Exception as e:
+                        print(f"[Analyzer] Provider {name} unavailable:", e)
+                        metrics.PROVIDER_FALLBACKS.inc(provider=name, to="skipped")
+                _router = Router(chain) if chain else False
+    return _router or None
+
+def _cache_key(router, text: str) -> str:
+    # key on normalized text plus whatever changes the chain's answer
+    chain = router.providers
+    return analysis_cache.cache_key(
+        text,
+        "+".join(name for name, _ in chain),
+        "+".join(getattr(p, "MODEL", "") for _, p in chain),
+        "+".join(getattr(p, "PROMPT_VERSION", "1") for _, p in chain),
+    )
+
+def _tag(result: dict, provider: str) -> dict:
+    return dict(result, provider=provider)
 
 def analyze_text_structured(text: str) -> dict:
-    # Use Google Gemini
-    if PROVIDER == "gemini":
-        try:
-            from services.ai_providers import gemini_provider
-            return gemini_provider.analyze(text)
-        except Exception as e:
-            print("[Analyzer] Falling back to mock provider:", e)
-            return mock_provider.analyze(text)
-
-    # Use OpenAI (if you switch back in the future)
-    if PROVIDER == "openai":
-        try:
-            from services.ai_providers import openai_provider
-            return openai_provider.analyze(text)
-        except Exception as e:
-            print("[Analyzer] Falling back to mock provider:", e)
-            return mock_provider.analyze(text)
-
-    # Default
-    return mock_provider.analyze(text)
+    """Analyze one text; the result's ``provider`` says who answered."""
+    router = get_router()
+    if router is None:
+        # rule-based, cheaper to recompute than to cache
+        return mock_provider.analyze(text)
+    key = _cache_key(router, text)
+    cached = analysis_cache.lookup(key)
+    if cached is not None:
+        return cached
+    name, result = router.call("analyze", text)
+    if name is None:
+        metrics.PROVIDER_FALLBACKS.inc(provider=PROVIDERS[0], to="mock")
+        return mock_provider.analyze(text)
+    result = _tag(result, name)
+    analysis_cache.store(key, result)
+    return result
+
+def analyze_batch_structured(texts: list) -> list:
+    """Analyze many texts, sending cache misses to the provider chain in batches.
+
+    Returns one analysis per text in input order. If no provider answers
+    the batch in time the misses get rule-based analyses.
+    """
+    router = get_router()
+    if router is None:
+        return mock_provider.analyze_batch(texts)
+
+    keys = [_cache_key(router, t) for t in texts]
+    out = [analysis_cache.lookup(k) for k in keys]
+    # identical texts in one batch only need one provider slot
+    misses = {}
+    for i, k in enumerate(keys):
+        if out[i] is None:
+            misses.setdefault(k, []).append(i)
+    if not misses:
+        return out
+
+    miss_texts = [texts[idxs[0]] for idxs in misses.values()]
+    name, results = router.call("analyze_batch", miss_texts)
+    if name is None:
+        print("[Analyzer] No provider answered, using rule-based analysis")
+        metrics.PROVIDER_FALLBACKS.inc(len(miss_texts), provider=PROVIDERS[0], to="mock")
+        results = mock_provider.analyze_batch(miss_texts)
+    else:
+        results = [_tag(r, name) for r in results]
+        for k, res in zip(misses, results):
+            analysis_cache.store(k, res)
+    for idxs, res in zip(misses.values(), results):
+        for i in idxs:
+            out[i] = dict(res)
+    return out
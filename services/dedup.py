@@ -0,0 +1,108 @@
+import os, random, hashlib, datetime, uuid
+
+from services.ai_providers.mock_provider import _tokens, _clean_text
+from services import metrics
+from storage import stories
+from storage.db import SessionLocal
+
+NUM_PERM = 64
+BANDS = 16                      # 16 bands x 4 rows: candidates from ~0.5 Jaccard up
+ROWS = NUM_PERM // BANDS
+THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.5))
+WINDOW = float(os.getenv("DEDUP_WINDOW_HOURS", 48)) * 3600
+MIN_TOKENS = 5                  # titles alone are too short to compare safely
+
+_P = (1 << 61) - 1
+_rng = random.Random(20240901)  # fixed seed: signatures stay comparable across restarts
+_PERMS = [(_rng.randrange(1, _P), _rng.randrange(0, _P)) for _ in range(NUM_PERM)]
+
+
+def shingles(text: str) -> set:
+    return set(_tokens(_clean_text(text)))
+
+
+def _h64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(text: str):
+    """MinHash signature of the text's token set, or None if it is too short."""
+    sh = shingles(text)
+    if len(sh) < MIN_TOKENS:
+        return None
+    hs = [_h64(s) for s in sh]
+    return tuple(min((a * h + b) % _P for h in hs) for a, b in _PERMS)
+
+
+def similarity(a: tuple, b: tuple) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+class StoryIndex:
+    """LSH index of the story clusters seen in the last WINDOW seconds.
+
+    Clusters live in the database (storage.stories), so every worker process
+    puts copies of a story under the same story_id. Each cluster keeps the
+    signature of its first member and, once known, the analysis every later
+    member inherits.
+    """
+
+    def __init__(self, threshold=THRESHOLD, window=WINDOW):
+        self.threshold = threshold
+        self.window = window
+
+    @staticmethod
+    def _keys(sig) -> list:
+        if sig is None:
+            return []
+        return [(b, hashlib.blake2b(repr(sig[b * ROWS:(b + 1) * ROWS]).encode(), digest_size=16).hexdigest())
+                for b in range(BANDS)]
+
+    def _best(self, candidates: dict, sig, exclude=None):
+        best, best_sim = None, 0.0
+        for sid, (csig, analysis) in candidates.items():
+            if sid == exclude or csig is None:
+                continue
+            sim = similarity(sig, csig)
+            if sim > best_sim:
+                best, best_sim = (sid, analysis), sim
+        return best if best_sim >= self.threshold else None
+
+    def _assign(self, s, sig, now, cutoff):
+        keys = self._keys(sig)
+        match = self._best(stories.story_candidates(s, keys, cutoff), sig) if keys else None
+        if match is None:
+            sid = uuid.uuid4().hex
+            stories.add_story(s, sid, sig, now)
+            if not keys or stories.claim_bands(s, sid, keys, now, cutoff):
+                return sid, None, True
+            # a bucket was claimed meanwhile, possibly by another worker creating this story
+            match = self._best(stories.story_candidates(s, keys, cutoff), sig, exclude=sid)
+            if match is None:
+                return sid, None, True
+            stories.drop_story(s, sid)
+        stories.grow_story(s, match[0])
+        return match[0], match[1], False
+
+    def assign_many(self, sigs: list) -> list:
+        """``(story_id, analysis, is_new)`` for each signature, in order."""
+        now = datetime.datetime.utcnow()
+        cutoff = now - datetime.timedelta(seconds=self.window)
+        out = []
+        with metrics.DB_WRITE.time(table="stories"), SessionLocal() as s:
+            for sig in sigs:
+                out.append(self._assign(s, sig, now, cutoff))
+                # commit per item: band claims hold other workers back until then
+                s.commit()
+        return out
+
+    def assign(self, sig):
+        """Return ``(story_id, analysis, is_new)`` for an item's signature."""
+        return self.assign_many([sig])[0]
+
+    def set_analysis(self, story_id: str, analysis: dict):
+        stories.save_story_analysis(story_id, analysis)
+
+
+story_index = StoryIndex()
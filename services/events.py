@@ -0,0 +1,135 @@
+import os, time, threading
+from collections import deque
+
+from storage import jobs
+
+BUFFER_SIZE = int(os.getenv("STREAM_BUFFER", 5000))
+HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", 15))
+POLL_INTERVAL = float(os.getenv("STREAM_POLL_SECONDS", 1.0))
+
+
+class Event:
+    __slots__ = ("id", "preset", "data")
+
+    def __init__(self, id, preset, data):
+        self.id = id
+        self.preset = preset
+        self.data = data
+
+
+def publish(preset, records: list):
+    """Announce new records on /api/stream, from any process."""
+    try:
+        jobs.append_events(preset, records)
+    except Exception as e:
+        print("[Stream] publish failed:", e)
+
+
+class EventBus:
+    """Fans stream_events rows out to the subscribers of this web process.
+
+    One thread tails the table by id and keeps the newest events in a ring
+    buffer. Ids come from the table, so a subscriber resuming from a
+    Last-Event-ID is replayed whatever the buffer still holds after it.
+    """
+
+    def __init__(self, size=BUFFER_SIZE, interval=POLL_INTERVAL):
+        self._events = deque(maxlen=size)
+        self._cond = threading.Condition()
+        self.interval = interval
+        self._thread = None
+        self._last_id = 0
+        self._listeners = []
+        self.subscribers = 0
+
+    def _start(self):
+        with self._cond:
+            if self._thread is None:
+                self._last_id = max(0, jobs.last_event_id() - self._events.maxlen)
+                self._thread = threading.Thread(target=self._tail, name="stream-tail", daemon=True)
+                self._thread.start()
+
+    def _tail(self):
+        while True:
+            try:
+                rows = jobs.events_after(self._last_id)
+            except Exception as e:
+                print("[Stream] tail failed:", e)
+                rows = []
+            if rows:
+                with self._cond:
+                    new = [Event(event_id, preset, data) for event_id, preset, data in rows]
+                    self._events.extend(new)
+                    self._last_id = rows[-1][0]
+                    self._cond.notify_all()
+                    self._notify(new)
+            if len(rows) < 500:
+                time.sleep(self.interval)
+
+    def _notify(self, new):
+        for fn, after in self._listeners:
+            batch = [ev for ev in new if ev.id > after]
+            if batch:
+                try:
+                    fn(batch)
+                except Exception as e:
+                    print("[Stream] listener failed:", e)
+
+    def listen(self, fn, last_id=0):
+        """Call ``fn(events)`` from the tail thread with every batch of events
+        newer than ``last_id``, starting with those already buffered.
+
+        ``fn`` runs under the bus lock, so it must be quick and must not
+        subscribe.
+        """
+        self._start()
+        with self._cond:
+            self._listeners.append((fn, last_id))
+            batch = self._after(last_id, None)
+            if batch:
+                fn(batch)
+
+    def _after(self, last_id, presets):
+        out = []
+        for ev in reversed(self._events):
+            if ev.id <= last_id:
+                break
+            if presets is None or ev.preset in presets:
+                out.append(ev)
+        out.reverse()
+        return out
+
+    def subscribe(self, presets=None, last_id=None, heartbeat=HEARTBEAT):
+        """Yield matching events as they arrive, or None every ``heartbeat`` seconds.
+
+        Without ``last_id`` only events published from now on are delivered.
+        """
+        self._start()
+        if last_id is None:
+            # the tail starts up to a buffer's worth behind the table; skip all of that
+            last_id = jobs.last_event_id()
+        with self._cond:
+            self.subscribers += 1
+        try:
+            while True:
+                with self._cond:
+                    batch = self._after(last_id, presets)
+                    if not batch:
+                        self._cond.wait(heartbeat)
+                        batch = self._after(last_id, presets)
+                if not batch:
+                    yield None
+                    continue
+                for ev in batch:
+                    last_id = ev.id
+                    yield ev
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"buffered": len(self._events), "subscribers": self.subscribers}
+
+
+bus = EventBus()
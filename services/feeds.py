@@ -1,3 +1,5 @@
+from urllib.parse import urlparse
+
 # Predefined RSS Feeds for Turkey
 PRESET_FEEDS = {
     "TRT_Manşet": "https://www.trthaber.com/manset.rss",
@@ -22,3 +24,38 @@ PRESET_FEEDS = {
     "YeniSafak_Dunya": "https://www.yenisafak.com/rss?xml=dunya",
     "AHaber_SonDakika": "https://www.ahaber.com.tr/rss/son-dakika.xml",
 }
+
+# --- deny rules ---
+DENY_HOSTS = {"haberturk.com", "www.haberturk.com"}
+DENY_PATH_SUBSTR = {("/aa.com.tr", "/teyithatti")}  # (host_suffix, path_fragment)
+
+def is_blocked_url(url: str) -> bool:
+    try:
+        p = urlparse(url)
+        host = (p.netloc or "").lower()
+        path = (p.path or "").lower()
+        # block host match
+        if host in DENY_HOSTS or any(host.endswith(h.replace("/", "")) for h in DENY_HOSTS):
+            return True
+        # block aa.com.tr/teyithatti specifically
+        if host.endswith("aa.com.tr") and "/teyithatti" in path:
+            return True
+        return False
+    except Exception:
+        return False
+
+
+# --- metric labels ---
+# label values must stay a fixed set: /api/news?url= takes any URL
+_PRESET_BY_URL = {u: p for p, u in PRESET_FEEDS.items()}
+_PRESET_HOSTS = {urlparse(u).netloc for u in PRESET_FEEDS.values()}
+ADHOC = "adhoc"
+
+def feed_label(url: str) -> str:
+    """The feed's preset name, or "adhoc" for a URL that is not a preset."""
+    return _PRESET_BY_URL.get(url, ADHOC)
+
+def host_label(url: str) -> str:
+    """The feed's host if it serves a preset, otherwise "adhoc"."""
+    host = urlparse(url).netloc
+    return host if host in _PRESET_HOSTS else ADHOC
@@ -0,0 +1,205 @@
+import os, json, time, gzip, hashlib, datetime, threading
+from collections import OrderedDict, deque
+
+from services import metrics
+
+ENABLED = os.getenv("HOT_WINDOW", "1") == "1"
+WINDOW_HOURS = float(os.getenv("HOT_WINDOW_HOURS", 24))
+PER_PRESET = int(os.getenv("HOT_WINDOW_SIZE", 200))        # records kept per preset
+MAX_RESPONSES = int(os.getenv("HOT_WINDOW_RESPONSES", 256))
+GZIP_MIN_BYTES = 1024
+
+# the keys of storage.db._news_row(), so responses look the same as the
+# database fallback whether a record was loaded or arrived as an event
+FIELDS = ("id", "title", "source", "datetime", "category", "sentiment", "toxicity",
+          "keywords", "entities", "risk_point", "rule_hits", "story_id", "provider", "created_at")
+
+
+class HotRecord:
+    """One analyzed record: what ordering needs, plus its JSON ready to splice."""
+    __slots__ = ("source", "story_id", "risk", "ts", "fragment")
+
+    def __init__(self, rec: dict, ts: float):
+        rec = {k: rec.get(k) for k in FIELDS}
+        if rec["created_at"] is None:
+            # a live record has no row id yet; its stamp is when it arrived
+            rec["created_at"] = datetime.datetime.utcfromtimestamp(ts).isoformat()
+        self.source = rec.get("source")
+        self.story_id = rec.get("story_id")
+        self.risk = rec.get("risk_point") or 0
+        self.ts = ts
+        self.fragment = json.dumps(rec, ensure_ascii=False).encode("utf-8")
+
+    def with_also_in(self, sources: list) -> bytes:
+        # the fragment is a JSON object: reopen it to add the key
+        extra = json.dumps(sources, ensure_ascii=False).encode("utf-8")
+        return self.fragment[:-1] + b', "also_in": ' + extra + b"}"
+
+
+class CachedResponse:
+    """A response body, its strong ETag and the gzip variant, built once."""
+    __slots__ = ("versions", "body", "etag", "_gzipped")
+
+    def __init__(self, versions: tuple, body: bytes):
+        self.versions = versions
+        self.body = body
+        self.etag = hashlib.blake2b(body, digest_size=12).hexdigest()
+        self._gzipped = None
+
+    @property
+    def gzipped(self) -> bytes:
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, 6)
+        return self._gzipped
+
+
+def _created_ts(rec: dict) -> float:
+    created = rec.get("created_at")
+    if not created:
+        return time.time()
+    return datetime.datetime.fromisoformat(created).replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+class HotWindow:
+    """The last WINDOW_HOURS of analyzed records per preset, newest last.
+
+    Loaded from the database once, then kept current from the stream
+    events the workers publish (services.events), so reads touch neither
+    the database nor the network. Every change bumps the preset's version;
+    response bodies are cached per (presets, limit) until one of their
+    presets' versions moves.
+    """
+
+    def __init__(self, presets: dict, hours=WINDOW_HOURS, size=PER_PRESET):
+        self.presets = presets                    # name -> feed url
+        self.horizon = hours * 3600
+        self.size = size
+        self._rings = {}
+        self._by_source = {}
+        self._versions = {}
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self.last_event_id = 0                    # every event up to this one is applied
+
+    def _ring(self, preset):
+        ring = self._rings.get(preset)
+        if ring is None:
+            ring = self._rings[preset] = deque(maxlen=self.size)
+            self._by_source[preset] = {}
+            self._versions[preset] = 0
+        return ring
+
+    def _add(self, preset, rec: dict, ts: float):
+        ring, by_source = self._ring(preset), self._by_source[preset]
+        old = by_source.get(rec.get("source"))
+        # re-analysis of an entry keeps its place in the window
+        hot = HotRecord(rec, old.ts if old is not None else ts)
+        if old is not None:
+            ring[ring.index(old)] = hot
+        else:
+            if len(ring) == ring.maxlen:
+                by_source.pop(ring[0].source, None)
+            ring.append(hot)
+        by_source[hot.source] = hot
+        self._versions[preset] += 1
+
+    def _expire(self, preset, now: float):
+        ring, cutoff = self._ring(preset), now - self.horizon
+        expired = False
+        while ring and ring[0].ts < cutoff:
+            self._by_source[preset].pop(ring.popleft().source, None)
+            expired = True
+        if expired:
+            self._versions[preset] += 1
+
+    def _load(self):
+        from services.pipeline import stored_records
+        from services.events import bus
+        from storage.jobs import last_event_id
+        # events from here on may repeat rows loaded below; those replace in place
+        since = last_event_id()
+        self.last_event_id = since
+        for preset, url in self.presets.items():
+            rows = stored_records(url, self.size)
+            with self._lock:
+                for rec in reversed(rows):
+                    self._add(preset, rec, _created_ts(rec))
+        bus.listen(self.on_events, since)
+
+    def ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded:
+                return
+            with metrics.HOT_WINDOW_LOAD.time():
+                self._load()
+            self._loaded = True
+
+    def on_events(self, events):
+        now = time.time()
+        with self._lock:
+            for ev in events:
+                if ev.preset in self.presets:
+                    self._add(ev.preset, ev.data, now)
+            self.last_event_id = max(self.last_event_id, events[-1].id)
+
+    def response(self, names: list, limit: int) -> CachedResponse:
+        """``{"data": [...]}`` for the presets, like merge_by_risk() over each
+        preset's ``limit`` newest records."""
+        self.ensure_loaded()
+        key = (tuple(names), limit)
+        now = time.time()
+        with self._lock:
+            for p in names:
+                self._expire(p, now)
+            versions = tuple(self._versions[p] for p in names)
+            cached = self._responses.get(key)
+            if cached is not None and cached.versions == versions:
+                self._responses.move_to_end(key)
+                metrics.HOT_WINDOW_READS.inc(result="hit")
+                return cached
+            recs = [r for p in names for r in reversed(list(self._rings[p])[-limit:])]
+            cached = self._responses[key] = CachedResponse(versions, self._body(recs))
+            while len(self._responses) > MAX_RESPONSES:
+                self._responses.popitem(last=False)
+        metrics.HOT_WINDOW_READS.inc(result="built")
+        return cached
+
+    @staticmethod
+    def _body(recs: list) -> bytes:
+        # same shape as merge_by_risk(): highest risk first, one entry per story
+        recs.sort(key=lambda r: r.risk, reverse=True)
+        heads, also_in, by_story = [], {}, {}
+        for r in recs:
+            head = by_story.get(r.story_id) if r.story_id else None
+            if head is None:
+                heads.append(r)
+                if r.story_id:
+                    by_story[r.story_id] = r
+            elif r.source and r.source != head.source:
+                also_in.setdefault(head, []).append(r.source)
+        parts = [h.with_also_in(also_in[h]) if h in also_in else h.fragment for h in heads]
+        return b'{"data": [' + b", ".join(parts) + b"]}"
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"loaded": self._loaded, "records": sum(len(r) for r in self._rings.values()),
+                    "responses": len(self._responses)}
+
+
+_window = None
+_window_lock = threading.Lock()
+
+
+def get_window():
+    """The process-wide hot window over the preset feeds, or None when HOT_WINDOW=0."""
+    global _window
+    if _window is None and ENABLED:
+        from services.feeds import PRESET_FEEDS, is_blocked_url
+        with _window_lock:
+            if _window is None:
+                _window = HotWindow({p: u for p, u in PRESET_FEEDS.items() if not is_blocked_url(u)})
+    return _window
@@ -0,0 +1,27 @@
+import os, threading
+import requests
+from requests.adapters import HTTPAdapter
+
+USER_AGENT = os.getenv(
+    "SCRAPER_USER_AGENT",
+    "Mozilla/5.0 (compatible; web-content-searcher/1.0)",
+)
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 10))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """Shared session so downloads reuse keep-alive connections per host."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=32, pool_maxsize=POOL_SIZE)
+                s.mount("http://", adapter)
+                s.mount("https://", adapter)
+                s.headers["User-Agent"] = USER_AGENT
+                _session = s
+    return _session
@@ -0,0 +1,113 @@
+import os, time, threading, contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from services.pipeline import process_feed
+from services import rate_limit
+
+MAX_WORKERS = int(os.getenv("INGEST_WORKERS", 8))
+PER_HOST_LIMIT = int(os.getenv("INGEST_PER_HOST", 2))
+FEED_TIMEOUT = float(os.getenv("INGEST_FEED_TIMEOUT", 60))
+_TICK = 0.25
+
+# shared by every sweep so the per-host caps hold across concurrent callers
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = (urlparse(url).netloc or "").lower()
+    with _host_slots_lock:
+        sem = _host_slots.get(host)
+        if sem is None:
+            sem = _host_slots[host] = threading.BoundedSemaphore(PER_HOST_LIMIT)
+        return sem
+
+
+def ingest_feeds(feeds: dict, max_items=8, fast=True, timeout=FEED_TIMEOUT,
+                 level=rate_limit.INTERACTIVE):
+    """Fetch and analyze several feeds in parallel.
+
+    ``feeds`` maps a name to a feed URL. Returns ``(results, errors)`` keyed by
+    name. At most PER_HOST_LIMIT feeds per host are in flight at once; a feed
+    not done ``timeout`` seconds after it was submitted is reported as an
+    error, whether it was running (it finishes in the background) or still
+    queued for a pool thread (it is cancelled). Feeds whose host stays busy
+    for ``timeout`` seconds are not started at all. Provider calls are queued
+    at ``level`` (see services.rate_limit).
+    """
+    pending = list(feeds.items())
+    running, submitted = {}, {}
+    results, errors = {}, {}
+    t_start = time.monotonic()
+
+    def run(name, url):
+        with rate_limit.priority(level):
+            return process_feed(url, max_items=max_items, fast=fast, preset=name)
+
+    while pending or running:
+        for name, url in list(pending):
+            slot = _host_slot(url)
+            if not slot.acquire(blocking=False):
+                continue
+            pending.remove((name, url))
+            # carry the caller's context (request timings) into the pool thread
+            fut = _executor.submit(contextvars.copy_context().run, run, name, url)
+            fut.add_done_callback(lambda _f, s=slot: s.release())
+            running[fut] = name
+            submitted[fut] = time.monotonic()
+
+        if not running:
+            # every remaining host is saturated by another sweep
+            if time.monotonic() - t_start > timeout:
+                for name, _ in pending:
+                    errors[name] = "host busy"
+                break
+            time.sleep(_TICK)
+            continue
+
+        done, _ = wait(running, timeout=_TICK, return_when=FIRST_COMPLETED)
+        for fut in done:
+            name = running.pop(fut)
+            exc = fut.exception()
+            if exc is not None:
+                errors[name] = str(exc)
+            else:
+                results[name] = fut.result()
+
+        now = time.monotonic()
+        for fut, name in list(running.items()):
+            if now - submitted[fut] > timeout:
+                running.pop(fut)
+                # still queued behind other sweeps: never let it start
+                cancelled = fut.cancel()
+                errors[name] = "no worker free" if cancelled else f"timed out after {timeout:g}s"
+        if pending and now - t_start > timeout:
+            for name, _ in pending:
+                errors[name] = "host busy"
+            pending = []
+
+    return results, errors
+
+
+def merge_by_risk(results: dict) -> list:
+    """Flatten per-feed results into one list, highest risk first.
+
+    Copies of the same story from several feeds collapse into the
+    highest-risk one, which lists the other sources under ``also_in``.
+    """
+    merged = [rec for recs in results.values() for rec in recs]
+    merged.sort(key=lambda r: r.get("risk_point") or 0, reverse=True)
+    out, by_story = [], {}
+    for rec in merged:
+        sid = rec.get("story_id")
+        head = by_story.get(sid) if sid else None
+        if head is None:
+            rec = dict(rec)
+            out.append(rec)
+            if sid:
+                by_story[sid] = rec
+        elif rec.get("source") and rec.get("source") != head.get("source"):
+            head.setdefault("also_in", []).append(rec["source"])
+    return out
@@ -0,0 +1,159 @@
+import os, time, atexit, threading
+import numpy as np
+
+from services.ai_providers.mock_provider import _tokens, _clean_text
+
+TOP_K = 8
+FLUSH_INTERVAL = float(os.getenv("KEYWORD_IDF_FLUSH_SECONDS", 30))
+REFRESH_INTERVAL = float(os.getenv("KEYWORD_IDF_REFRESH_SECONDS", 600))
+_LENGTH_TIEBREAK = 1e-6         # equal scores: prefer the longer, more specific word
+
+
+def tokens(text: str) -> list:
+    # Turkish dotted/dotless I before lowercasing, so "İstanbul" stays one token
+    t = _clean_text(text or "").replace("İ", "i").replace("I", "ı")
+    return list(_tokens(t))
+
+
+def doc_terms(text: str) -> set:
+    return set(tokens(text))
+
+
+class KeywordIndex:
+    """TF-IDF keyword ranking over a vocabulary shared by every batch.
+
+    Document frequencies live in a NumPy array indexed by term id and are
+    loaded from storage.terms on first use. Batches passed with ``learn``
+    count towards them; the new counts are written back every
+    FLUSH_INTERVAL seconds and the table is re-read every REFRESH_INTERVAL
+    to pick up what other processes counted.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._vocab = {}
+        self._terms = []
+        self._df = np.zeros(1024, dtype=np.int64)
+        self._lengths = np.zeros(1024, dtype=np.int64)
+        self._docs = 0
+        self._pending = {}
+        self._pending_docs = 0
+        self._loaded_at = None
+        self._flushed_at = time.monotonic()
+
+    # --- vocabulary
+
+    def _term_id(self, term: str) -> int:
+        i = self._vocab.get(term)
+        if i is None:
+            i = self._vocab[term] = len(self._terms)
+            self._terms.append(term)
+            if i >= len(self._df):
+                self._df = np.concatenate([self._df, np.zeros_like(self._df)])
+                self._lengths = np.concatenate([self._lengths, np.zeros_like(self._lengths)])
+            self._lengths[i] = len(term)
+        return i
+
+    def _load(self):
+        from storage.terms import load_terms
+        try:
+            docs, df = load_terms()
+        except Exception as e:
+            print("[Keywords] Could not load term stats:", e)
+            docs, df = 0, {}
+        self._df[:] = 0
+        for term, n in df.items():
+            self._df[self._term_id(term)] = n
+        # counts not written yet are not in the table
+        for term, n in self._pending.items():
+            self._df[self._term_id(term)] += n
+        self._docs = docs + self._pending_docs
+        self._loaded_at = time.monotonic()
+
+    # --- ranking
+
+    def extract(self, texts: list, top_k=TOP_K, learn=True) -> list:
+        """Top ``top_k`` keywords per text, best first."""
+        docs = [tokens(t) for t in texts]
+        lengths = np.fromiter((len(d) for d in docs), dtype=np.int64, count=len(docs))
+        total = int(lengths.sum())
+        with self._lock:
+            if self._loaded_at is None:
+                self._load()
+            ids = np.fromiter((self._term_id(w) for d in docs for w in d), dtype=np.int64, count=total)
+            vocab_size = max(1, len(self._terms))
+            doc_ids = np.repeat(np.arange(len(docs), dtype=np.int64), lengths)
+
+            # (document, term) pairs with their in-document counts
+            pairs, tf = np.unique(doc_ids * vocab_size + ids, return_counts=True)
+            d, t = pairs // vocab_size, pairs % vocab_size
+            if learn and len(docs):
+                new_df = np.bincount(t, minlength=vocab_size)
+                self._df[:vocab_size] += new_df
+                self._docs += len(docs)
+                for i in np.flatnonzero(new_df):
+                    term = self._terms[i]
+                    self._pending[term] = self._pending.get(term, 0) + int(new_df[i])
+                self._pending_docs += len(docs)
+            idf = np.log((1.0 + self._docs) / (1.0 + self._df[t])) + 1.0
+            score = (1.0 + np.log(tf)) * idf + self._lengths[t] * _LENGTH_TIEBREAK
+            terms = self._terms
+
+        # best first within each document, then keep the first top_k of each
+        order = np.lexsort((-score, d))
+        d, t = d[order], t[order]
+        starts = np.searchsorted(d, np.arange(len(docs)))
+        keep = (np.arange(len(d)) - starts[d]) < top_k
+        out = [[] for _ in docs]
+        for di, ti in zip(d[keep].tolist(), t[keep].tolist()):
+            out[di].append(terms[ti])
+        if learn:
+            self._maybe_flush()
+        return out
+
+    # --- persistence
+
+    def _maybe_flush(self):
+        now = time.monotonic()
+        if now - self._flushed_at >= FLUSH_INTERVAL:
+            self.flush()
+            if self._loaded_at is not None and now - self._loaded_at >= REFRESH_INTERVAL:
+                with self._lock:
+                    self._load()
+
+    def flush(self):
+        from storage.terms import add_terms
+        with self._flush_lock:
+            with self._lock:
+                pending, docs = self._pending, self._pending_docs
+                self._pending, self._pending_docs = {}, 0
+                self._flushed_at = time.monotonic()
+            if not docs:
+                return
+            try:
+                add_terms(docs, pending)
+            except Exception as e:
+                print("[Keywords] term stats flush failed, will retry:", e)
+                with self._lock:
+                    for term, n in pending.items():
+                        self._pending[term] = self._pending.get(term, 0) + n
+                    self._pending_docs += docs
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"terms": len(self._terms), "documents": self._docs,
+                    "pending_documents": self._pending_docs}
+
+
+index = KeywordIndex()
+atexit.register(index.flush)
+
+
+def extract(texts: list, top_k=TOP_K, learn=True) -> list:
+    return index.extract(texts, top_k=top_k, learn=learn)
+
+
+def flush():
+    """Write out uncounted documents (for processes that exit without atexit)."""
+    index.flush()
@@ -0,0 +1,230 @@
+import os, time, bisect, threading, contextvars
+from contextlib import contextmanager
+
+# Prometheus-style counters and histograms, rendered in the text exposition
+# format by render(). Every process keeps its own registry: the web process
+# serves it on /metrics and worker.py processes on --metrics-port.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+TIMING_HEADERS = os.getenv("TIMING_HEADERS", "0") == "1"   # Server-Timing on responses
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._samples(key, value))
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_fmt_labels(self.labels, key)} {_fmt_value(value)}"]
+
+
+class Histogram(_Metric):
+    """Latency histogram. ``stage`` names it in Server-Timing headers."""
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, stage=None):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.stage = stage
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+        timings = _request_timings.get()
+        if timings is not None and self.stage:
+            timings.add(self.stage, value)
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def _samples(self, key, value):
+        counts, total, n = value
+        out, acc = [], 0
+        for bound, c in zip(self.buckets, counts):
+            acc += c
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, [('le', _fmt_value(float(bound)))])} {acc}")
+        out.append(f"{self.name}_bucket{_fmt_labels(self.labels, key, [('le', '+Inf')])} {n}")
+        out.append(f"{self.name}_sum{_fmt_labels(self.labels, key)} {_fmt_value(total)}")
+        out.append(f"{self.name}_count{_fmt_labels(self.labels, key)} {n}")
+        return out
+
+
+class Gauge(_Metric):
+    """Value read from ``fn`` at scrape time; ``fn`` returns {label tuple: value}."""
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def render(self) -> list:
+        try:
+            values = dict(self.fn()) if self.fn else {}
+        except Exception as e:
+            print(f"[Metrics] {self.name} collection failed:", e)
+            values = {}
+        with self._lock:
+            self._values = values
+        return super().render()
+
+    def _samples(self, key, value):
+        return [f"{self.name}{_fmt_labels(self.labels, key)} {_fmt_value(value)}"]
+
+
+def render() -> str:
+    lines = []
+    for m in _registry:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ------------------------------
+# PER-REQUEST TIMINGS
+# ------------------------------
+
+class RequestTimings:
+    """Time spent per stage during one request, across the threads it uses."""
+
+    def __init__(self):
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            total, n = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total + seconds, n + 1)
+
+    def server_timing(self, total: float) -> str:
+        with self._lock:
+            parts = [f'{s};dur={t * 1000:.1f};desc="{n}x"' for s, (t, n) in sorted(self.stages.items())]
+        return ", ".join(parts + [f"total;dur={total * 1000:.1f}"])
+
+
+def start_request():
+    return _request_timings.set(RequestTimings())
+
+
+def end_request(token) -> RequestTimings:
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+    return timings
+
+
+# ------------------------------
+# EXPOSITION FOR NON-WEB PROCESSES
+# ------------------------------
+
+def serve(port: int):
+    """Serve render() on http://0.0.0.0:<port>/metrics from a daemon thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+# ------------------------------
+# METRICS
+# ------------------------------
+
+FEED_FETCH = Histogram("feed_fetch_seconds", "RSS feed download and parse", ["host"], stage="fetch")
+ARTICLE_DOWNLOAD = Histogram("article_download_seconds", "Full-text article download", stage="download")
+ARTICLE_PARSE = Histogram("article_parse_seconds", "Full-text article HTML parse", stage="parse")
+PROVIDER_CALL = Histogram("provider_call_seconds", "AI provider request", ["provider", "op"], stage="provider")
+RATE_LIMIT_WAIT = Histogram("rate_limit_wait_seconds", "Wait for provider rate-limit capacity",
+                            ["provider"], stage="ratelimit")
+SCORING = Histogram("scoring_seconds", "Risk scoring of one record",
+                    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1), stage="score")
+DB_WRITE = Histogram("db_write_seconds", "Database write transaction", ["table"], stage="db")
+HTTP_REQUEST = Histogram("http_request_seconds", "HTTP request handling", ["endpoint", "status"])
+HOT_WINDOW_LOAD = Histogram("hot_window_load_seconds", "Initial load of the in-memory hot window")
+
+CACHE_LOOKUPS = Counter("analysis_cache_lookups_total", "Analysis cache lookups", ["result"])
+HOT_WINDOW_READS = Counter("hot_window_reads_total", "Hot window responses served from cache or rebuilt",
+                           ["result"])
+PROVIDER_ERRORS = Counter("provider_errors_total", "Failed provider requests", ["provider", "op"])
+PROVIDER_THROTTLED = Counter("provider_throttled_total", "Provider 429 responses", ["provider"])
+PROVIDER_FALLBACKS = Counter("provider_fallbacks_total",
+                             "Analyses that fell back (batch->single, provider->next provider or mock)",
+                             ["provider", "to"])
+PROVIDER_RETRIES = Counter("provider_retries_total",
+                           "Calls retried on the same provider after a transient error", ["provider"])
+PROVIDER_HEDGES = Counter("provider_hedges_total",
+                          "Second provider raced after the first passed its p95", ["provider", "to"])
+PROVIDER_BREAKER_TRIPS = Counter("provider_breaker_trips_total", "Provider circuit breaker openings",
+                                 ["provider"])
+FEED_ITEMS = Counter("feed_items_total", "Feed entries fetched, and how many were new", ["feed", "kind"])
+FEED_ERRORS = Counter("feed_errors_total", "Feed fetches that failed", ["feed"])
+ARTICLES = Counter("article_extract_total", "Full-text extraction outcomes", ["outcome"])
+JOBS = Counter("jobs_total", "Queue jobs run by this process", ["kind", "outcome"])
+ALERTS = Counter("alerts_total", "Alerts fired or suppressed", ["rule", "outcome"])
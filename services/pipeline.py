@@ -0,0 +1,136 @@
+from services.analyzer import analyze_batch_structured
+from services.scoring import compute_risk
+from services.dedup import story_index, minhash
+from services import alerts
+from services import events, metrics
+from services.feeds import feed_label
+from storage.write_behind import persist_news, flush
+from storage.db import (
+    get_feed_state, save_feed_state, seen_entry_keys,
+    mark_entries_seen, recent_feed_links, fetch_news_by_sources,
+)
+
+
+def item_text(it: dict) -> str:
+    return (it.get("content") or it.get("title") or "").strip()
+
+
+def _analyze_by_story(texts: list):
+    """One provider analysis per near-duplicate story.
+
+    Items are clustered with services.dedup first. Items joining a story
+    that was already analyzed inherit its result, and the rest send one
+    representative per new story to the provider.
+    """
+    stories = story_index.assign_many([minhash(t) for t in texts])
+    todo = {}
+    for i, (sid, analysis, _) in enumerate(stories):
+        if analysis is None and sid not in todo:
+            todo[sid] = i
+    results = dict(zip(todo, analyze_batch_structured([texts[i] for i in todo.values()])))
+    for sid, analysis in results.items():
+        story_index.set_analysis(sid, analysis)
+    analyses = [dict(analysis or results[sid]) for sid, analysis, _ in stories]
+    return stories, analyses
+
+
+def enrich_items(items: list, preset=None) -> list:
+    """Analyze, score, store and publish fetched feed items."""
+    texts = [item_text(it) for it in items]
+    stories, analyses = _analyze_by_story(texts)
+    enriched = []
+    for it, text, analysis, (story_id, _, _) in zip(items, texts, analyses, stories):
+        with metrics.SCORING.time():
+            risk_point, rule_hits = compute_risk(text, analysis)
+        record = {
+            "title": it.get("title"),
+            "source": it.get("source"),
+            "datetime": it.get("datetime"),
+            "category": analysis.get("category"),
+            "sentiment": analysis.get("sentiment"),
+            "toxicity": analysis.get("toxicity"),
+            "keywords": analysis.get("keywords", []),
+            "entities": analysis.get("entities", []),
+            "risk_point": risk_point,
+            "rule_hits": rule_hits,
+            "story_id": story_id,
+            "provider": analysis.get("provider"),
+        }
+        enriched.append(record)
+    # content is stored for search but kept out of the API response; only a
+    # story's first copy keeps it, later copies point at the story
+    persist_news([dict(r, content=t if is_new else None)
+                  for r, t, (_, _, is_new) in zip(enriched, texts, stories)])
+    alerts.evaluate(enriched)
+    events.publish(preset, enriched)
+    return enriched
+
+
+def stored_records(url: str, limit=8) -> list:
+    """The feed's most recent entries as already-analyzed records, newest first."""
+    flush()     # records still in the write-behind buffer are not in the database yet
+    links = recent_feed_links(url, limit)
+    stored = fetch_news_by_sources(links)
+    return [stored[l] for l in links if l in stored]
+
+
+def fetch_new_items(url: str, max_items=8, fast=True) -> dict:
+    """Conditional GET of a feed, picking out the entries not processed yet.
+
+    The feed is requested with the ETag/Last-Modified stored from the last
+    poll. Returns fetch_feed()'s result plus the ``seen`` entry keys and the
+    ``new`` items, with full article text unless ``fast``.
+    """
+    from services.scraper import fetch_feed, fill_full_text  # requests, only where feeds are polled
+    state = get_feed_state(url)
+    feed = fetch_feed(url, max_items=max_items,
+                      etag=state.get("etag"), modified=state.get("modified"))
+    items = feed["items"]
+    feed["seen"] = seen_entry_keys(url, [it["guid"] for it in items]) if items else set()
+    feed["new"] = [it for it in items if it["guid"] not in feed["seen"]]
+    label = feed_label(url)
+    if feed["error"]:
+        metrics.FEED_ERRORS.inc(feed=label)
+    metrics.FEED_ITEMS.inc(len(items), feed=label, kind="fetched")
+    metrics.FEED_ITEMS.inc(len(feed["new"]), feed=label, kind="new")
+    if feed["new"] and not fast:
+        fill_full_text(feed["new"])
+    return feed
+
+
+def commit_fetch(url: str, feed: dict):
+    """Mark a fetch's new entries processed and keep its validators."""
+    mark_entries_seen(url, [(it["guid"], it["source"]) for it in feed["new"]])
+    if feed["items"]:
+        save_feed_state(url, feed["etag"], feed["modified"])
+
+
+def poll_feed(url: str, max_items=8, fast=True, preset=None) -> dict:
+    """Fetch one feed and run its new items through the analysis pipeline.
+
+    Stable feeds cost no parsing, analysis or writes. New records are
+    published on services.events under ``preset``. Returns the
+    fetch_new_items() result with the ``fresh`` records keyed by link.
+    """
+    feed = fetch_new_items(url, max_items=max_items, fast=fast)
+    records = enrich_items(feed["new"], preset) if feed["new"] else []
+    feed["fresh"] = {r["source"]: r for r in records}
+    commit_fetch(url, feed)
+    return feed
+
+
+def process_feed(url: str, max_items=8, fast=True, preset=None) -> list:
+    """poll_feed() returning the feed's records, stored ones included."""
+    res = poll_feed(url, max_items=max_items, fast=fast, preset=preset)
+    if res["status"] == 304:
+        return stored_records(url, max_items)
+
+    items, seen, fresh = res["items"], res["seen"], res["fresh"]
+    flush()
+    stored = fetch_news_by_sources([it["source"] for it in items if it["guid"] in seen])
+    out = []
+    for it in items:
+        rec = fresh.get(it["source"]) or stored.get(it["source"])
+        if rec:
+            out.append(rec)
+    return out
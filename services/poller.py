@@ -0,0 +1,141 @@
+import os, random, datetime, threading
+
+from storage.db import get_feed_schedules, save_feed_schedule
+from storage import jobs
+
+MIN_INTERVAL = float(os.getenv("POLL_MIN_SECONDS", 60))
+MAX_INTERVAL = float(os.getenv("POLL_MAX_SECONDS", 3600))
+MAX_ERROR_INTERVAL = float(os.getenv("POLL_MAX_ERROR_SECONDS", 6 * 3600))
+GAP_FACTOR = 0.5        # poll about twice per expected new entry
+IDLE_BACKOFF = 1.5      # interval growth per poll that found nothing new
+JITTER = 0.2            # +/- fraction applied to every interval
+ALPHA = 0.3             # EWMA weight of the newest gap estimate
+GAP_ENTRIES = 20        # newest entries used to measure the publish gap
+
+SCHEDULER_TICK = float(os.getenv("SCHEDULER_TICK_SECONDS", 5))
+LEADER_TTL = float(os.getenv("SCHEDULER_LEASE_SECONDS", 30))
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", 48))
+MAINTENANCE_EVERY = 60  # ticks between reaping and purging
+
+
+def entry_gap(items: list):
+    """Mean seconds between the newest entries' timestamps, or None."""
+    ts = sorted((it["published"] for it in items if it.get("published")), reverse=True)
+    ts = ts[:GAP_ENTRIES]
+    if len(ts) < 2 or ts[0] == ts[-1]:
+        return None
+    return (ts[0] - ts[-1]) / (len(ts) - 1)
+
+
+class FeedSchedule:
+    """Learned polling state of one feed, stored on its feed_state row."""
+    __slots__ = ("gap", "errors", "unchanged", "last_poll")
+
+    def __init__(self, gap=None, errors=0, unchanged=0, last_poll=None):
+        self.gap = gap
+        self.errors = errors
+        self.unchanged = unchanged
+        self.last_poll = last_poll
+
+    @classmethod
+    def load(cls, url: str):
+        st = get_feed_schedules([url]).get(url) or {}
+        return cls(st.get("poll_gap"), st.get("poll_errors") or 0,
+                   st.get("poll_unchanged") or 0, st.get("last_poll"))
+
+    def observe(self, res: dict, now: datetime.datetime) -> float:
+        """Fold a fetch result into the estimate and return the next interval.
+
+        Errors back off exponentially up to MAX_ERROR_INTERVAL. Otherwise the
+        interval is GAP_FACTOR times the publish gap, grown by IDLE_BACKOFF for
+        each consecutive poll without new entries, within MIN/MAX_INTERVAL.
+        """
+        if res.get("error"):
+            self.errors += 1
+            return min(MAX_ERROR_INTERVAL, MIN_INTERVAL * 2 ** self.errors)
+        self.errors = 0
+
+        new = res["new"]
+        gap = entry_gap(res["items"])
+        if gap is None and new and self.last_poll:
+            # feeds without timestamps: new entries per elapsed time
+            gap = (now - self.last_poll).total_seconds() / len(new)
+        if gap is not None:
+            self.gap = gap if self.gap is None else ALPHA * gap + (1 - ALPHA) * self.gap
+        self.unchanged = 0 if new else self.unchanged + 1
+
+        base = self.gap * GAP_FACTOR if self.gap else MIN_INTERVAL
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, base) * IDLE_BACKOFF ** self.unchanged)
+
+
+def record_poll(url: str, res: dict) -> float:
+    """Update a feed's schedule after a fetch; returns the jittered interval."""
+    sched = FeedSchedule.load(url)
+    now = datetime.datetime.utcnow()
+    interval = sched.observe(res, now) * random.uniform(1 - JITTER, 1 + JITTER)
+    save_feed_schedule(url, {
+        "poll_gap": sched.gap,
+        "poll_errors": sched.errors,
+        "poll_unchanged": sched.unchanged,
+        "last_poll": now,
+        "next_poll": now + datetime.timedelta(seconds=interval),
+    })
+    return interval
+
+
+class Scheduler:
+    """Keeps exactly one fetch job open per feed, due at its next_poll.
+
+    Any number of processes may run one; only the holder of the
+    'scheduler' lease enqueues, and the lease passes to another process
+    within LEADER_TTL seconds if the leader dies.
+    """
+
+    def __init__(self, feeds: dict, holder: str, tick=SCHEDULER_TICK, ttl=LEADER_TTL):
+        self.feeds = feeds
+        self.holder = holder
+        self.tick_seconds = tick
+        self.ttl = ttl
+        self.leader = False
+        self._ticks = 0
+        self._stop = threading.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                leader = jobs.acquire_lease("scheduler", self.holder, self.ttl)
+                if leader and not self.leader:
+                    print("[Scheduler] leading as", self.holder)
+                self.leader = leader
+                if leader:
+                    self.tick()
+            except Exception as e:
+                print("[Scheduler] tick failed:", e)
+            self._stop.wait(self.tick_seconds)
+        if self.leader:
+            jobs.release_lease("scheduler", self.holder)
+
+    def tick(self):
+        open_keys = jobs.open_dedupe_keys("fetch:")
+        states = get_feed_schedules(list(self.feeds.values()))
+        now = datetime.datetime.utcnow()
+        for name, url in self.feeds.items():
+            key = f"fetch:{url}"
+            if key in open_keys:
+                continue
+            run_at = (states.get(url) or {}).get("next_poll")
+            if run_at is None:
+                # never polled: spread first polls so a cold start is not a burst
+                run_at = now + datetime.timedelta(seconds=random.uniform(0, MIN_INTERVAL))
+            jobs.enqueue("fetch", {"preset": name, "url": url}, run_at=run_at, dedupe_key=key)
+
+        self._ticks += 1
+        if self._ticks % MAINTENANCE_EVERY == 1:
+            jobs.reap()
+            jobs.purge(JOB_RETENTION_HOURS)
+            from storage.stories import purge_stories
+            from services import dedup, alerts
+            purge_stories(max(dedup.WINDOW, alerts.DEDUP_WINDOW) / 3600)
@@ -0,0 +1,204 @@
+import os, time, heapq, itertools, threading, contextvars
+from contextlib import contextmanager
+
+from services import metrics
+
+# lower value is served first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", 60))
+# one quota for all web and worker processes, kept in the database
+SHARED = os.getenv("RATE_LIMIT_SHARED", "1") == "1"
+
+_priority = contextvars.ContextVar("provider_priority", default=INTERACTIVE)
+
+
+class RateLimitTimeout(RuntimeError):
+    pass
+
+
+@contextmanager
+def priority(level: int):
+    """Run provider calls made inside the block at the given priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    def refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def delay_for(self, amount) -> float:
+        missing = min(amount, self.capacity) - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class LocalBuckets:
+    """Requests/min and tokens/min buckets of this process only."""
+
+    def __init__(self, name: str, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self._paused_until = 0.0
+
+    def _take(self, amount: int, now: float, paused_until: float) -> float:
+        # take one request and ``amount`` tokens, or say how long until they are there
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        delay = max(paused_until - now, self.requests.delay_for(1), self.tokens.delay_for(amount))
+        if delay <= 0:
+            self.requests.level -= 1
+            self.tokens.level -= min(amount, self.tokens.capacity)
+        return delay
+
+    def take(self, amount: int) -> float:
+        return self._take(amount, time.monotonic(), self._paused_until)
+
+    def pause(self, seconds: float):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class SharedBuckets(LocalBuckets):
+    """The same buckets kept in the database (storage.jobs).
+
+    Every process takes from one row under a lock, so N worker processes
+    share the configured quota instead of each getting all of it, and a
+    429 pause holds all of them back.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float):
+        super().__init__(name, rpm, tpm)
+        self.name = name
+        self._ready = False
+
+    def _init(self, jobs):
+        if not self._ready:
+            jobs.init_quota(self.name, self.requests.capacity, self.tokens.capacity, time.time())
+            self._ready = True
+
+    def take(self, amount: int) -> float:
+        from storage import jobs
+        self._init(jobs)
+        with jobs.locked_quota(self.name) as row:
+            now = time.time()
+            stamp = min(row.stamp, now)     # another host's clock may run ahead
+            self.requests.level, self.requests.stamp = row.requests, stamp
+            self.tokens.level, self.tokens.stamp = row.tokens, stamp
+            delay = self._take(amount, now, row.paused_until or 0.0)
+            row.requests, row.tokens, row.stamp = self.requests.level, self.tokens.level, now
+        return delay
+
+    def pause(self, seconds: float):
+        from storage import jobs
+        self._init(jobs)
+        jobs.pause_quota(self.name, time.time() + seconds)
+
+
+class ProviderLimiter:
+    """Requests/min and tokens/min buckets behind a priority queue.
+
+    Only the head of the queue may take from the buckets, so an interactive
+    call queued behind background ones is served as soon as capacity frees up.
+    The buckets are SharedBuckets unless RATE_LIMIT_SHARED=0; the queue and
+    its priorities are per process.
+    """
+
+    def __init__(self, name: str, rpm: float, tpm: float, shared: bool = None):
+        self.name = name
+        shared = SHARED if shared is None else shared
+        self.buckets = (SharedBuckets if shared else LocalBuckets)(name, rpm, tpm)
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self.acquired = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def acquire(self, tokens: int = 1, level: int = None, timeout: float = MAX_WAIT):
+        level = _priority.get() if level is None else level
+        entry = (level, next(self._seq))
+        t0 = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if now - t0 > timeout:
+                        self.timeouts += 1
+                        raise RateLimitTimeout(f"{self.name}: waited over {timeout:g}s for quota")
+                    if self._queue[0] == entry:
+                        delay = self.buckets.take(tokens)
+                        if delay <= 0:
+                            break
+                        self._cond.wait(min(delay, timeout))
+                    else:
+                        self._cond.wait(timeout)
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+            waited = time.monotonic() - t0
+            self.acquired += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        metrics.RATE_LIMIT_WAIT.observe(waited, provider=self.name)
+
+    def pause(self, seconds: float):
+        """Hold every caller back, e.g. after a 429 with Retry-After."""
+        with self._cond:
+            self.buckets.pause(seconds)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            depth = len(self._queue)
+            background = sum(1 for lvl, _ in self._queue if lvl >= BACKGROUND)
+        return {
+            "queue_depth": depth,
+            "queue_background": background,
+            "acquired": self.acquired,
+            "timeouts": self.timeouts,
+            "wait_avg": round(self.wait_total / self.acquired, 4) if self.acquired else 0.0,
+            "wait_max": round(self.wait_max, 4),
+        }
+
+
+_DEFAULTS = {"openai": (500, 200000), "gemini": (60, 1000000)}
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name: str) -> ProviderLimiter:
+    """Shared limiter for a provider, sized from <NAME>_RPM / <NAME>_TPM."""
+    with _limiters_lock:
+        lim = _limiters.get(name)
+        if lim is None:
+            rpm, tpm = _DEFAULTS.get(name, (60, 100000))
+            rpm = float(os.getenv(f"{name.upper()}_RPM", rpm))
+            tpm = float(os.getenv(f"{name.upper()}_TPM", tpm))
+            lim = _limiters[name] = ProviderLimiter(name, rpm, tpm)
+        return lim
+
+
+def estimate_tokens(*texts, completion: int = 300) -> int:
+    # ~4 characters per token is close enough for budgeting
+    return sum(len(t or "") for t in texts) // 4 + completion
+
+
+def stats() -> dict:
+    with _limiters_lock:
+        return {name: lim.stats() for name, lim in _limiters.items()}
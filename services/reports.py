@@ -0,0 +1,43 @@
+import io, csv
+
+BUCKET_COLUMNS = ["category", "sentiment", "source", "count", "avg_risk", "avg_toxicity"]
+
+
+def csv_lines(rep: dict):
+    """Yield the report's buckets as CSV, one line at a time."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+
+    def flush():
+        line = buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+        return line
+
+    writer.writerow(["from", "to"] + BUCKET_COLUMNS)
+    yield flush()
+    for b in rep["buckets"]:
+        writer.writerow([rep["from"], rep["to"]] + [b[c] for c in BUCKET_COLUMNS])
+        yield flush()
+
+
+def xlsx_bytes(rep: dict) -> bytes:
+    """Workbook with buckets, per-day totals and top keywords sheets."""
+    from openpyxl import Workbook  # optional, only needed for Excel export
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("buckets")
+    ws.append(BUCKET_COLUMNS)
+    for b in rep["buckets"]:
+        ws.append([b[c] for c in BUCKET_COLUMNS])
+    ws = wb.create_sheet("days")
+    ws.append(["day", "count", "avg_risk"])
+    for d in rep["days"]:
+        ws.append([d["day"], d["count"], d["avg_risk"]])
+    ws = wb.create_sheet("keywords")
+    ws.append(["keyword", "count"])
+    for k in rep["top_keywords"]:
+        ws.append([k["keyword"], k["count"]])
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
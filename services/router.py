@@ -0,0 +1,290 @@
+import os, time, threading, contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from services import metrics
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", 5))
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", 20))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN_SECONDS", 30))
+HEDGE = os.getenv("PROVIDER_HEDGE", "1") == "1"
+HEDGE_MIN_DELAY = float(os.getenv("PROVIDER_HEDGE_MIN_SECONDS", 1.0))
+HEDGE_MAX_DELAY = float(os.getenv("PROVIDER_HEDGE_MAX_SECONDS", 8.0))
+DEADLINE = float(os.getenv("PROVIDER_DEADLINE_SECONDS", 30))
+THREADS = int(os.getenv("PROVIDER_THREADS", 8))          # calls in flight per provider
+LATENCY_WINDOW = 200
+MIN_SAMPLES = 20                # before this, hedge after HEDGE_MAX_DELAY
+
+
+class CircuitBreaker:
+    """Closed -> open after BREAKER_FAILURES consecutive bad calls.
+
+    A call is bad when it raises or takes BREAKER_SLOW_SECONDS or more.
+    After BREAKER_COOLDOWN an open breaker goes half-open and lets exactly
+    one probe through: a good probe closes it, a bad one opens it again.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, name: str, failures=BREAKER_FAILURES, slow=BREAKER_SLOW_SECONDS,
+                 cooldown=BREAKER_COOLDOWN):
+        self.name = name
+        self.max_failures = failures
+        self.slow = slow
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now: False, True, or "probe" when this
+        call is the half-open probe."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown:
+                    return False
+                self.state, self._probing = self.HALF_OPEN, False
+            if self._probing:
+                return False
+            self._probing = True
+            return "probe"
+
+    def record(self, ok: bool, seconds: float):
+        bad = not ok or seconds >= self.slow
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+                if bad:
+                    self._open()
+                else:
+                    self.state, self.failures = self.CLOSED, 0
+                return
+            if not bad:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.state == self.CLOSED and self.failures >= self.max_failures:
+                self._open()
+
+    def release_probe(self):
+        """The half-open probe was cancelled before it ran: let another one go."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probing = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.trips += 1
+        metrics.PROVIDER_BREAKER_TRIPS.inc(provider=self.name)
+        print(f"[Router] {self.name} circuit open for {self.cooldown:g}s")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "trips": self.trips}
+
+
+class LatencyWindow:
+    """Latencies of the last LATENCY_WINDOW successful calls."""
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float):
+        with self._lock:
+            if len(self._samples) < MIN_SAMPLES:
+                return None
+            xs = sorted(self._samples)
+        return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+class Router:
+    """Runs an analysis op on an ordered chain of providers.
+
+    The first provider whose breaker allows it gets the call. If it fails
+    the next one is tried at once; if it is still running past its own p95
+    latency for the op, the next one is started as a hedge and whichever
+    answers first wins. A half-open probe is hedged straight away, so a
+    provider that is still slow never holds up the caller. Calls that lose
+    the race or miss the deadline run to completion in the background and
+    still feed the breakers.
+
+    When every provider has failed, the last failure is retried once on
+    the same provider if it was transient (the provider set ``retry_after``
+    on the exception) and the retry can start before the deadline.
+
+    Each provider has its own pool of PROVIDER_THREADS and is skipped
+    while that many of its calls are in flight, so calls hanging on one
+    provider never starve the others. When every provider left is that
+    busy, the call waits for the first free thread until its deadline.
+    """
+
+    def __init__(self, providers: list, deadline=DEADLINE, hedge=HEDGE):
+        self.providers = list(providers)          # [(name, provider)]
+        self.deadline = deadline
+        self.hedge = hedge
+        self.breakers = {name: CircuitBreaker(name) for name, _ in self.providers}
+        self._by_name = dict(self.providers)
+        self._latency = {}
+        self._latency_lock = threading.Lock()
+        self._pools = {name: ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix=f"provider-{name}")
+                       for name, _ in self.providers}
+        self._inflight = {name: 0 for name, _ in self.providers}
+        self._capacity = threading.Condition()
+
+    def _reserve(self, name: str) -> bool:
+        with self._capacity:
+            if self._inflight[name] >= THREADS:
+                return False
+            self._inflight[name] += 1
+            return True
+
+    def _release(self, name: str):
+        with self._capacity:
+            self._inflight[name] -= 1
+            self._capacity.notify_all()
+
+    def _wait_for_capacity(self, names: list, timeout: float) -> bool:
+        with self._capacity:
+            return self._capacity.wait_for(
+                lambda: any(self._inflight[n] < THREADS for n in names), timeout=timeout)
+
+    def _window(self, name: str, op: str) -> LatencyWindow:
+        with self._latency_lock:
+            w = self._latency.get((name, op))
+            if w is None:
+                w = self._latency[(name, op)] = LatencyWindow()
+            return w
+
+    def hedge_delay(self, name: str, op: str) -> float:
+        # clamped: a brownout drags p95 up with it, and slow calls are the breaker's job
+        p95 = self._window(name, op).quantile(0.95)
+        return HEDGE_MAX_DELAY if p95 is None else min(HEDGE_MAX_DELAY, max(HEDGE_MIN_DELAY, p95))
+
+    def _cancel(self, fut, name: str, probe: bool):
+        if fut.cancel() and probe:
+            self.breakers[name].release_probe()
+
+    def _timed(self, name, provider, op, arg, started, abandoned):
+        started.set()
+        t0 = time.monotonic()
+        try:
+            result = getattr(provider, op)(arg)
+        except Exception:
+            if not abandoned.is_set():
+                self.breakers[name].record(False, time.monotonic() - t0)
+            raise
+        elapsed = time.monotonic() - t0
+        self._window(name, op).add(elapsed)
+        if not abandoned.is_set():
+            self.breakers[name].record(True, elapsed)
+        return result
+
+    def call(self, op: str, arg):
+        """``(provider name, result)`` of ``op`` ("analyze" or "analyze_batch"),
+        or ``(None, None)`` when no provider answered before the deadline."""
+        end = time.monotonic() + self.deadline
+        queue = list(self.providers)
+        running = {}                              # future -> (name, started, abandoned, probe)
+        busy = []                                 # providers skipped for want of a thread
+        hedge_at, hedged, retried = None, False, False
+
+        def launch():
+            while queue:
+                name, provider = queue.pop(0)
+                if not self._reserve(name):
+                    busy.append((name, provider))
+                    continue
+                allowed = self.breakers[name].allow()
+                if not allowed:
+                    self._release(name)
+                    continue
+                started, abandoned = threading.Event(), threading.Event()
+                fut = self._pools[name].submit(contextvars.copy_context().run, self._timed,
+                                               name, provider, op, arg, started, abandoned)
+                fut.add_done_callback(lambda _f, n=name: self._release(n))
+                running[fut] = (name, started, abandoned, allowed == "probe")
+                delay = 0.0 if allowed == "probe" else self.hedge_delay(name, op)
+                return name, time.monotonic() + delay
+            return None, None
+
+        current, hedge_at = launch()
+        while running or busy:
+            now = time.monotonic()
+            if now >= end:
+                break
+            if not running:
+                if not self._wait_for_capacity([n for n, _ in busy], end - now):
+                    break
+                queue[:0] = busy
+                busy.clear()
+                current, hedge_at = launch()
+                continue
+            timeout = end - now
+            if self.hedge and not hedged and queue:
+                timeout = max(0.0, min(timeout, hedge_at - now))
+            done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)[0]
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    print(f"[Router] {name} {op} failed:", e)
+                    error = e
+                else:
+                    # a loser still queued behind its provider's threads has no reason to run
+                    for other, (n, _, _, probe) in running.items():
+                        self._cancel(other, n, probe)
+                    return name, result
+                nxt, at = launch()
+                if nxt:
+                    metrics.PROVIDER_FALLBACKS.inc(provider=name, to=nxt)
+                    current, hedge_at = nxt, at
+                    continue
+                retry_after = getattr(error, "retry_after", None)
+                if (running or busy or retried or retry_after is None
+                        or time.monotonic() + retry_after >= end):
+                    continue
+                # nothing else left to try: one more go on the same provider
+                retried = True
+                time.sleep(retry_after)
+                queue.append((name, self._by_name[name]))
+                nxt, at = launch()
+                if nxt:
+                    metrics.PROVIDER_RETRIES.inc(provider=name)
+                    current, hedge_at = nxt, at
+            if not done and self.hedge and not hedged and queue and time.monotonic() >= hedge_at:
+                hedged = True
+                nxt, _ = launch()
+                if nxt:
+                    metrics.PROVIDER_HEDGES.inc(provider=current, to=nxt)
+
+        # deadline passed: calls still running count against their provider;
+        # calls that never got a thread say nothing about it
+        for fut, (name, started, abandoned, probe) in running.items():
+            if not started.is_set():
+                self._cancel(fut, name, probe)
+                continue
+            if fut.done():
+                continue
+            abandoned.set()
+            self.breakers[name].record(False, self.deadline)
+        return None, None
+
+    def stats(self) -> dict:
+        out = {}
+        for name, _ in self.providers:
+            st = self.breakers[name].stats()
+            p95 = self._window(name, "analyze_batch").quantile(0.95)
+            st["batch_p95"] = round(p95, 3) if p95 is not None else None
+            out[name] = st
+        return out
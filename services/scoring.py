@@ -9,10 +9,12 @@ CATEGORY_WEIGHTS = {"Disaster": 20, "Crime": 15, "Politics": 5}
 SENTIMENT_WEIGHTS = {"Negative": 5, "Neutral": 0, "Positive": -3}
 
 def compute_risk(text: str, analysis: dict) -> tuple[int, list]:
+    # shares the single compiled term scan with the rule-based analyzer
+    from services.ai_providers.mock_provider import term_hits
     score, hits = 0, []
-    low = (text or "").lower()
+    found = term_hits(text or "")
     for term, w in CRITICAL_TERMS:
-        if term in low:
+        if term in found:
             score += w; hits.append(f"term:{term}+{w}")
     cat = analysis.get("category")
     if CATEGORY_WEIGHTS.get(cat):
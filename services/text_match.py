@@ -0,0 +1,49 @@
+import re
+
+
+def _trie_pattern(node: dict) -> str:
+    # siblings start with different characters, so at most one branch can
+    # match and the only backtracking is the greedy optional at term ends
+    alts = [re.escape(ch) + _trie_pattern(child)
+            for ch, child in sorted(node.items()) if ch != ""]
+    if not alts:
+        return ""
+    body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+    return f"(?:{body})?" if "" in node else body
+
+
+class TermMatcher:
+    """Finds every dictionary term occurring as a substring, in one pass.
+
+    The terms are compiled into a single trie-shaped regex inside a
+    lookahead, so each text position is tried once against the trie and
+    yields the longest term starting there. Shorter terms starting at the
+    same position are exactly the prefixes of that term, which are
+    precomputed. Cost grows with text length and term length, not with the
+    number of terms.
+    """
+
+    def __init__(self, terms):
+        self.terms = frozenset(t for t in terms if t)
+        trie = {}
+        for t in self.terms:
+            node = trie
+            for ch in t:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        self._re = re.compile(f"(?=({_trie_pattern(trie)}))") if trie else None
+        self._prefixes = {
+            t: frozenset(t[:i] for i in range(1, len(t) + 1) if t[:i] in self.terms)
+            for t in self.terms
+        }
+
+    def find(self, text: str) -> frozenset:
+        """Terms found in ``text`` (already lowercased by the caller)."""
+        if self._re is None:
+            return frozenset()
+        hits = set()
+        for m in self._re.finditer(text):
+            longest = m.group(1)
+            if longest not in hits:
+                hits |= self._prefixes[longest]
+        return frozenset(hits)
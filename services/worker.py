@@ -0,0 +1,117 @@
+import os, socket, threading
+
+from services.pipeline import fetch_new_items, commit_fetch, enrich_items
+from services.poller import record_poll
+from services.ingest import _host_slot
+from services import rate_limit, metrics
+from storage import jobs
+
+MAX_ITEMS = int(os.getenv("POLL_MAX_ITEMS", 50))
+FAST = os.getenv("POLL_FAST", "0") == "1"
+IDLE_WAIT = float(os.getenv("WORKER_IDLE_SECONDS", 1.0))
+HOST_RETRY = 5.0
+
+
+class Retry(Exception):
+    """Put the job back without counting it as a failure."""
+
+
+# ------------------------------
+# HANDLERS
+# ------------------------------
+
+def handle_fetch(payload: dict):
+    """Fetch a feed and hand its new entries to an analyze job.
+
+    Entries are marked seen only once the analyze job is stored, so a crash
+    in between re-fetches them rather than losing them. Feed errors are not
+    job failures: they only push the feed's next poll back.
+    """
+    url = payload["url"]
+    host = _host_slot(url)
+    if not host.acquire(blocking=False):
+        raise Retry("host busy")
+    try:
+        try:
+            feed = fetch_new_items(url, max_items=MAX_ITEMS, fast=FAST)
+        except Exception as e:
+            feed = {"error": str(e)}
+        if not feed.get("error"):
+            if feed["new"]:
+                jobs.enqueue("analyze", {"preset": payload.get("preset"), "url": url,
+                                         "items": feed["new"]})
+            commit_fetch(url, feed)
+        record_poll(url, feed)
+    finally:
+        host.release()
+    if feed.get("error"):
+        print(f"[Worker] fetch {payload.get('preset') or url} failed:", feed["error"])
+
+
+def handle_analyze(payload: dict):
+    enrich_items(payload["items"], payload.get("preset"))
+
+
+HANDLERS = {"fetch": handle_fetch, "analyze": handle_analyze}
+
+
+# ------------------------------
+# WORKER
+# ------------------------------
+
+class Worker:
+    """Claims jobs from the queue and runs them, renewing the lease meanwhile."""
+
+    def __init__(self, name: str, kinds=None, lease=jobs.LEASE_SECONDS):
+        self.name = name
+        self.kinds = kinds
+        self.lease = lease
+        self.done = 0
+        self.failed = 0
+
+    def run(self, stop: threading.Event):
+        while not stop.is_set():
+            try:
+                job = jobs.claim(self.name, self.kinds, self.lease)
+            except Exception as e:
+                print("[Worker] claim failed:", e)
+                job = None
+            if job is None:
+                stop.wait(IDLE_WAIT)
+                continue
+            self._execute(job)
+
+    def _heartbeat(self, job_id: int, finished: threading.Event):
+        while not finished.wait(self.lease / 3):
+            jobs.extend_lease(job_id, self.name, self.lease)
+
+    def _execute(self, job: dict):
+        finished = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(job["id"], finished), daemon=True).start()
+        try:
+            with rate_limit.priority(rate_limit.BACKGROUND):
+                HANDLERS[job["kind"]](job["payload"])
+            jobs.complete(job["id"], self.name)
+            self.done += 1
+            metrics.JOBS.inc(kind=job["kind"], outcome="done")
+        except Retry as e:
+            jobs.release(job["id"], self.name, str(e), delay=HOST_RETRY)
+            metrics.JOBS.inc(kind=job["kind"], outcome="released")
+        except Exception as e:
+            self.failed += 1
+            metrics.JOBS.inc(kind=job["kind"], outcome="failed")
+            print(f"[Worker] {job['kind']} job {job['id']} failed (attempt {job['attempts']}):", e)
+            jobs.fail(job["id"], self.name, str(e))
+        finally:
+            finished.set()
+
+
+def run_workers(threads: int, stop: threading.Event, kinds=None):
+    """Run ``threads`` workers in this process until ``stop`` is set."""
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    pool = [threading.Thread(target=Worker(f"{base}:{i}", kinds).run, args=(stop,),
+                             name=f"worker-{i}") for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
@@ -1,11 +1,15 @@
 import os
 import json
+import hashlib
 import datetime
 from sqlalchemy import (
-    create_engine, Column, Integer, Float, String, Text, ForeignKey
+    create_engine, Column, Integer, Float, String, Text, DateTime, ForeignKey,
+    UniqueConstraint, Index, inspect, text, select, or_, and_, false
 )
 from sqlalchemy.orm import declarative_base, sessionmaker
 
+from services import metrics
+
 # ------------------------------
 # DATABASE CONFIG
 # ------------------------------
@@ -44,7 +48,21 @@ class NewsItem(Base):
     keywords = Column(Text)     # stored as JSON string
     entities = Column(Text)     # stored as JSON string
     risk_point = Column(Integer)
-    created_at = Column(Text)
+    rule_hits = Column(Text)    # stored as JSON string, see services.scoring
+    content = Column(Text)             # article text the analysis ran on
+    story_id = Column(String(32))      # near-duplicate cluster, see services.dedup
+    provider = Column(String(50))      # which provider answered the analysis
+    created_at = Column(DateTime)      # UTC
+    content_key = Column(String(64))   # sha256 of source URL (or title), see news_key()
+
+    __table_args__ = (
+        Index("ux_news_items_content_key", "content_key", unique=True),
+        Index("ix_news_items_created_risk", "created_at", "risk_point"),
+        Index("ix_news_items_category", "category"),
+        Index("ix_news_items_source", "source"),
+        Index("ix_news_items_risk_created_id", "risk_point", "created_at", "id"),
+        Index("ix_news_items_story_id", "story_id"),
+    )
 
 
 class UserEmail(Base):
@@ -60,7 +78,41 @@ class UserStar(Base):
     id = Column(Integer, primary_key=True)
     email_id = Column(Integer, ForeignKey("user_emails.id"))
     news_id = Column(Integer, ForeignKey("news_items.id"))
-    starred_at = Column(Text)
+    starred_at = Column(DateTime)
+
+
+class FeedState(Base):
+    __tablename__ = "feed_state"
+
+    url = Column(String(500), primary_key=True)
+    etag = Column(Text)
+    last_modified = Column(Text)
+    checked_at = Column(DateTime)
+    # adaptive polling state, see services.poller
+    poll_gap = Column(Float)           # learned seconds between entries
+    poll_errors = Column(Integer)      # consecutive failed polls
+    poll_unchanged = Column(Integer)   # consecutive polls with nothing new
+    last_poll = Column(DateTime)
+    next_poll = Column(DateTime)
+
+
+class SeenEntry(Base):
+    __tablename__ = "seen_entries"
+    __table_args__ = (UniqueConstraint("feed_url", "entry_key"),)
+
+    id = Column(Integer, primary_key=True)
+    feed_url = Column(String(500), nullable=False)
+    entry_key = Column(String(500), nullable=False)
+    link = Column(Text)
+    seen_at = Column(DateTime)
+
+
+class AnalysisCacheEntry(Base):
+    __tablename__ = "analysis_cache"
+
+    key = Column(String(200), primary_key=True)   # provider:model:prompt:sha256
+    result = Column(Text)                         # stored as JSON string
+    created_at = Column(DateTime)
 
 
 # ------------------------------
@@ -69,29 +121,280 @@ class UserStar(Base):
 
 def init_db():
     """Create tables if missing (AWS-friendly)."""
+    from storage.rollups import init_rollups  # registers the rollup tables
+    from storage.jobs import init_events  # registers the queue tables
+    from storage.terms import init_terms  # registers the keyword statistics table
+    import storage.stories  # noqa: F401  registers the story cluster and alert log tables
     Base.metadata.create_all(engine)
+    _migrate()
+    init_events()
+    from storage.search import init_search
+    init_search()
+    init_rollups()
+    init_terms()
+
+
+_TIMESTAMP = "DATETIME" if engine.dialect.name == "sqlite" else "TIMESTAMP"
+
+# plain nullable columns added after the first release
+_ADDED_COLUMNS = [
+    ("news_items", "content", "TEXT"),
+    ("news_items", "story_id", "VARCHAR(32)"),
+    ("news_items", "provider", "VARCHAR(50)"),
+    ("news_items", "rule_hits", "TEXT"),
+    ("feed_state", "poll_gap", "FLOAT"),
+    ("feed_state", "poll_errors", "INTEGER"),
+    ("feed_state", "poll_unchanged", "INTEGER"),
+    ("feed_state", "last_poll", _TIMESTAMP),
+    ("feed_state", "next_poll", _TIMESTAMP),
+]
+
+
+def _migrate():
+    """Bring tables created by older versions up to the current models."""
+    insp = inspect(engine)
+    existing = {t: {c["name"] for c in insp.get_columns(t)} for t in {t for t, _, _ in _ADDED_COLUMNS}}
+    for table, name, ddl in _ADDED_COLUMNS:
+        if name not in existing[table]:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+    cols = existing["news_items"]
+    if "content_key" not in cols:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE news_items ADD COLUMN content_key VARCHAR(64)"))
+            # backfill the newest row per source; older duplicates keep NULL
+            rows = conn.execute(text(
+                "SELECT id, source, title FROM news_items ORDER BY id DESC"
+            )).all()
+            taken = set()
+            for row_id, source, title in rows:
+                key = news_key({"source": source, "title": title})
+                if key in taken:
+                    continue
+                taken.add(key)
+                conn.execute(
+                    text("UPDATE news_items SET content_key = :k WHERE id = :id"),
+                    {"k": key, "id": row_id},
+                )
+    _migrate_datetimes()
+    for idx in NewsItem.__table__.indexes:
+        idx.create(engine, checkfirst=True)
+
+
+# timestamp columns that older versions stored as ISO text
+_DATETIME_COLUMNS = [
+    ("news_items", "created_at"),
+    ("user_stars", "starred_at"),
+    ("feed_state", "checked_at"),
+    ("seen_entries", "seen_at"),
+    ("analysis_cache", "created_at"),
+]
+
+
+def _migrate_datetimes():
+    """Convert ISO-text timestamps to the DateTime storage format in place.
+
+    SQLite has no native datetime type, so SQLAlchemy's DateTime there is a
+    sortable 'YYYY-MM-DD HH:MM:SS.ffffff' string. Old 'T'-separated values
+    are rewritten once, tracked with PRAGMA user_version. Other backends get
+    their column type altered to TIMESTAMP.
+    """
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            if conn.exec_driver_sql("PRAGMA user_version").scalar() >= 1:
+                return
+            for table, col in _DATETIME_COLUMNS:
+                conn.exec_driver_sql(
+                    f"UPDATE {table} SET {col} = replace({col}, 'T', ' ') "
+                    f"WHERE {col} LIKE '%T%'"
+                )
+            conn.exec_driver_sql("PRAGMA user_version = 1")
+        return
+
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table, col in _DATETIME_COLUMNS:
+            ctype = next(c["type"] for c in insp.get_columns(table) if c["name"] == col)
+            if isinstance(ctype, (Text, String)):
+                conn.execute(text(
+                    f"ALTER TABLE {table} ALTER COLUMN {col} TYPE TIMESTAMP "
+                    f"USING NULLIF({col}, '')::timestamp"
+                ))
 
 
 # ------------------------------
 # WRITE OPERATIONS
 # ------------------------------
 
+BULK_CHUNK = 500
+# columns refreshed when a re-polled story is upserted; created_at keeps first sighting
+_UPSERT_COLS = ("title", "source", "datetime", "category", "sentiment",
+                "toxicity", "keywords", "entities", "risk_point", "rule_hits", "content", "story_id",
+                "provider")
+
+
+def news_key(rec: dict) -> str:
+    """Stable identity of a story: its source URL, or its title if it has none."""
+    basis = (rec.get("source") or "").strip() or "title:" + (rec.get("title") or "").strip()
+    return hashlib.sha256(basis.encode("utf-8")).hexdigest()
+
+
+def _news_values(rec: dict, now) -> dict:
+    return {
+        "title": rec.get("title"),
+        "source": rec.get("source"),
+        "datetime": rec.get("datetime"),
+        "category": rec.get("category"),
+        "sentiment": rec.get("sentiment"),
+        "toxicity": float(rec.get("toxicity") or 0),
+        "keywords": json.dumps(rec.get("keywords", []), ensure_ascii=False),
+        "entities": json.dumps(rec.get("entities", []), ensure_ascii=False),
+        "risk_point": int(rec.get("risk_point", 0)),
+        "rule_hits": json.dumps(rec.get("rule_hits", []), ensure_ascii=False),
+        "content": rec.get("content"),
+        "story_id": rec.get("story_id"),
+        "provider": rec.get("provider"),
+        "created_at": now,
+        "content_key": news_key(rec),
+    }
+
+
+def _dialect_insert():
+    name = engine.dialect.name
+    if name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert
+
+
+def _upsert_stmt():
+    insert = _dialect_insert()
+    if insert is None:
+        return None
+    stmt = insert(NewsItem)
+    return stmt.on_conflict_do_update(
+        index_elements=["content_key"],
+        set_={c: stmt.excluded[c] for c in _UPSERT_COLS},
+    )
+
+
+def _insert_new_stmt():
+    # rows another transaction is inserting make this wait for its commit
+    return (_dialect_insert()(NewsItem)
+            .on_conflict_do_nothing(index_elements=["content_key"])
+            .returning(NewsItem.content_key))
+
+
+def save_news_items(records: list):
+    """Upsert many processed news records in one transaction.
+
+    Rows are keyed on news_key(), so re-polling a story updates it instead
+    of adding a duplicate. Inserts go out in executemany chunks of BULK_CHUNK.
+
+    New rows are inserted first and the rows that already existed are
+    locked before their rollup contribution is read, so two workers saving
+    the same story never both count it as new.
+    """
+    if not records:
+        return
+    now = datetime.datetime.utcnow()
+    # last write wins for duplicates inside one batch
+    rows = list({r["content_key"]: r for r in (_news_values(rec, now) for rec in records)}.values())
+    stmt = _upsert_stmt()
+    from storage import rollups
+    with metrics.DB_WRITE.time(table="news_items"), SessionLocal() as s:
+        if stmt is not None:
+            inserted = set()
+            for i in range(0, len(rows), BULK_CHUNK):
+                inserted.update(s.scalars(_insert_new_stmt(), rows[i:i + BULK_CHUNK]))
+            updates = [r for r in rows if r["content_key"] not in inserted]
+            before = rollups.snapshot(s, [r["content_key"] for r in updates], lock=True)
+            for i in range(0, len(updates), BULK_CHUNK):
+                s.execute(stmt, updates[i:i + BULK_CHUNK])
+        else:
+            before = rollups.snapshot(s, [r["content_key"] for r in rows], lock=True)
+            keys = [r["content_key"] for r in rows]
+            existing = {
+                n.content_key: n for n in
+                s.scalars(select(NewsItem).where(NewsItem.content_key.in_(keys)))
+            }
+            for r in rows:
+                item = existing.get(r["content_key"])
+                if item is None:
+                    s.add(NewsItem(**r))
+                else:
+                    for c in _UPSERT_COLS:
+                        setattr(item, c, r[c])
+            s.flush()
+        _index_saved(s, rows)
+        rollups.apply_changes(s, before, rows)
+        s.commit()
+
+
+def _index_saved(s, rows: list):
+    # keep the search index in step with the upserted rows, same transaction
+    from storage.search import index_news
+    by_key = {r["content_key"]: r for r in rows}
+    ids = s.execute(
+        select(NewsItem.id, NewsItem.content_key)
+        .where(NewsItem.content_key.in_(list(by_key)))
+    ).all()
+    index_news(s, [(news_id, by_key[key]) for news_id, key in ids])
+
+
 def save_news_item(rec: dict):
     """Stores one processed news record in the DB."""
-    with SessionLocal() as s:
-        item = NewsItem(
-            title=rec.get("title"),
-            source=rec.get("source"),
-            datetime=rec.get("datetime"),
-            category=rec.get("category"),
-            sentiment=rec.get("sentiment"),
-            toxicity=float(rec.get("toxicity") or 0),
-            keywords=json.dumps(rec.get("keywords", []), ensure_ascii=False),
-            entities=json.dumps(rec.get("entities", []), ensure_ascii=False),
-            risk_point=int(rec.get("risk_point", 0)),
-            created_at=datetime.datetime.utcnow().isoformat()
-        )
-        s.add(item)
+    save_news_items([rec])
+
+
+def save_feed_state(url: str, etag, last_modified):
+    """Remember the validators to send on the next conditional GET."""
+    with metrics.DB_WRITE.time(table="feed_state"), SessionLocal() as s:
+        st = s.get(FeedState, url) or FeedState(url=url)
+        st.etag = etag
+        st.last_modified = last_modified
+        st.checked_at = datetime.datetime.utcnow()
+        s.add(st)
+        s.commit()
+
+
+def save_feed_schedule(url: str, sched: dict):
+    """Store a feed's polling state (keys as in get_feed_schedules)."""
+    with metrics.DB_WRITE.time(table="feed_state"), SessionLocal() as s:
+        st = s.get(FeedState, url) or FeedState(url=url)
+        for k, v in sched.items():
+            setattr(st, k, v)
+        s.add(st)
+        s.commit()
+
+
+def mark_entries_seen(feed_url: str, entries: list):
+    """Record ``(entry_key, link)`` pairs as processed for a feed."""
+    if not entries:
+        return
+    now = datetime.datetime.utcnow()
+    with metrics.DB_WRITE.time(table="seen_entries"), SessionLocal() as s:
+        known = _seen_keys(s, feed_url, [k for k, _ in entries])
+        # insert oldest first so id order matches the feed's newest-first order
+        for key, link in reversed(entries):
+            if key in known:
+                continue
+            known.add(key)
+            s.add(SeenEntry(feed_url=feed_url, entry_key=key, link=link, seen_at=now))
+        s.commit()
+
+
+def save_cached_analysis(key: str, analysis: dict):
+    """Persist a provider result under its content-hash key."""
+    with metrics.DB_WRITE.time(table="analysis_cache"), SessionLocal() as s:
+        s.merge(AnalysisCacheEntry(
+            key=key,
+            result=json.dumps(analysis, ensure_ascii=False),
+            created_at=datetime.datetime.utcnow(),
+        ))
         s.commit()
 
 
@@ -121,7 +424,7 @@ def save_star(email: str, news_id: int):
         star = UserStar(
             email_id=user.id,
             news_id=news_id,
-            starred_at=datetime.datetime.utcnow().isoformat()
+            starred_at=datetime.datetime.utcnow()
         )
         s.add(star)
         s.commit()
@@ -132,31 +435,199 @@ def save_star(email: str, news_id: int):
 # READ OPERATIONS
 # ------------------------------
 
+def _seen_keys(s, feed_url: str, keys: list) -> set:
+    if not keys:
+        return set()
+    rows = (
+        s.query(SeenEntry.entry_key)
+        .filter(SeenEntry.feed_url == feed_url, SeenEntry.entry_key.in_(keys))
+        .all()
+    )
+    return {r[0] for r in rows}
+
+
+def get_feed_state(url: str) -> dict:
+    """Return the stored ETag/Last-Modified for a feed, if any."""
+    with SessionLocal() as s:
+        st = s.get(FeedState, url)
+        if not st:
+            return {}
+        return {"etag": st.etag, "modified": st.last_modified}
+
+
+_SCHEDULE_COLS = ("poll_gap", "poll_errors", "poll_unchanged", "last_poll", "next_poll")
+
+
+def get_feed_schedules(urls: list) -> dict:
+    """Polling state per feed URL; feeds never polled are missing."""
+    with SessionLocal() as s:
+        rows = s.query(FeedState).filter(FeedState.url.in_(urls)).all()
+        return {r.url: {c: getattr(r, c) for c in _SCHEDULE_COLS} for r in rows}
+
+
+def seen_entry_keys(feed_url: str, keys: list) -> set:
+    """Return the subset of ``keys`` already processed for this feed."""
+    with SessionLocal() as s:
+        return _seen_keys(s, feed_url, keys)
+
+
+def recent_feed_links(feed_url: str, limit: int) -> list:
+    """Links of the most recently seen entries of a feed, newest first."""
+    with SessionLocal() as s:
+        rows = (
+            s.query(SeenEntry.link)
+            .filter(SeenEntry.feed_url == feed_url)
+            .order_by(SeenEntry.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [r[0] for r in rows if r[0]]
+
+
+def get_cached_analysis(key: str, max_age: float = None):
+    """Cached provider result for ``key``, or None if missing or too old."""
+    with SessionLocal() as s:
+        row = s.get(AnalysisCacheEntry, key)
+        if not row:
+            return None
+        if max_age is not None:
+            cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=max_age)
+            if row.created_at is None or row.created_at < cutoff:
+                return None
+        return json.loads(row.result)
+
+
+def list_user_emails() -> list:
+    """All subscribed e-mail addresses."""
+    with SessionLocal() as s:
+        return [r[0] for r in s.query(UserEmail.email).all()]
+
+
+def _news_row(r) -> dict:
+    return {
+        "id": r.id,
+        "title": r.title,
+        "source": r.source,
+        "datetime": r.datetime,
+        "category": r.category,
+        "sentiment": r.sentiment,
+        "toxicity": r.toxicity,
+        "keywords": json.loads(r.keywords or "[]"),
+        "entities": json.loads(r.entities or "[]"),
+        "risk_point": r.risk_point,
+        "rule_hits": json.loads(r.rule_hits or "[]"),
+        "story_id": r.story_id,
+        "provider": r.provider,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+    }
+
+
+def fetch_news_by_sources(sources: list) -> dict:
+    """Latest stored record for each source URL, keyed by URL."""
+    if not sources:
+        return {}
+    with SessionLocal() as s:
+        rows = (
+            s.query(NewsItem)
+            .filter(NewsItem.source.in_(sources))
+            .order_by(NewsItem.id.asc())
+            .all()
+        )
+        return {r.source: _news_row(r) for r in rows}
+
+
 def fetch_news_for_date(date_str: str):
     """Return all news from a specific date, sorted by risk."""
-    start = f"{date_str}T00:00:00"
-    end = f"{date_str}T23:59:59"
+    start = datetime.datetime.strptime(date_str, "%Y-%m-%d")
+    end = start + datetime.timedelta(days=1)
 
     with SessionLocal() as s:
         rows = (
             s.query(NewsItem)
-            .filter(NewsItem.created_at >= start, NewsItem.created_at <= end)
+            .filter(NewsItem.created_at >= start, NewsItem.created_at < end)
             .order_by(NewsItem.risk_point.desc(), NewsItem.created_at.desc())
             .all()
         )
 
-        out = []
-        for r in rows:
-            out.append({
-                "title": r.title,
-                "source": r.source,
-                "datetime": r.datetime,
-                "category": r.category,
-                "sentiment": r.sentiment,
-                "toxicity": r.toxicity,
-                "keywords": json.loads(r.keywords or "[]"),
-                "entities": json.loads(r.entities or "[]"),
-                "risk_point": r.risk_point,
-                "created_at": r.created_at,
-            })
-        return out
+        return [_news_row(r) for r in rows]
+
+
+HISTORY_CHUNK = 500
+
+
+def _history_query(s, filters: dict):
+    q = s.query(NewsItem)
+    if filters.get("start"):
+        q = q.filter(NewsItem.created_at >= filters["start"])
+    if filters.get("end"):
+        q = q.filter(NewsItem.created_at < filters["end"])
+    if filters.get("category"):
+        q = q.filter(NewsItem.category == filters["category"])
+    if filters.get("sentiment"):
+        q = q.filter(NewsItem.sentiment == filters["sentiment"])
+    if filters.get("min_risk") is not None:
+        q = q.filter(NewsItem.risk_point >= filters["min_risk"])
+    if filters.get("source"):
+        host = _like_escape(filters["source"].lower())
+        q = q.filter(or_(NewsItem.source.like(f"%://{host}/%", escape="\\"),
+                         NewsItem.source.like(f"%.{host}/%", escape="\\")))
+    return q
+
+
+def _like_escape(value: str) -> str:
+    # the user's text matches literally, wildcards included
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _after_key(cols: list, key: tuple):
+    """Rows past ``key`` in ``cols`` DESC NULLS LAST order; key parts may be None."""
+    col, value = cols[0], key[0]
+    if value is None:
+        later, same = false(), col.is_(None)
+    else:
+        later, same = or_(col < value, col.is_(None)), col == value
+    if len(cols) == 1:
+        return later
+    return or_(later, and_(same, _after_key(cols[1:], key[1:])))
+
+
+def fetch_news_page(filters: dict, after=None, limit: int = 50):
+    """One page of stored news, highest risk first, by keyset pagination.
+
+    Rows are ordered by (risk_point, created_at, id) descending, NULLs last.
+    ``after`` is the key of the last row of the previous page; the second
+    return value is the key to pass for the next page, or None on the last
+    page.
+    """
+    with SessionLocal() as s:
+        q = _history_query(s, filters)
+        if after is not None:
+            q = q.filter(_after_key([NewsItem.risk_point, NewsItem.created_at, NewsItem.id], after))
+        rows = (
+            q.order_by(NewsItem.risk_point.desc().nulls_last(), NewsItem.created_at.desc().nulls_last(),
+                       NewsItem.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        more = len(rows) > limit
+        rows = rows[:limit]
+        nxt = (rows[-1].risk_point, rows[-1].created_at, rows[-1].id) if more else None
+        return [_news_row(r) for r in rows], nxt
+
+
+def iter_news(filters: dict, after=None, limit: int = None):
+    """Yield stored news in page order, HISTORY_CHUNK rows per query.
+
+    Each chunk uses its own short session, so memory stays flat however
+    many rows match.
+    """
+    sent = 0
+    while True:
+        size = HISTORY_CHUNK if limit is None else min(HISTORY_CHUNK, limit - sent)
+        if size <= 0:
+            return
+        rows, after = fetch_news_page(filters, after=after, limit=size)
+        yield from rows
+        sent += len(rows)
+        if after is None:
+            return
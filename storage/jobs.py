@@ -0,0 +1,340 @@
+import json
+import datetime
+from contextlib import contextmanager
+from sqlalchemy import (
+    Column, Integer, Float, String, Text, DateTime, Index, select, update, delete, func, or_, and_
+)
+from sqlalchemy.exc import IntegrityError
+
+from storage.db import Base, SessionLocal, engine
+from services import metrics
+
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 5
+RETRY_BASE = 30         # seconds; doubles per failed attempt
+
+
+# ------------------------------
+# MODELS
+# ------------------------------
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)          # "fetch" | "analyze"
+    payload = Column(Text)                             # stored as JSON string
+    status = Column(String(10), nullable=False)        # queued | running | done | failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=MAX_ATTEMPTS)
+    run_at = Column(DateTime)                          # UTC, not before
+    lease_until = Column(DateTime)                     # UTC, while running
+    worker = Column(String(100))
+    last_error = Column(Text)
+    dedupe_key = Column(String(200))                   # at most one open job per key
+    created_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ux_jobs_dedupe_key", "dedupe_key", unique=True),
+    )
+
+
+class Lease(Base):
+    __tablename__ = "leases"
+
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(100))
+    expires_at = Column(DateTime)
+
+
+class ProviderQuota(Base):
+    """Rate-limit buckets of one provider (services.rate_limit), shared by every process."""
+    __tablename__ = "provider_quota"
+
+    name = Column(String(50), primary_key=True)
+    requests = Column(Float)                           # bucket levels as of ``stamp``
+    tokens = Column(Float)
+    stamp = Column(Float)                              # unix time
+    paused_until = Column(Float)                       # unix time, set after a 429
+
+
+class StreamEvent(Base):
+    """New records for /api/stream, written by whichever process analyzed them."""
+    __tablename__ = "stream_events"
+    # ids must never be reused once purge() empties the table: tails resume by id
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    preset = Column(String(100))
+    data = Column(Text)                                # record as JSON string
+    created_at = Column(DateTime, index=True)
+
+
+# ------------------------------
+# QUEUE
+# ------------------------------
+
+def _now():
+    return datetime.datetime.utcnow()
+
+
+def enqueue(kind: str, payload: dict, run_at=None, dedupe_key=None,
+            max_attempts=MAX_ATTEMPTS) -> bool:
+    """Add a job; False if an open job with the same ``dedupe_key`` exists."""
+    now = _now()
+    with SessionLocal() as s:
+        s.add(Job(kind=kind, payload=json.dumps(payload, ensure_ascii=False),
+                  status="queued", attempts=0, max_attempts=max_attempts,
+                  run_at=run_at or now, dedupe_key=dedupe_key, created_at=now))
+        try:
+            s.commit()
+        except IntegrityError:
+            return False
+    return True
+
+
+def open_dedupe_keys(prefix: str) -> set:
+    """Dedupe keys of queued or running jobs starting with ``prefix``."""
+    with SessionLocal() as s:
+        rows = s.execute(select(Job.dedupe_key).where(Job.dedupe_key.like(prefix + "%"))).all()
+        return {r[0] for r in rows}
+
+
+def _claimable(now):
+    return or_(
+        and_(Job.status == "queued", Job.run_at <= now),
+        and_(Job.status == "running", Job.lease_until < now, Job.attempts < Job.max_attempts),
+    )
+
+
+def claim(worker: str, kinds=None, lease=LEASE_SECONDS):
+    """Lease the next due job to ``worker``, or return None.
+
+    Jobs whose lease ran out (the worker died) are claimable again. The claim
+    is a conditional UPDATE, so concurrent workers never get the same job.
+    """
+    now = _now()
+    with SessionLocal() as s:
+        q = select(Job.id).where(_claimable(now))
+        if kinds:
+            q = q.where(Job.kind.in_(kinds))
+        candidates = [r[0] for r in s.execute(q.order_by(Job.run_at, Job.id).limit(10))]
+        for job_id in candidates:
+            res = s.execute(
+                update(Job)
+                .where(Job.id == job_id, _claimable(now))
+                .values(status="running", worker=worker, attempts=Job.attempts + 1,
+                        lease_until=now + datetime.timedelta(seconds=lease))
+            )
+            s.commit()
+            if res.rowcount == 1:
+                job = s.get(Job, job_id)
+                return {"id": job.id, "kind": job.kind, "attempts": job.attempts,
+                        "payload": json.loads(job.payload or "{}")}
+    return None
+
+
+def extend_lease(job_id: int, worker: str, lease=LEASE_SECONDS) -> bool:
+    with SessionLocal() as s:
+        res = s.execute(
+            update(Job).where(Job.id == job_id, Job.worker == worker, Job.status == "running")
+            .values(lease_until=_now() + datetime.timedelta(seconds=lease))
+        )
+        s.commit()
+        return res.rowcount == 1
+
+
+def complete(job_id: int, worker: str):
+    with SessionLocal() as s:
+        s.execute(
+            update(Job).where(Job.id == job_id, Job.worker == worker)
+            .values(status="done", dedupe_key=None, lease_until=None, finished_at=_now())
+        )
+        s.commit()
+
+
+def fail(job_id: int, worker: str, error: str):
+    """Requeue with exponential backoff, or mark failed after max_attempts."""
+    now = _now()
+    with SessionLocal() as s:
+        job = s.get(Job, job_id)
+        if job is None or job.worker != worker:
+            return
+        job.last_error = (error or "")[:2000]
+        job.lease_until = None
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+            job.dedupe_key = None
+            job.finished_at = now
+        else:
+            job.status = "queued"
+            job.run_at = now + datetime.timedelta(seconds=RETRY_BASE * 2 ** (job.attempts - 1))
+        s.commit()
+
+
+def release(job_id: int, worker: str, reason: str, delay: float = 0):
+    """Requeue a claimed job without counting the attempt."""
+    with SessionLocal() as s:
+        s.execute(
+            update(Job).where(Job.id == job_id, Job.worker == worker)
+            .values(status="queued", attempts=Job.attempts - 1, lease_until=None,
+                    last_error=reason, run_at=_now() + datetime.timedelta(seconds=delay))
+        )
+        s.commit()
+
+
+def reap():
+    """Fail running jobs whose lease expired on their last attempt."""
+    now = _now()
+    with SessionLocal() as s:
+        s.execute(
+            update(Job)
+            .where(Job.status == "running", Job.lease_until < now,
+                   Job.attempts >= Job.max_attempts)
+            .values(status="failed", dedupe_key=None, finished_at=now,
+                    last_error="lease expired")
+        )
+        s.commit()
+
+
+def purge(keep_hours: float):
+    """Drop finished jobs and stream events older than ``keep_hours``."""
+    cutoff = _now() - datetime.timedelta(hours=keep_hours)
+    with SessionLocal() as s:
+        s.execute(delete(Job).where(Job.status.in_(("done", "failed")), Job.finished_at < cutoff))
+        s.execute(delete(StreamEvent).where(StreamEvent.created_at < cutoff))
+        s.commit()
+
+
+def queue_stats() -> dict:
+    with SessionLocal() as s:
+        rows = s.execute(select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status)).all()
+    out = {}
+    for kind, status, n in rows:
+        out.setdefault(kind, {})[status] = n
+    return out
+
+
+# ------------------------------
+# LEADER LEASE
+# ------------------------------
+
+def acquire_lease(name: str, holder: str, ttl: float) -> bool:
+    """Take or renew the named lease; True while ``holder`` owns it."""
+    now = _now()
+    expires = now + datetime.timedelta(seconds=ttl)
+    with SessionLocal() as s:
+        res = s.execute(
+            update(Lease)
+            .where(Lease.name == name, or_(Lease.holder == holder, Lease.expires_at < now))
+            .values(holder=holder, expires_at=expires)
+        )
+        s.commit()
+        if res.rowcount == 1:
+            return True
+        s.add(Lease(name=name, holder=holder, expires_at=expires))
+        try:
+            s.commit()
+            return True
+        except IntegrityError:
+            return False
+
+
+def release_lease(name: str, holder: str):
+    with SessionLocal() as s:
+        s.execute(delete(Lease).where(Lease.name == name, Lease.holder == holder))
+        s.commit()
+
+
+# ------------------------------
+# PROVIDER QUOTA
+# ------------------------------
+
+def init_quota(name: str, requests: float, tokens: float, now: float):
+    """Create the provider's quota row with full buckets, unless it exists."""
+    with SessionLocal() as s:
+        if s.get(ProviderQuota, name) is not None:
+            return
+        s.add(ProviderQuota(name=name, requests=requests, tokens=tokens, stamp=now, paused_until=0.0))
+        try:
+            s.commit()
+        except IntegrityError:
+            pass
+
+
+@contextmanager
+def locked_quota(name: str):
+    """The provider's quota row, locked for the block and committed after it.
+
+    The no-op UPDATE comes first so the row (SQLite: the database) is
+    write-locked before it is read, and concurrent takers queue up.
+    """
+    with metrics.DB_WRITE.time(table="provider_quota"), SessionLocal() as s:
+        s.execute(update(ProviderQuota).where(ProviderQuota.name == name).values(name=name))
+        row = s.get(ProviderQuota, name)
+        yield row
+        s.commit()
+
+
+def pause_quota(name: str, until: float):
+    """Hold the provider back until unix time ``until``, in every process."""
+    with SessionLocal() as s:
+        s.execute(
+            update(ProviderQuota)
+            .where(ProviderQuota.name == name, ProviderQuota.paused_until < until)
+            .values(paused_until=until)
+        )
+        s.commit()
+
+
+# ------------------------------
+# STREAM EVENTS
+# ------------------------------
+
+def init_events():
+    """Rebuild a SQLite stream_events table created without AUTOINCREMENT.
+
+    Events are short-lived, so the old rows are dropped; the id sequence
+    carries on from the old highest id.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        ddl = conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'stream_events'"
+        ).scalar()
+        if not ddl or "AUTOINCREMENT" in ddl.upper():
+            return
+        top = conn.execute(select(func.max(StreamEvent.id))).scalar() or 0
+        StreamEvent.__table__.drop(conn)
+        StreamEvent.__table__.create(conn)
+        if top:
+            conn.exec_driver_sql(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('stream_events', ?)", (top,))
+
+
+def append_events(preset, records: list):
+    if not records:
+        return
+    now = _now()
+    with metrics.DB_WRITE.time(table="stream_events"), SessionLocal() as s:
+        s.add_all(StreamEvent(preset=preset, data=json.dumps(r, ensure_ascii=False), created_at=now)
+                  for r in records)
+        s.commit()
+
+
+def events_after(last_id: int, limit: int = 500) -> list:
+    """``(id, preset, record)`` for events newer than ``last_id``, oldest first."""
+    with SessionLocal() as s:
+        rows = s.execute(
+            select(StreamEvent.id, StreamEvent.preset, StreamEvent.data)
+            .where(StreamEvent.id > last_id).order_by(StreamEvent.id).limit(limit)
+        ).all()
+    return [(i, p, json.loads(d)) for i, p, d in rows]
+
+
+def last_event_id() -> int:
+    with SessionLocal() as s:
+        return s.execute(select(func.max(StreamEvent.id))).scalar() or 0
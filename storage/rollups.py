@@ -0,0 +1,196 @@
+import json
+import datetime
+from collections import defaultdict
+from urllib.parse import urlparse
+from sqlalchemy import Column, Integer, Float, String, Date, select, func
+
+from storage.db import Base, engine, SessionLocal, NewsItem
+
+
+# ------------------------------
+# MODELS
+# ------------------------------
+
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String(50), primary_key=True)
+    sentiment = Column(String(50), primary_key=True)
+    source = Column(String(200), primary_key=True)   # host of the article URL
+    count = Column(Integer, default=0)
+    risk_sum = Column(Float, default=0)
+    toxicity_sum = Column(Float, default=0)
+
+
+class DailyKeyword(Base):
+    __tablename__ = "daily_keywords"
+
+    day = Column(Date, primary_key=True)
+    keyword = Column(String(100), primary_key=True)
+    count = Column(Integer, default=0)
+
+
+# ------------------------------
+# INCREMENTAL MAINTENANCE
+# ------------------------------
+
+def _host(url) -> str:
+    return (urlparse(url or "").netloc or "").lower()[:200]
+
+
+def _contribution(day, r) -> tuple:
+    keywords = r["keywords"]
+    if isinstance(keywords, str):
+        keywords = json.loads(keywords or "[]")
+    bucket = (day, r["category"] or "", r["sentiment"] or "", _host(r["source"]))
+    return bucket, float(r["risk_point"] or 0), float(r["toxicity"] or 0), keywords
+
+
+def snapshot(s, keys: list, lock=False) -> dict:
+    """Current contribution of already-stored rows, keyed by content_key.
+
+    With ``lock`` the rows stay locked (SELECT ... FOR UPDATE) until the
+    transaction ends, so nobody changes them between this read and the
+    caller's update.
+    """
+    if not keys:
+        return {}
+    q = (select(NewsItem.content_key, NewsItem.created_at, NewsItem.category,
+                NewsItem.sentiment, NewsItem.source, NewsItem.risk_point,
+                NewsItem.toxicity, NewsItem.keywords)
+         .where(NewsItem.content_key.in_(keys)))
+    if lock:
+        q = q.with_for_update()
+    rows = s.execute(q).mappings().all()
+    return {r["content_key"]: _contribution(r["created_at"].date(), r) for r in rows}
+
+
+def _upsert(s, model, keys, rows, sums):
+    name = engine.dialect.name
+    if name in ("sqlite", "postgresql"):
+        if name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={c: getattr(model, c) + stmt.excluded[c] for c in sums},
+        )
+        s.execute(stmt, rows)
+        return
+    for r in rows:
+        obj = s.get(model, tuple(r[k] for k in keys))
+        if obj is None:
+            s.add(model(**r))
+        else:
+            for c in sums:
+                setattr(obj, c, (getattr(obj, c) or 0) + r[c])
+
+
+def apply_changes(s, before: dict, rows: list):
+    """Fold a batch of upserted news rows into the rollups.
+
+    ``before`` is the snapshot() taken before the upsert. A row that already
+    existed has its old contribution removed and its new one added on its
+    original day, so re-polled stories are never counted twice.
+    """
+    buckets = defaultdict(lambda: [0, 0.0, 0.0])
+    words = defaultdict(int)
+
+    def add(contrib, sign):
+        bucket, risk, tox, keywords = contrib
+        acc = buckets[bucket]
+        acc[0] += sign
+        acc[1] += sign * risk
+        acc[2] += sign * tox
+        for kw in keywords:
+            words[(bucket[0], kw[:100])] += sign
+
+    for r in rows:
+        old = before.get(r["content_key"])
+        day = old[0][0] if old else r["created_at"].date()
+        if old:
+            add(old, -1)
+        add(_contribution(day, r), 1)
+
+    bucket_rows = [
+        {"day": b[0], "category": b[1], "sentiment": b[2], "source": b[3],
+         "count": n, "risk_sum": rs, "toxicity_sum": ts}
+        for b, (n, rs, ts) in buckets.items() if n or rs or ts
+    ]
+    word_rows = [{"day": d, "keyword": kw, "count": n} for (d, kw), n in words.items() if n]
+    if bucket_rows:
+        _upsert(s, DailyRollup, ["day", "category", "sentiment", "source"], bucket_rows,
+                ("count", "risk_sum", "toxicity_sum"))
+    if word_rows:
+        _upsert(s, DailyKeyword, ["day", "keyword"], word_rows, ("count",))
+
+
+def init_rollups():
+    """Build the rollups from news_items when the tables are first created."""
+    with SessionLocal() as s:
+        if s.query(DailyRollup.day).first() is not None:
+            return
+        if s.query(NewsItem.id).filter(NewsItem.created_at.isnot(None)).first() is None:
+            return
+        last_id = 0
+        while True:
+            rows = s.execute(
+                select(NewsItem.id, NewsItem.content_key, NewsItem.created_at,
+                       NewsItem.category, NewsItem.sentiment, NewsItem.source,
+                       NewsItem.risk_point, NewsItem.toxicity, NewsItem.keywords)
+                .where(NewsItem.id > last_id, NewsItem.created_at.isnot(None))
+                .order_by(NewsItem.id).limit(1000)
+            ).mappings().all()
+            if not rows:
+                break
+            apply_changes(s, {}, rows)
+            last_id = rows[-1]["id"]
+        s.commit()
+
+
+# ------------------------------
+# REPORTS
+# ------------------------------
+
+def report(start: datetime.date, end: datetime.date, top_k: int = 20) -> dict:
+    """Aggregates for the inclusive day range, read only from the rollups."""
+    in_range = (DailyRollup.day >= start, DailyRollup.day <= end)
+    with SessionLocal() as s:
+        buckets = s.execute(
+            select(DailyRollup.category, DailyRollup.sentiment, DailyRollup.source,
+                   func.sum(DailyRollup.count), func.sum(DailyRollup.risk_sum),
+                   func.sum(DailyRollup.toxicity_sum))
+            .where(*in_range)
+            .group_by(DailyRollup.category, DailyRollup.sentiment, DailyRollup.source)
+        ).all()
+        days = s.execute(
+            select(DailyRollup.day, func.sum(DailyRollup.count), func.sum(DailyRollup.risk_sum))
+            .where(*in_range).group_by(DailyRollup.day).order_by(DailyRollup.day)
+        ).all()
+        keywords = s.execute(
+            select(DailyKeyword.keyword, func.sum(DailyKeyword.count).label("n"))
+            .where(DailyKeyword.day >= start, DailyKeyword.day <= end)
+            .group_by(DailyKeyword.keyword)
+            .order_by(func.sum(DailyKeyword.count).desc()).limit(top_k)
+        ).all()
+
+    def avg(total, n):
+        return round(total / n, 3) if n else 0.0
+
+    return {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "days": [
+            {"day": d.isoformat(), "count": n, "avg_risk": avg(rs, n)}
+            for d, n, rs in days if n
+        ],
+        "buckets": sorted((
+            {"category": c, "sentiment": se, "source": so, "count": n,
+             "avg_risk": avg(rs, n), "avg_toxicity": avg(ts, n)}
+            for c, se, so, n, rs, ts in buckets if n
+        ), key=lambda b: -b["count"]),
+        "top_keywords": [{"keyword": k, "count": n} for k, n in keywords if n > 0],
+    }
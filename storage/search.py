@@ -0,0 +1,212 @@
+import os
+import json
+import math
+import unicodedata
+from collections import Counter
+from sqlalchemy import Column, Integer, String, text, func, inspect
+from sqlalchemy.orm import declarative_base
+
+from storage.db import engine, SessionLocal, NewsItem, _news_row
+from services.ai_providers.mock_provider import STOP_TR, TOKEN_PAT
+
+# weight of risk_point (0-10) against the relevance score when ranking
+RISK_WEIGHT = float(os.getenv("SEARCH_RISK_WEIGHT", 0.5))
+# per-field BM25 weights: title, content, keywords
+FIELD_WEIGHTS = (3.0, 1.0, 2.0)
+K1, B = 1.2, 0.75
+
+USE_FTS5 = engine.dialect.name == "sqlite"
+
+
+# ------------------------------
+# TURKISH TEXT NORMALIZATION
+# ------------------------------
+
+def fold(s: str) -> str:
+    """Turkish case folding: I -> ı and İ -> i before lowercasing."""
+    s = unicodedata.normalize("NFC", s or "")
+    return s.replace("I", "ı").replace("İ", "i").lower()
+
+
+def search_tokens(s: str) -> list:
+    return [w for w in TOKEN_PAT.findall(fold(s)) if w not in STOP_TR]
+
+
+def _fields(rec: dict) -> tuple:
+    keywords = rec.get("keywords") or []
+    if isinstance(keywords, str):
+        keywords = json.loads(keywords or "[]")
+    return (
+        " ".join(search_tokens(rec.get("title"))),
+        " ".join(search_tokens(rec.get("content"))),
+        " ".join(search_tokens(" ".join(keywords))),
+    )
+
+
+# ------------------------------
+# INVERTED INDEX (non-SQLite backends)
+# ------------------------------
+
+# kept off storage.db.Base so init_db only creates these where they are used
+IndexBase = declarative_base()
+
+
+class SearchPosting(IndexBase):
+    __tablename__ = "search_postings"
+
+    term = Column(String(100), primary_key=True)
+    news_id = Column(Integer, primary_key=True, index=True)
+    tf = Column(Integer)        # field-weighted term frequency
+
+
+class SearchDoc(IndexBase):
+    __tablename__ = "search_docs"
+
+    news_id = Column(Integer, primary_key=True)
+    length = Column(Integer)    # field-weighted token count
+
+
+# ------------------------------
+# INDEX MAINTENANCE
+# ------------------------------
+
+def init_search():
+    """Create the search index and fill it from news_items if it is new."""
+    if USE_FTS5:
+        with engine.begin() as conn:
+            exists = conn.exec_driver_sql(
+                "SELECT 1 FROM sqlite_master WHERE name = 'news_fts'"
+            ).first()
+            if exists:
+                return
+            conn.exec_driver_sql(
+                "CREATE VIRTUAL TABLE news_fts USING fts5("
+                "title, content, keywords, tokenize = 'unicode61 remove_diacritics 0')"
+            )
+    else:
+        if inspect(engine).has_table("search_docs"):
+            return
+        IndexBase.metadata.create_all(engine)
+
+    with SessionLocal() as s:
+        last_id = 0
+        while True:
+            rows = (
+                s.query(NewsItem).filter(NewsItem.id > last_id)
+                .order_by(NewsItem.id).limit(1000).all()
+            )
+            if not rows:
+                break
+            index_news(s, [(r.id, {"title": r.title, "content": r.content,
+                                   "keywords": r.keywords}) for r in rows])
+            last_id = rows[-1].id
+        s.commit()
+
+
+def index_news(s, docs: list):
+    """(Re)index ``(news_id, record)`` pairs inside the caller's transaction."""
+    if not docs:
+        return
+    ids = [news_id for news_id, _ in docs]
+    if USE_FTS5:
+        s.execute(text("DELETE FROM news_fts WHERE rowid IN (%s)" % ",".join(map(str, ids))))
+        s.execute(
+            text("INSERT INTO news_fts (rowid, title, content, keywords) "
+                 "VALUES (:id, :title, :content, :keywords)"),
+            [dict(zip(("id", "title", "content", "keywords"), (news_id,) + _fields(rec)))
+             for news_id, rec in docs],
+        )
+        return
+
+    s.query(SearchPosting).filter(SearchPosting.news_id.in_(ids)).delete(synchronize_session=False)
+    s.query(SearchDoc).filter(SearchDoc.news_id.in_(ids)).delete(synchronize_session=False)
+    for news_id, rec in docs:
+        tf = Counter()
+        for weight, field in zip(FIELD_WEIGHTS, _fields(rec)):
+            for w in field.split():
+                tf[w[:100]] += weight
+        s.add(SearchDoc(news_id=news_id, length=int(sum(tf.values()))))
+        s.add_all(SearchPosting(term=w, news_id=news_id, tf=int(n)) for w, n in tf.items())
+
+
+# ------------------------------
+# QUERIES
+# ------------------------------
+
+def search_news(q: str, limit: int = 20) -> list:
+    """Ranked news for a keyword query, best first.
+
+    Every query token must match as a word prefix (so 'deprem' finds
+    'depremde'). Relevance is BM25 over title/content/keywords, blended
+    with RISK_WEIGHT * risk_point.
+    """
+    terms = search_tokens(q)
+    if not terms:
+        return []
+    if USE_FTS5:
+        return _search_fts5(terms, limit)
+    return _search_inverted(terms, limit)
+
+
+def _search_fts5(terms: list, limit: int) -> list:
+    match = " ".join(f'"{t}"*' for t in terms)
+    sql = text(
+        "SELECT f.rowid, -bm25(news_fts, :w_title, :w_content, :w_keywords) AS rel "
+        "FROM news_fts f JOIN news_items n ON n.id = f.rowid "
+        "WHERE news_fts MATCH :match "
+        "ORDER BY rel + :risk_w * COALESCE(n.risk_point, 0) DESC LIMIT :limit"
+    )
+    with SessionLocal() as s:
+        hits = s.execute(sql, {
+            "match": match, "limit": limit, "risk_w": RISK_WEIGHT,
+            "w_title": FIELD_WEIGHTS[0], "w_content": FIELD_WEIGHTS[1],
+            "w_keywords": FIELD_WEIGHTS[2],
+        }).all()
+        return _with_rows(s, hits)
+
+
+def _search_inverted(terms: list, limit: int) -> list:
+    with SessionLocal() as s:
+        n_docs, avgdl = s.query(func.count(SearchDoc.news_id), func.avg(SearchDoc.length)).one()
+        if not n_docs:
+            return []
+        avgdl = float(avgdl or 1.0)
+        per_term = []
+        for t in terms:
+            # prefix match as a range scan on the (term, news_id) key
+            per_term.append(dict(
+                s.query(SearchPosting.news_id, func.sum(SearchPosting.tf))
+                .filter(SearchPosting.term >= t, SearchPosting.term < t + "\uffff")
+                .group_by(SearchPosting.news_id).all()
+            ))
+        # AND semantics, like FTS5's implicit AND
+        common = set.intersection(*(set(p) for p in per_term))
+        if not common:
+            return []
+        lengths = dict(s.query(SearchDoc.news_id, SearchDoc.length)
+                       .filter(SearchDoc.news_id.in_(common)).all())
+        risks = dict(s.query(NewsItem.id, NewsItem.risk_point)
+                     .filter(NewsItem.id.in_(common)).all())
+
+        scored = []
+        for news_id in common:
+            dl = lengths.get(news_id) or avgdl
+            rel = 0.0
+            for postings in per_term:
+                df, tf = len(postings), postings[news_id]
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                rel += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * dl / avgdl))
+            scored.append((news_id, rel))
+        scored.sort(key=lambda h: h[1] + RISK_WEIGHT * (risks.get(h[0]) or 0), reverse=True)
+        return _with_rows(s, scored[:limit])
+
+
+def _with_rows(s, hits: list) -> list:
+    rows = {r.id: r for r in s.query(NewsItem).filter(NewsItem.id.in_([h[0] for h in hits]))}
+    out = []
+    for news_id, rel in hits:
+        if news_id in rows:
+            rec = _news_row(rows[news_id])
+            rec["score"] = round(float(rel), 4)
+            out.append(rec)
+    return out
@@ -0,0 +1,160 @@
+import json
+import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index, select, update, delete
+from sqlalchemy.exc import IntegrityError
+
+from storage.db import Base, SessionLocal, _dialect_insert
+from services import metrics
+
+
+# ------------------------------
+# MODELS
+# ------------------------------
+
+class Story(Base):
+    """A near-duplicate story cluster (services.dedup), shared by every worker."""
+    __tablename__ = "stories"
+
+    story_id = Column(String(32), primary_key=True)
+    signature = Column(Text)            # JSON MinHash of the first member, null if too short
+    analysis = Column(Text)             # JSON, once the first member is analyzed
+    size = Column(Integer, default=1)
+    created_at = Column(DateTime, index=True)
+
+
+class StoryBand(Base):
+    """LSH band bucket -> the story that claimed it first."""
+    __tablename__ = "story_bands"
+
+    band = Column(Integer, primary_key=True)
+    bucket = Column(String(32), primary_key=True)
+    story_id = Column(String(32), nullable=False)
+    created_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_story_bands_created", "created_at"),)
+
+
+class AlertLog(Base):
+    """When each (rule, story) alert last fired, for services.alerts' dedup."""
+    __tablename__ = "alert_log"
+
+    rule = Column(String(100), primary_key=True)
+    story = Column(String(500), primary_key=True)
+    fired_at = Column(DateTime, index=True)
+
+
+# ------------------------------
+# STORIES
+# ------------------------------
+
+def story_candidates(s, keys: list, cutoff) -> dict:
+    """``{story_id: (signature, analysis)}`` of live stories owning any of the band ``keys``."""
+    if not keys:
+        return {}
+    owners = s.execute(
+        select(StoryBand.story_id)
+        .where(StoryBand.created_at >= cutoff)
+        .where(StoryBand.band.in_({b for b, _ in keys}), StoryBand.bucket.in_({k for _, k in keys}))
+    ).scalars().all()
+    if not owners:
+        return {}
+    rows = s.execute(
+        select(Story.story_id, Story.signature, Story.analysis)
+        .where(Story.story_id.in_(set(owners)), Story.created_at >= cutoff)
+    ).all()
+    return {sid: (tuple(json.loads(sig)) if sig else None, json.loads(a) if a else None)
+            for sid, sig, a in rows}
+
+
+def claim_bands(s, story_id: str, keys: list, now, cutoff) -> bool:
+    """Register ``story_id`` as owner of its band buckets.
+
+    Buckets owned by a live story stay with it. Returns False when any of
+    them was taken, which is how two workers creating the same story at
+    once find out about each other: the later insert waits for the
+    earlier transaction and then conflicts.
+    """
+    rows = [{"band": b, "bucket": k, "story_id": story_id, "created_at": now} for b, k in keys]
+    insert = _dialect_insert()
+    if insert is None:
+        taken = False
+        for r in rows:
+            try:
+                with s.begin_nested():
+                    s.add(StoryBand(**r))
+            except IntegrityError:
+                taken = True
+        return not taken
+    stmt = insert(StoryBand)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["band", "bucket"],
+        set_={"story_id": stmt.excluded.story_id, "created_at": stmt.excluded.created_at},
+        where=StoryBand.created_at < cutoff,          # expired owners are replaced
+    ).returning(StoryBand.band)
+    return len(s.scalars(stmt, rows).all()) == len(rows)
+
+
+def add_story(s, story_id: str, sig, now):
+    s.add(Story(story_id=story_id, signature=json.dumps(sig) if sig else None, created_at=now, size=1))
+    s.flush()
+
+
+def grow_story(s, story_id: str):
+    s.execute(update(Story).where(Story.story_id == story_id).values(size=Story.size + 1))
+
+
+def drop_story(s, story_id: str):
+    s.execute(delete(StoryBand).where(StoryBand.story_id == story_id))
+    s.execute(delete(Story).where(Story.story_id == story_id))
+
+
+def save_story_analysis(story_id: str, analysis: dict):
+    with metrics.DB_WRITE.time(table="stories"), SessionLocal() as s:
+        s.execute(update(Story).where(Story.story_id == story_id)
+                  .values(analysis=json.dumps(analysis, ensure_ascii=False)))
+        s.commit()
+
+
+# ------------------------------
+# ALERT LOG
+# ------------------------------
+
+def claim_alert(rule: str, story: str, now: datetime.datetime, window: float) -> bool:
+    """Record that (rule, story) fires now, unless it already fired in the last ``window`` seconds.
+
+    Atomic across processes: of several workers claiming the same pair at
+    once exactly one gets True.
+    """
+    cutoff = now - datetime.timedelta(seconds=window)
+    row = {"rule": rule[:100], "story": story[:500], "fired_at": now}
+    insert = _dialect_insert()
+    with metrics.DB_WRITE.time(table="alert_log"), SessionLocal() as s:
+        if insert is None:
+            last = s.get(AlertLog, (row["rule"], row["story"]), with_for_update=True)
+            if last is not None and last.fired_at >= cutoff:
+                return False
+            try:
+                s.merge(AlertLog(**row))
+                s.commit()
+            except IntegrityError:
+                return False
+            return True
+        stmt = insert(AlertLog)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["rule", "story"],
+            set_={"fired_at": stmt.excluded.fired_at},
+            where=AlertLog.fired_at < cutoff,
+        ).returning(AlertLog.rule)
+        fired = s.execute(stmt, row).first() is not None
+        s.commit()
+        return fired
+
+
+def purge_stories(keep_hours: float):
+    """Drop stories, band buckets and alert log rows older than ``keep_hours``."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=keep_hours)
+    with SessionLocal() as s:
+        s.execute(delete(StoryBand).where(StoryBand.created_at < cutoff))
+        s.execute(delete(Story).where(Story.created_at < cutoff))
+        s.execute(delete(AlertLog).where(AlertLog.fired_at < cutoff))
+        s.commit()
@@ -0,0 +1,66 @@
+from sqlalchemy import Column, Integer, String, select
+
+from storage.db import Base, SessionLocal, NewsItem
+from storage.rollups import _upsert
+from services import metrics
+
+DOCS_KEY = ""           # row holding the number of documents counted
+
+
+# ------------------------------
+# MODELS
+# ------------------------------
+
+class TermStat(Base):
+    """Document frequency per keyword token, for services.keywords' IDF."""
+    __tablename__ = "term_stats"
+
+    term = Column(String(100), primary_key=True)
+    df = Column(Integer, default=0)
+
+
+# ------------------------------
+# INCREMENTAL MAINTENANCE
+# ------------------------------
+
+def load_terms():
+    """``(documents, {term: document frequency})`` as stored."""
+    with SessionLocal() as s:
+        rows = s.execute(select(TermStat.term, TermStat.df)).all()
+    df = dict(rows)
+    return df.pop(DOCS_KEY, 0), df
+
+
+def add_terms(documents: int, df: dict):
+    """Count ``documents`` more documents, with ``df`` holding the new per-term counts."""
+    rows = [{"term": t[:100], "df": n} for t, n in df.items() if n]
+    rows.append({"term": DOCS_KEY, "df": documents})
+    with metrics.DB_WRITE.time(table="term_stats"), SessionLocal() as s:
+        _upsert(s, TermStat, ["term"], rows, ("df",))
+        s.commit()
+
+
+def init_terms():
+    """Count the stored articles when the table is first created."""
+    from services.keywords import doc_terms
+    with SessionLocal() as s:
+        if s.get(TermStat, DOCS_KEY) is not None:
+            return
+        if s.query(NewsItem.id).filter(NewsItem.content.isnot(None)).first() is None:
+            return
+    documents, df, last_id = 0, {}, 0
+    with SessionLocal() as s:
+        while True:
+            rows = s.execute(
+                select(NewsItem.id, NewsItem.content)
+                .where(NewsItem.id > last_id, NewsItem.content.isnot(None))
+                .order_by(NewsItem.id).limit(1000)
+            ).all()
+            if not rows:
+                break
+            for _, content in rows:
+                documents += 1
+                for t in doc_terms(content):
+                    df[t] = df.get(t, 0) + 1
+            last_id = rows[-1][0]
+    add_terms(documents, df)
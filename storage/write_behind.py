@@ -0,0 +1,85 @@
+import os, atexit, threading
+
+from storage.db import save_news_items
+
+ENABLED = os.getenv("DB_WRITE_BEHIND", "0") == "1"
+FLUSH_SIZE = int(os.getenv("DB_FLUSH_SIZE", 200))
+FLUSH_INTERVAL = float(os.getenv("DB_FLUSH_INTERVAL", 2.0))
+
+
+class WriteBehindBuffer:
+    """Collects records and writes them with save_news_items.
+
+    A flush happens when FLUSH_SIZE records are waiting or FLUSH_INTERVAL
+    seconds have passed, whichever comes first. A failed flush puts the
+    batch back and retries on the next tick. Flushes run one at a time, so
+    flush() returning means everything added before it is in the database.
+    """
+
+    def __init__(self, size=FLUSH_SIZE, interval=FLUSH_INTERVAL):
+        self.size = size
+        self.interval = interval
+        self._buf = []
+        self._lock = threading.Lock()
+        self._flushing = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.flushed = 0
+        self.failures = 0
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def add(self, records: list):
+        with self._lock:
+            self._start()
+            self._buf.extend(records)
+            full = len(self._buf) >= self.size
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._flushing:
+            with self._lock:
+                batch, self._buf = self._buf, []
+            if not batch:
+                return
+            try:
+                save_news_items(batch)
+                self.flushed += len(batch)
+            except Exception as e:
+                self.failures += 1
+                print("[WriteBehind] flush failed, will retry:", e)
+                with self._lock:
+                    self._buf[:0] = batch
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buf)
+
+
+_buffer = WriteBehindBuffer()
+
+
+def persist_news(records: list):
+    """Store analyzed records, through the buffer when DB_WRITE_BEHIND=1."""
+    if ENABLED:
+        _buffer.add(records)
+    else:
+        save_news_items(records)
+
+
+def flush():
+    """Write out anything still buffered: before reading records back, and
+    for processes that exit without atexit."""
+    if ENABLED:
+        _buffer.flush()
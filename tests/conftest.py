@@ -0,0 +1,31 @@
+import os, sys, tempfile
+
+# before anything imports storage.db: settings are read at import time
+_DB_DIR = tempfile.mkdtemp(prefix="tests_")
+os.environ["DB_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'news.db')}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    from storage.db import init_db
+    init_db()
+
+
+@pytest.fixture
+def stub_client(monkeypatch):
+    """``make(srv)`` -> ``(name, Client)``: an OpenAI client of its own,
+    with its own rate limiter, pointed at a bench.servers.StubLLMServer."""
+    import uuid
+    from services.ai_providers import openai_provider
+
+    def make(srv, timeout=5):
+        name = "openai_" + uuid.uuid4().hex[:8]
+        env = name.upper()
+        monkeypatch.setenv(f"{env}_BASE_URL", srv.base + "/v1")
+        monkeypatch.setenv(f"{env}_API_KEY", "test")
+        monkeypatch.setenv(f"{env}_TIMEOUT", str(timeout))
+        return name, openai_provider.Client(name)
+    return make
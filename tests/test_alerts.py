@@ -0,0 +1,202 @@
+import json, time, uuid, threading, socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.alerts import AlertEngine, AlertRule, SmtpSink, WebhookSink
+
+
+# ------------------------------
+# STAND-INS
+# ------------------------------
+
+class WebhookStandIn:
+    """Local HTTP endpoint that records the JSON bodies posted to it."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.received = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                time.sleep(stand_in.delay)
+                stand_in.received.append(json.loads(body))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SmtpStandIn:
+    """Just enough SMTP for smtplib.send_message: records envelope and body."""
+
+    def __init__(self):
+        self.messages = []
+        stand_in = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode() + b"\r\n")
+
+            def handle(self):
+                rcpt, data = [], []
+                self.reply("220 stand-in ready")
+                for raw in self.rfile:
+                    cmd = raw.decode().strip().upper()
+                    if cmd.startswith("RCPT TO:"):
+                        rcpt.append(raw.decode().strip()[8:].strip("<> "))
+                        self.reply("250 ok")
+                    elif cmd == "DATA":
+                        self.reply("354 go ahead")
+                        for line in self.rfile:
+                            if line in (b".\r\n", b".\n"):
+                                break
+                            data.append(line)
+                        stand_in.messages.append({"to": rcpt, "body": b"".join(data).decode()})
+                        rcpt, data = [], []
+                        self.reply("250 queued")
+                    elif cmd == "QUIT":
+                        self.reply("221 bye")
+                        return
+                    else:                       # EHLO, MAIL FROM, RSET, NOOP
+                        self.reply("250 ok")
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def webhook():
+    stand_in = WebhookStandIn()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def slow_webhook():
+    stand_in = WebhookStandIn(delay=1.0)
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    stand_in = SmtpStandIn()
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(stand_in.port))
+    monkeypatch.setenv("ALERT_EMAILS", "desk@example.org")
+    yield stand_in
+    stand_in.close()
+
+
+def _wait(cond, timeout=5.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if cond():
+            return True
+        time.sleep(0.02)
+    return cond()
+
+
+def _record(risk=9, **kw):
+    rec = {"title": "Malatya'da deprem", "source": "https://www.trthaber.com/a/1",
+           "category": "Disaster", "risk_point": risk, "keywords": ["deprem", "malatya"],
+           "story_id": uuid.uuid4().hex}
+    rec.update(kw)
+    return rec
+
+
+# ------------------------------
+# RULES
+# ------------------------------
+
+def test_rule_conditions_must_all_hold():
+    rule = AlertRule("quake", min_risk=7, categories=["Disaster"], terms=["Deprem"],
+                     sources=["trthaber.com"])
+    assert rule.matches(_record())
+    assert not rule.matches(_record(risk=6))
+    assert not rule.matches(_record(category="Economy"))
+    assert not rule.matches(_record(title="Borsa", keywords=["ekonomi"]))
+    assert not rule.matches(_record(source="https://example.org/a/1"))
+    # host suffixes match subdomains only on a dot boundary
+    assert rule.matches(_record(source="https://m.trthaber.com/a/1"))
+    assert not rule.matches(_record(source="https://nottrthaber.com/a/1"))
+
+
+def test_rule_without_conditions_matches_everything():
+    assert AlertRule("all").matches({"title": "x"})
+
+
+# ------------------------------
+# DELIVERY
+# ------------------------------
+
+def test_webhook_receives_matching_alerts_only(webhook):
+    engine = AlertEngine([AlertRule("high-risk", min_risk=8)], [WebhookSink(webhook.url)])
+    engine.evaluate([_record(risk=9, title="a"), _record(risk=3, title="b")])
+    assert _wait(lambda: len(webhook.received) == 1)
+    time.sleep(0.1)
+    assert len(webhook.received) == 1
+    alert = webhook.received[0]
+    assert alert["rule"] == "high-risk"
+    assert alert["record"]["title"] == "a"
+
+
+def test_smtp_mails_configured_recipients(smtp):
+    engine = AlertEngine([AlertRule("high-risk", min_risk=8)], [SmtpSink()])
+    engine.evaluate([_record(title="Deprem uyarısı")])
+    assert _wait(lambda: len(smtp.messages) == 1)
+    msg = smtp.messages[0]
+    assert "desk@example.org" in msg["to"]
+    assert "high-risk" in msg["body"]
+    # Bcc is an envelope matter and never reaches the message itself
+    assert "Bcc:" not in msg["body"]
+
+
+def test_one_alert_per_rule_and_story(webhook):
+    engine = AlertEngine([AlertRule("high-risk", min_risk=8), AlertRule("quake", terms=["deprem"])],
+                         [WebhookSink(webhook.url)])
+    story = uuid.uuid4().hex
+    copies = [_record(story_id=story, source=f"https://site{i}.com/a") for i in range(3)]
+    engine.evaluate(copies[:2])
+    engine.evaluate(copies[2:])
+    engine.evaluate([_record()])                 # another story fires again
+    assert _wait(lambda: len(webhook.received) == 4)
+    time.sleep(0.1)
+    assert sorted(a["rule"] for a in webhook.received) == ["high-risk", "high-risk", "quake", "quake"]
+    assert engine.stats()["fired"] == 4
+    assert engine.stats()["suppressed"] == 4
+
+
+def test_slow_sink_neither_blocks_evaluate_nor_loses_other_alerts(slow_webhook, webhook):
+    slow, fast = WebhookSink(slow_webhook.url), WebhookSink(webhook.url)
+    slow.name, fast.name = "slow", "fast"
+    engine = AlertEngine([AlertRule("high-risk", min_risk=8)], [slow, fast])
+
+    t0 = time.monotonic()
+    engine.evaluate([_record(title=f"t{i}") for i in range(5)])
+    assert time.monotonic() - t0 < 0.5          # the slow sink needs 5 s for these
+
+    assert _wait(lambda: len(webhook.received) == 5, timeout=2.0)
+    assert len(slow_webhook.received) < 5
+    assert _wait(lambda: len(slow_webhook.received) == 5, timeout=8.0)
+    stats = engine.stats()["sinks"]
+    assert stats["fast"]["sent"] == 5 and stats["slow"]["sent"] == 5
@@ -0,0 +1,43 @@
+import uuid
+
+import pytest
+
+from app import create_app, PRESET_FEEDS
+from storage import jobs
+
+PRESET = next(iter(PRESET_FEEDS))
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+@pytest.mark.parametrize("max_news", [8, 10000])     # hot window, database
+def test_latest_says_where_the_stream_should_start(client, max_news):
+    jobs.append_events(PRESET, [{"source": "https://example.com/before"}])
+    resp = client.get(f"/api/news/latest?preset={PRESET}&max_news={max_news}")
+    assert resp.status_code == 200
+    start = int(resp.headers["X-Last-Event-ID"])
+    jobs.append_events(PRESET, [{"source": "https://example.com/after"}])
+    assert start <= jobs.last_event_id()
+    missed = [r["source"] for _, _, r in jobs.events_after(start)]
+    assert "https://example.com/after" in missed
+    if max_news > 1000:
+        # read straight from the database: exactly where the response left off
+        assert missed == ["https://example.com/after"]
+
+
+def test_history_source_filter_matches_wildcards_literally(client):
+    from storage.db import save_news_items
+    tag = uuid.uuid4().hex[:8]
+    save_news_items([{"title": "a", "source": f"https://a_{tag}.com/1"},
+                     {"title": "b", "source": f"https://ab{tag}.com/1"}])
+    resp = client.get(f"/api/news/history?source=a_{tag}.com")
+    assert [r["source"] for r in resp.get_json()["data"]] == [f"https://a_{tag}.com/1"]
+    assert client.get(f"/api/news/history?source=a%25{tag}.com").get_json()["data"] == []
+
+
+def test_search_rejects_a_bad_limit(client):
+    resp = client.get("/api/search?q=deprem&limit=many")
+    assert resp.status_code == 400
@@ -0,0 +1,54 @@
+import uuid, datetime, multiprocessing
+
+from services.dedup import StoryIndex, minhash
+from storage.stories import claim_alert
+
+TEXT = ("Malatya'da 6.3 büyüklüğünde deprem meydana geldi, AFAD bölgede arama kurtarma "
+        "çalışmalarının sürdüğünü ve hasar tespitinin başladığını açıkladı")
+
+
+def _assign(text, out):
+    from storage.db import engine
+    engine.dispose(close=False)
+    out.put(StoryIndex().assign(minhash(text))[0])
+
+
+def _claim(rule, story, out):
+    from storage.db import engine
+    engine.dispose(close=False)
+    out.put(claim_alert(rule, story, datetime.datetime.utcnow(), 3600))
+
+
+def _in_processes(target, args, n=4) -> list:
+    ctx = multiprocessing.get_context("fork")
+    out = ctx.Queue()
+    procs = [ctx.Process(target=target, args=args + (out,)) for _ in range(n)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+    return [out.get(timeout=5) for _ in procs]
+
+
+def test_near_duplicates_share_a_story_and_inherit_its_analysis():
+    index = StoryIndex()
+    text = TEXT + " " + uuid.uuid4().hex
+    sid, analysis, is_new = index.assign(minhash(text))
+    assert is_new and analysis is None
+    index.set_analysis(sid, {"category": "Disaster"})
+    again, analysis, is_new = index.assign(minhash(text + " son dakika"))
+    assert (again, analysis, is_new) == (sid, {"category": "Disaster"}, False)
+    other, _, is_new = index.assign(minhash("Borsa İstanbul günü yükselişle tamamladı, dolar ve "
+                                            "euro kurları geriledi " + uuid.uuid4().hex))
+    assert is_new and other != sid
+
+
+def test_worker_processes_cluster_one_story_together():
+    ids = _in_processes(_assign, (TEXT + " " + uuid.uuid4().hex,))
+    assert len(set(ids)) == 1
+
+
+def test_alert_fires_once_across_processes():
+    story = uuid.uuid4().hex
+    assert sorted(_in_processes(_claim, ("high-risk", story), n=6)) == [False] * 5 + [True]
+    assert claim_alert("other-rule", story, datetime.datetime.utcnow(), 3600)
@@ -0,0 +1,53 @@
+import time, threading
+
+from services.events import EventBus
+from storage import jobs
+
+
+def _collect(bus, out, **kw):
+    for ev in bus.subscribe(heartbeat=0.1, **kw):
+        if ev is not None:
+            out.append(ev.data["n"])
+
+
+def test_new_subscriber_only_gets_events_published_after_it_joined():
+    jobs.append_events("p", [{"n": i} for i in range(8)])
+    bus, got = EventBus(interval=0.05), []
+    threading.Thread(target=_collect, args=(bus, got), daemon=True).start()
+    time.sleep(0.3)
+    jobs.append_events("p", [{"n": 99}])
+    time.sleep(0.3)
+    assert got == [99]
+
+
+def test_resuming_subscriber_is_replayed_from_its_last_event_id():
+    jobs.append_events("p", [{"n": 1}])
+    resume_from = jobs.last_event_id()
+    jobs.append_events("p", [{"n": 2}, {"n": 3}])
+    bus, got = EventBus(interval=0.05), []
+    threading.Thread(target=_collect, args=(bus, got), kwargs={"last_id": resume_from},
+                     daemon=True).start()
+    time.sleep(0.3)
+    assert got == [2, 3]
+
+
+def test_event_ids_keep_growing_after_the_table_is_purged():
+    jobs.append_events("p", [{"n": 1}])
+    top = jobs.last_event_id()
+    jobs.purge(keep_hours=-1)
+    jobs.append_events("p", [{"n": 2}])
+    assert [i for i, _, _ in jobs.events_after(0)] == [top + 1]
+
+
+def test_old_event_table_is_rebuilt_with_autoincrement():
+    from storage.db import engine
+    jobs.append_events("p", [{"n": 1}])
+    top = jobs.last_event_id()
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE stream_events")
+        conn.exec_driver_sql("CREATE TABLE stream_events (id INTEGER NOT NULL PRIMARY KEY, "
+                             "preset VARCHAR(100), data TEXT, created_at DATETIME)")
+        conn.exec_driver_sql(f"INSERT INTO stream_events (id, preset, data) VALUES ({top}, 'p', '{{}}')")
+    jobs.init_events()
+    jobs.append_events("p", [{"n": 2}])
+    assert [i for i, _, _ in jobs.events_after(0)] == [top + 1]
@@ -0,0 +1,11 @@
+import uuid
+
+from services.feeds import PRESET_FEEDS, feed_label, host_label
+
+
+def test_metric_labels_stay_a_fixed_set():
+    name, url = next(iter(PRESET_FEEDS.items()))
+    assert feed_label(url) == name
+    assert host_label(url) == url.split("/")[2]
+    adhoc = f"https://{uuid.uuid4().hex}.example.com/rss"
+    assert feed_label(adhoc) == host_label(adhoc) == "adhoc"
@@ -0,0 +1,36 @@
+import json, time, uuid
+
+from services.events import Event
+from services.hot_window import HotWindow, HotRecord
+from storage.db import save_news_items, fetch_news_by_sources
+
+
+def _record(**kw):
+    rec = {"title": "Deprem", "source": f"https://example.com/{uuid.uuid4().hex}",
+           "datetime": "2026-10-18 08:00", "category": "Disaster", "sentiment": "negative",
+           "toxicity": 0.1, "keywords": ["deprem"], "entities": ["AFAD"], "risk_point": 7,
+           "rule_hits": ["term:deprem+5"], "story_id": uuid.uuid4().hex, "provider": "mock"}
+    rec.update(kw)
+    return rec
+
+
+def test_live_and_stored_records_have_the_database_shape():
+    live = _record()
+    save_news_items([dict(live, content="metin")])
+    stored = fetch_news_by_sources([live["source"]])[live["source"]]
+    from_event = json.loads(HotRecord(live, time.time()).fragment)
+    from_db = json.loads(HotRecord(stored, time.time()).fragment)
+    assert set(from_event) == set(from_db) == set(stored)
+    assert from_db == stored
+    assert from_event["id"] is None and from_event["created_at"]
+    assert from_event["rule_hits"] == from_db["rule_hits"] == ["term:deprem+5"]
+
+
+def test_reanalysis_keeps_the_record_in_place():
+    window = HotWindow({"p": "https://example.com/feed"}, size=3)
+    window._loaded = True
+    first, second = _record(risk_point=1), _record(risk_point=2)
+    window.on_events([Event(i, "p", r) for i, r in enumerate((first, second))])
+    window.on_events([Event(2, "p", dict(first, risk_point=9))])
+    data = json.loads(window.response(["p"], 3).body)["data"]
+    assert [(r["source"], r["risk_point"]) for r in data] == [(first["source"], 9), (second["source"], 2)]
@@ -0,0 +1,57 @@
+import time
+
+import pytest
+import requests
+
+from bench.servers import StubLLMServer
+from services import analyzer
+from services.rate_limit import RateLimitTimeout
+from services.router import Router
+
+TEXTS = ["Malatya'da deprem meydana geldi", "Dolar ve euro kurları, enflasyon ve faiz kararı",
+         "Galatasaray Fenerbahçe maçında gol"]
+
+
+def test_batch_is_one_request_with_a_result_per_text(stub_client):
+    with StubLLMServer(latency=0.01, jitter=0) as srv:
+        _, client = stub_client(srv)
+        results = client.analyze_batch(TEXTS)
+    assert srv.requests == 1
+    assert [r["category"] for r in results] == ["Disaster", "Economy", "Sports"]
+
+
+def test_items_missing_from_the_batch_answer_get_their_own_call(stub_client):
+    with StubLLMServer(latency=0.01, jitter=0, drop_rate=1.0) as srv:
+        _, client = stub_client(srv)
+        results = client.analyze_batch(TEXTS)
+    assert srv.requests == 1 + len(TEXTS)
+    assert all(r["category"] for r in results)
+
+
+def test_429_pauses_the_limiter_and_reports_retry_after(stub_client):
+    with StubLLMServer(latency=0.01, jitter=0, throttle_rate=1.0) as srv:
+        _, client = stub_client(srv)
+        with pytest.raises(requests.HTTPError) as err:
+            client.analyze(TEXTS[0])
+    assert err.value.retry_after == 1.0
+    with pytest.raises(RateLimitTimeout):
+        client.limiter.acquire(10, timeout=0.3)
+
+
+def test_slow_provider_times_out(stub_client):
+    with StubLLMServer(latency=1.0, jitter=0) as srv:
+        _, client = stub_client(srv, timeout=0.2)
+        t0 = time.monotonic()
+        with pytest.raises(requests.Timeout) as err:
+            client.analyze(TEXTS[0])
+    assert time.monotonic() - t0 < 0.9
+    assert err.value.retry_after == 0.0
+
+
+def test_batch_falls_back_to_rule_based_analysis(stub_client, monkeypatch):
+    with StubLLMServer(latency=0.01, jitter=0, fail_rate=1.0) as srv:
+        monkeypatch.setattr(analyzer, "_router", Router([stub_client(srv)], deadline=2))
+        monkeypatch.setattr(analyzer, "PROVIDERS", ["openai"])
+        results = analyzer.analyze_batch_structured([t + " " + str(time.time()) for t in TEXTS])
+    assert srv.requests == 2                     # the request and its one retry
+    assert [r["provider"] for r in results] == ["mock"] * len(TEXTS)
@@ -0,0 +1,36 @@
+import time, uuid
+
+import pytest
+
+from services.rate_limit import ProviderLimiter, RateLimitTimeout
+
+
+def _limiters(n, rpm=5, tpm=100000):
+    # separate limiters on one quota row stand in for separate worker processes
+    name = "test-" + uuid.uuid4().hex[:8]
+    return [ProviderLimiter(name, rpm, tpm, shared=True) for _ in range(n)]
+
+
+def test_processes_share_one_quota():
+    a, b = _limiters(2)
+    for lim in (a, b, a, b, a):
+        lim.acquire(10, timeout=0.5)
+    with pytest.raises(RateLimitTimeout):
+        b.acquire(10, timeout=0.3)
+
+
+def test_a_429_pause_holds_back_every_process():
+    a, b = _limiters(2, rpm=600)
+    a.pause(1.0)
+    t0 = time.monotonic()
+    with pytest.raises(RateLimitTimeout):
+        b.acquire(10, timeout=0.3)
+    b.acquire(10, timeout=2)
+    assert time.monotonic() - t0 >= 0.9
+
+
+def test_local_buckets_are_per_process():
+    name = "test-" + uuid.uuid4().hex[:8]
+    a, b = (ProviderLimiter(name, 1, 100000, shared=False) for _ in range(2))
+    a.acquire(10, timeout=0.1)
+    b.acquire(10, timeout=0.1)
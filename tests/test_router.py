@@ -0,0 +1,132 @@
+import time, threading
+
+import pytest
+
+from bench.servers import StubLLMServer
+from services import router as router_mod
+from services.router import CircuitBreaker, Router
+
+
+class FakeProvider:
+    def __init__(self, delay=0.0, fail=False, hang=None):
+        self.delay, self.fail, self.hang = delay, fail, hang
+        self.calls = 0
+
+    def analyze(self, text):
+        self.calls += 1
+        if self.hang is not None:
+            self.hang.wait()
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider down")
+        return {"text": text}
+
+
+@pytest.fixture
+def fast_hedging(monkeypatch):
+    monkeypatch.setattr(router_mod, "HEDGE_MIN_DELAY", 0.05)
+    monkeypatch.setattr(router_mod, "HEDGE_MAX_DELAY", 0.2)
+    monkeypatch.setattr(router_mod, "THREADS", 4)
+
+
+def _concurrently(fn, n):
+    out = [None] * n
+
+    def run(i):
+        out[i] = fn(i)
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(10)
+    return out
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_after_cooldown():
+    b = CircuitBreaker("p", failures=3, slow=1.0, cooldown=0.1)
+    for _ in range(3):
+        assert b.allow() is True
+        b.record(False, 0.01)
+    assert b.allow() is False
+    time.sleep(0.15)
+    assert b.allow() == "probe"
+    assert b.allow() is False           # one probe at a time
+    b.record(True, 0.01)
+    assert b.stats()["state"] == "closed"
+
+
+def test_failed_call_moves_to_the_next_provider():
+    r = Router([("a", FakeProvider(fail=True)), ("b", FakeProvider())], deadline=2)
+    assert r.call("analyze", "x") == ("b", {"text": "x"})
+
+
+def test_hung_primary_never_starves_the_backup(fast_hedging):
+    release = threading.Event()
+    primary, backup = FakeProvider(hang=release), FakeProvider(delay=0.01)
+    r = Router([("primary", primary), ("backup", backup)], deadline=1.0)
+    try:
+        results = _concurrently(lambda i: r.call("analyze", i), 20)
+    finally:
+        release.set()
+    assert [name for name, _ in results] == ["backup"] * 20
+    assert backup.calls == 20
+    # only as many calls reach the hung primary as it has threads
+    assert primary.calls == router_mod.THREADS
+    assert r.breakers["backup"].stats() == {"state": "closed", "failures": 0, "trips": 0}
+
+
+def test_calls_that_never_started_are_not_charged_at_the_deadline(fast_hedging):
+    release = threading.Event()
+    try:
+        r = Router([("a", FakeProvider(hang=release)), ("b", FakeProvider(hang=release))], deadline=0.5)
+        results = _concurrently(lambda i: r.call("analyze", i), 12)
+        assert results == [(None, None)] * 12
+        stats = {name: b.stats() for name, b in r.breakers.items()}
+        # 4 calls hung on each provider; the 8 callers beyond that waited for a thread
+        assert stats["a"]["failures"] + stats["a"]["trips"] * 5 <= router_mod.THREADS
+        assert stats["b"]["failures"] + stats["b"]["trips"] * 5 <= router_mod.THREADS
+    finally:
+        release.set()
+
+
+def test_failover_between_stub_servers(stub_client):
+    with StubLLMServer(latency=0.01, jitter=0, fail_rate=1.0) as down, \
+         StubLLMServer(latency=0.01, jitter=0) as up:
+        primary, backup = stub_client(down), stub_client(up)
+        r = Router([primary, backup], deadline=5)
+        name, results = r.call("analyze_batch", ["Deprem oldu", "Borsa yükseldi"])
+        assert name == backup[0] and len(results) == 2 and results[0]["category"]
+        # one failed batch request, then the retry is left to the backup
+        assert down.requests == 1 and up.requests == 1
+
+
+def test_lone_provider_retries_once_after_retry_after(stub_client):
+    with StubLLMServer(latency=0.01, jitter=0, throttle_rate=1.0) as srv:
+        name, client = stub_client(srv)
+        r = Router([(name, client)], deadline=5)
+
+        def recover():
+            while not srv.requests:
+                time.sleep(0.01)
+            time.sleep(0.3)         # the first answer is out, well before Retry-After ends
+            srv.throttle_rate = 0.0
+        threading.Thread(target=recover, daemon=True).start()
+        t0 = time.monotonic()
+        answered, result = r.call("analyze", "Deprem oldu")
+        assert answered == name and result["category"]
+        assert srv.requests == 2 and time.monotonic() - t0 >= 1.0   # Retry-After: 1
+
+
+def test_lone_provider_is_retried_only_once(stub_client):
+    with StubLLMServer(latency=0.01, jitter=0, fail_rate=1.0) as srv:
+        r = Router([stub_client(srv)], deadline=5)
+        assert r.call("analyze", "Deprem oldu") == (None, None)
+        assert srv.requests == 2
+
+
+def test_no_retry_when_it_cannot_start_before_the_deadline(stub_client):
+    with StubLLMServer(latency=0.01, jitter=0, throttle_rate=1.0) as srv:
+        r = Router([stub_client(srv)], deadline=0.5)
+        t0 = time.monotonic()
+        assert r.call("analyze", "Deprem oldu") == (None, None)
+        assert srv.requests == 1 and time.monotonic() - t0 < 0.5
@@ -0,0 +1,17 @@
+import uuid
+
+from services.pipeline import stored_records
+from storage import write_behind
+from storage.db import mark_entries_seen
+
+
+def test_buffered_records_are_read_back(monkeypatch):
+    monkeypatch.setattr(write_behind, "ENABLED", True)
+    monkeypatch.setattr(write_behind, "_buffer", write_behind.WriteBehindBuffer(size=1000, interval=60))
+    feed = f"https://example.com/{uuid.uuid4().hex}.rss"
+    link = feed + "#1"
+    mark_entries_seen(feed, [("guid-1", link)])
+    write_behind.persist_news([{"title": "Deprem", "source": link, "risk_point": 5}])
+    assert write_behind._buffer.pending() == 1
+    assert [r["source"] for r in stored_records(feed)] == [link]
+    assert write_behind._buffer.pending() == 0
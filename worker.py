@@ -0,0 +1,88 @@
+"""Ingestion worker.
+
+    python worker.py --procs 4 --threads 2
+    python worker.py --procs 4 --no-scheduler   # job runners only
+    python worker.py --procs 0                  # a scheduler-only process
+
+Starts N processes that run fetch and analyze jobs from the database queue.
+Run as many of these as needed, on one host or several. Each worker also
+runs the feed scheduler unless started with --no-scheduler (or
+WORKER_SCHEDULER=0); only the one holding the leader lease enqueues, so
+running it everywhere is safe.
+The schema must exist first: ``flask --app app init-db``.
+"""
+import os, signal, socket, argparse, threading, multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _child(threads: int, kinds, metrics_port=None):
+    from storage.db import engine
+    from storage.write_behind import flush
+    from services.worker import run_workers
+    from services import metrics, keywords
+
+    engine.dispose(close=False)  # never share the parent's pooled connections
+    if metrics_port:
+        metrics.serve(metrics_port)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    run_workers(threads, stop, kinds)
+    flush()
+    keywords.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--procs", type=int, default=int(os.getenv("WORKER_PROCS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=int(os.getenv("WORKER_THREADS", 2)),
+                        help="jobs run concurrently per process")
+    parser.add_argument("--kinds", help="comma-separated job kinds to run (default: all)")
+    parser.add_argument("--metrics-port", type=int, default=int(os.getenv("METRICS_PORT", 0)) or None,
+                        help="serve /metrics, one port per process counting up from this one")
+    parser.add_argument("--scheduler", action=argparse.BooleanOptionalAction,
+                        default=os.getenv("WORKER_SCHEDULER", "1") != "0",
+                        help="also run the feed scheduler in this process (default: on)")
+    args = parser.parse_args()
+    kinds = [k.strip() for k in args.kinds.split(",")] if args.kinds else None
+
+    procs = [multiprocessing.Process(
+                 target=_child, name=f"worker-{i}",
+                 args=(args.threads, kinds, args.metrics_port and args.metrics_port + i))
+             for i in range(args.procs)]
+    for p in procs:
+        p.start()
+
+    scheduler = sched_thread = None
+    if args.scheduler:
+        from services.feeds import PRESET_FEEDS, is_blocked_url
+        from services.poller import Scheduler
+        feeds = {p: u for p, u in PRESET_FEEDS.items() if not is_blocked_url(u)}
+        scheduler = Scheduler(feeds, holder=f"{socket.gethostname()}:{os.getpid()}")
+        sched_thread = threading.Thread(target=scheduler.run, name="scheduler", daemon=True)
+        sched_thread.start()
+
+    def shutdown(*_):
+        if scheduler:
+            scheduler.stop()
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    print(f"[Worker] {args.procs} processes x {args.threads} threads")
+    for p in procs:
+        p.join()
+    if scheduler:
+        # scheduler-only process: wait for the signal; join() with a timeout keeps handlers running
+        while not procs and sched_thread.is_alive():
+            sched_thread.join(1)
+        scheduler.stop()
+        sched_thread.join(timeout=10)
+
+
+if __name__ == "__main__":
+    main()